@@ -0,0 +1,7 @@
+import sys, os
+
+benchdir = os.path.dirname(__file__)
+srcdir = os.path.abspath(os.path.join(benchdir, "../stockworth"))
+# Appended rather than inserted, so that "stockworth" is still the package and
+# not stockworth/stockworth.py
+sys.path.append(srcdir)
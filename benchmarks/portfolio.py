@@ -0,0 +1,61 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import random
+from datetime import date, timedelta
+
+from interval import Interval
+
+# Portfolio sizes, in tranches, that the benchmarks run at
+SIZES = (10, 1_000, 100_000, 1_000_000)
+
+
+def synthetic_config(size, seed=0, today=None):
+    """
+    A config with size tranches, ready to be valued
+
+    About a third of the tranches are options, with strikes either side of the
+    price. Vest dates are spread from two years ago to eight years from now, so
+    there is something in the vested bin and in every yearly bin. The same size
+    and seed always give the same config.
+    """
+    rng = random.Random(f"{size}:{seed}")
+    today = today or date.today()
+    first = today - timedelta(days=2 * 365)
+    rsus = []
+    options = []
+    for _ in range(size):
+        vest_date = (first + timedelta(days=rng.randrange(10 * 365))).isoformat()
+        qty = float(rng.randrange(1, 1000))
+        if rng.random() < 1 / 3:
+            options.append(
+                {"qty": qty, "price": rng.uniform(5.0, 40.0), "vest_date": vest_date}
+            )
+        else:
+            rsus.append({"qty": qty, "vest_date": vest_date})
+    return {
+        "symbol": "GME",
+        "rsus": rsus,
+        "options": options,
+        "thresholds": [1_000.0 * size, 100.0 * size, 10.0 * size],
+        "price": 20.0,
+        "tax_rate": 0.25,
+        "use_rsus": True,
+        "use_nsos": True,
+        "bin_size": Interval.MONTHLY,
+    }
@@ -0,0 +1,268 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+from benchmarks import srcdir
+from benchmarks.portfolio import SIZES, synthetic_config
+from config_cache import CompiledConfigCache
+from equity_group import EquityGroup
+from tranches import Tranches
+from valuation import convert_to_equity
+from vesting_schedule import VestingSchedule
+
+"""
+Times stockworth at a range of portfolio sizes, records the results, and fails
+if anything got slower than the last few recorded runs
+
+    $ python -m benchmarks.run --sizes 10,1000 --threshold 0.25
+"""
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), "history.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_WINDOW = 5
+
+
+# Each benchmark takes a config and a scratch directory, and returns the function
+# to time
+def bench_convert_to_equity(config, workdir):
+    return lambda: convert_to_equity(config["price"], config)
+
+
+def bench_compute_thresholds(config, workdir):
+    tranches = Tranches.from_config(config)
+
+    # A fresh group each time, since a group caches what thresholds are worked out from
+    def compute_thresholds():
+        group = EquityGroup.from_tranches(tranches, config["price"], config["tax_rate"])
+        return group.compute_thresholds(config["thresholds"])
+
+    return compute_thresholds
+
+
+def bench_vesting_schedule(config, workdir):
+    tranches = Tranches.from_config(config)
+    return lambda: VestingSchedule(
+        EquityGroup.from_tranches(tranches, config["price"], config["tax_rate"]),
+        config["bin_size"],
+    )
+
+
+def bench_parse_config(config, workdir):
+    path = write_config(config, workdir)
+
+    def parse_config():
+        with open(path, "r") as config_file:
+            parsed = json.loads(config_file.read())
+        return Tranches.from_config(dict(parsed, use_rsus=True, use_nsos=True))
+
+    return parse_config
+
+
+def bench_compiled_config(config, workdir):
+    path = write_config(config, workdir)
+    cache = CompiledConfigCache(os.path.join(workdir, "cache"), min_size=0)
+    cache.load(path)  # compile it
+    return lambda: Tranches.from_config(
+        dict(cache.load(path), use_rsus=True, use_nsos=True)
+    )
+
+
+def bench_main(config, workdir):
+    # Run by path, since "stockworth" on its own is the package
+    cli = runpy.run_path(os.path.join(srcdir, "stockworth.py"), run_name="stockworth")
+
+    path = write_config(config, workdir)
+    argv = ["stockworth.py", "--file", path, "--price", str(config["price"])]
+    argv += ["--tax", str(config["tax_rate"]), "--interval", "monthly", "--no-cache"]
+
+    def run_main():
+        saved_argv = sys.argv
+        sys.argv = argv
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                cli["main"]()
+        finally:
+            sys.argv = saved_argv
+
+    return run_main
+
+
+def write_config(config, workdir):
+    """Save the parts of config that a config file would have, returning its path"""
+    saved = {key: config[key] for key in ("symbol", "rsus", "options", "thresholds")}
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w") as config_file:
+        json.dump(saved, config_file)
+    return path
+
+
+BENCHMARKS = {
+    "convert_to_equity": bench_convert_to_equity,
+    "compute_thresholds": bench_compute_thresholds,
+    "vesting_schedule": bench_vesting_schedule,
+    "parse_config": bench_parse_config,
+    "compiled_config": bench_compiled_config,
+    "main": bench_main,
+}
+
+
+def time_call(function, repeat):
+    """Seconds per call: the best of repeat rounds, each at least 0.2s long"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_benchmarks(names, sizes, repeat, stream):
+    results = {}
+    for size in sizes:
+        config = synthetic_config(size)
+        for name in names:
+            key = f"{name}[{size}]"
+            with tempfile.TemporaryDirectory() as workdir:
+                results[key] = time_call(BENCHMARKS[name](config, workdir), repeat)
+            stream.write(f"{key:>32}: {format_seconds(results[key])}\n")
+    return results
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def load_history(path):
+    """Recorded runs, oldest first. Missing history is no history."""
+    try:
+        with open(path, "r") as history_file:
+            return json.load(history_file)
+    except FileNotFoundError:
+        return []
+
+
+def save_history(path, history):
+    with open(path, "w") as history_file:
+        json.dump(history, history_file, indent=2)
+
+
+def find_regressions(results, history, threshold, window):
+    """
+    (key, seconds, baseline) for every result more than threshold (a fraction)
+    slower than its baseline. The baseline is the median of the last window
+    recorded runs of the same benchmark, so one noisy run can't move it much.
+    """
+    regressions = []
+    for key, seconds in results.items():
+        previous = [run["results"][key] for run in history if key in run["results"]]
+        if not previous:
+            continue
+        baseline = statistics.median(previous[-window:])
+        if seconds > baseline * (1.0 + threshold):
+            regressions.append((key, seconds, baseline))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument(
+        "--sizes",
+        type=lambda text: [int(size) for size in text.split(",")],
+        default=list(SIZES),
+        help="Comma separated portfolio sizes, in tranches "
+        f"(defaults to {','.join(str(size) for size in SIZES)})",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=tuple(BENCHMARKS),
+        default=list(BENCHMARKS),
+        help="Only run these benchmarks",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="How many rounds to time each benchmark for (defaults to 3)",
+    )
+    parser.add_argument(
+        "--history",
+        default=DEFAULT_HISTORY,
+        help="The json file results are recorded in and compared against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail if a benchmark is more than this fraction slower than its "
+        f"baseline (defaults to {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        help="How many recorded runs the baseline is the median of "
+        f"(defaults to {DEFAULT_WINDOW})",
+    )
+    parser.add_argument(
+        "--no-record",
+        action="store_true",
+        help="Compare against the history without adding this run to it",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.only, args.sizes, args.repeat, sys.stdout)
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold, args.window)
+    for key, seconds, baseline in regressions:
+        print(
+            f"REGRESSION {key}: {format_seconds(seconds).strip()}, "
+            f"baseline {format_seconds(baseline).strip()}"
+        )
+
+    if not args.no_record:
+        history.append(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }
+        )
+        save_history(args.history, history)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import asyncio
+import time
+from collections import deque
+
+import aiohttp
+
+from instrumentation import count
+
+QUERY_URL = "https://www.alphavantage.co/query"
+
+# The free tier allows 5 requests a minute
+DEFAULT_REQUESTS_PER_MINUTE = 5
+
+# The most symbols the bulk quotes endpoint takes in one request
+BULK_SIZE = 100
+
+
+class RateLimiter:
+    """Lets at most per_minute callers through acquire() in any 60 second window"""
+
+    def __init__(self, per_minute, clock=time.monotonic, sleep=asyncio.sleep):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._recent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.per_minute is None:
+            return
+        async with self._lock:
+            while len(self._recent) >= self.per_minute:
+                wait = self._recent[0] + 60.0 - self.clock()
+                if wait > 0:
+                    await self.sleep(wait)
+                self._recent.popleft()
+            self._recent.append(self.clock())
+
+
+class AsyncQuoteFetcher:
+    """
+    Fetches quotes for many symbols concurrently from the Alpha Vantage quote
+    endpoint, over a single pooled keep-alive session
+
+    Requests are spaced out to stay under requests_per_minute, across every
+    fetch_prices call made on the same fetcher. Failed requests, including
+    Alpha Vantage's "you're over your quota" notes, are retried up to retries
+    times, with an exponential backoff starting at backoff seconds.
+
+    With bulk, symbols are looked up BULK_SIZE at a time from the bulk quotes
+    endpoint instead (which needs a premium key), one request per batch.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        url=QUERY_URL,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        retries=3,
+        backoff=1.0,
+        max_connections=10,
+        bulk=False,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.requests_per_minute = requests_per_minute
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.bulk = bulk
+        self._limiter = None
+
+    async def fetch_prices(self, symbols):
+        """
+        Map each symbol to its price. A symbol that couldn't be fetched maps to
+        the exception explaining why, rather than failing the whole lookup.
+        """
+        if self._limiter is None:
+            self._limiter = RateLimiter(self.requests_per_minute)
+        limiter = self._limiter
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            if self.bulk:
+                return await self._fetch_bulk(session, limiter, symbols)
+            results = await asyncio.gather(
+                *(self._fetch_price(session, limiter, symbol) for symbol in symbols),
+                return_exceptions=True,
+            )
+        return dict(zip(symbols, results))
+
+    async def _fetch_price(self, session, limiter, symbol):
+        def parse(data):
+            if "Global Quote" in data and "05. price" in data["Global Quote"]:
+                return float(data["Global Quote"]["05. price"])
+
+        params = {"function": "GLOBAL_QUOTE", "symbol": symbol, "apikey": self.api_key}
+        return await self._query(session, limiter, params, parse)
+
+    async def _fetch_bulk(self, session, limiter, symbols):
+        def parse(data):
+            if "data" in data:
+                return {row["symbol"]: float(row["close"]) for row in data["data"]}
+
+        batches = [
+            symbols[start : start + BULK_SIZE]
+            for start in range(0, len(symbols), BULK_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(
+                self._query(
+                    session,
+                    limiter,
+                    {
+                        "function": "REALTIME_BULK_QUOTES",
+                        "symbol": ",".join(batch),
+                        "apikey": self.api_key,
+                    },
+                    parse,
+                )
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+        prices = {}
+        for batch, result in zip(batches, results):
+            for symbol in batch:
+                if isinstance(result, BaseException):
+                    prices[symbol] = result
+                elif symbol in result:
+                    prices[symbol] = result[symbol]
+                else:
+                    prices[symbol] = ValueError(f"No quote returned for {symbol}")
+        return prices
+
+    async def _query(self, session, limiter, params, parse):
+        """
+        Make a request, retrying as needed, and return parse(response json). parse
+        returns None when the response has no answer in it, which is retried.
+        """
+        for attempt in range(self.retries + 1):
+            await limiter.acquire()
+            count("api calls")
+            try:
+                async with session.get(self.url, params=params) as response:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                if "Error Message" in data:
+                    raise ValueError(data["Error Message"])  # not worth retrying
+                result = parse(data)
+                if result is not None:
+                    return result
+                error = ValueError(
+                    data.get("Note") or data.get("Information") or "No quote returned"
+                )
+            except aiohttp.ClientError as e:
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2**attempt)
+        raise error
+
+
+def fetch_prices(symbols, api_key, **options):
+    """Blocking wrapper around AsyncQuoteFetcher.fetch_prices"""
+    fetcher = AsyncQuoteFetcher(api_key, **options)
+    return asyncio.run(fetcher.fetch_prices(list(symbols)))
@@ -0,0 +1,137 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import count, phase
+from output import valuation_row
+from valuation import set_prices, unpriced_symbols, valuate
+
+
+def find_config_files(pattern):
+    """Every .json file in a directory, or every file matching a glob pattern"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.json")
+    return sorted(glob.glob(pattern))
+
+
+def valuate_batch(paths, load_config, get_prices, jobs=1):
+    """
+    Value many config files, yielding one row (a dict) per file in order
+
+    Configs are read and priced by load_priced_configs. A config that can't be
+    read, priced or valued produces a row with an "error" instead of stopping
+    the batch.
+
+    With jobs other than 1, the valuations are spread over a process pool
+    (jobs=None means one process per CPU).
+    """
+    items = load_priced_configs(paths, load_config, get_prices)
+    if jobs == 1:
+        yield from map(_valuate_item, items)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(_valuate_item, items, chunksize=64)
+
+
+def load_priced_configs(paths, load_config, get_prices):
+    """
+    Read many config files and fill in their prices, as a list of (path, config)
+    pairs in order, where config is the exception if it couldn't be read
+
+    load_config(path) reads a config. Configs are grouped by where their prices
+    come from (see price_source), and for each group the symbols of configs that
+    don't already have a price for them are gathered up. get_prices is called
+    once per group with a dict mapping each of those symbols to the first config
+    in the group that needs it. It returns a dict of symbol to price, or to an
+    exception if that symbol couldn't be looked up, which is what the config
+    gets as its price. If get_prices raises, every symbol it was asked for gets
+    the exception.
+    """
+    items = []
+    groups = {}
+    with phase("load configs"):
+        for path in paths:
+            try:
+                config = load_config(path)
+                symbols = unpriced_symbols(config)
+                if symbols:
+                    group = groups.setdefault(price_source(config), ({}, []))
+                    for symbol in symbols:
+                        group[0].setdefault(symbol, config)
+                    group[1].append(config)
+                items.append((path, config))
+            except Exception as e:
+                items.append((path, e))
+    count("configs", len(items))
+
+    with phase("quote lookup"):
+        for configs_by_symbol, configs in groups.values():
+            try:
+                prices = get_prices(configs_by_symbol)
+            except Exception as e:
+                # e.g. no API key, which every config that needed a price gets
+                prices = dict.fromkeys(configs_by_symbol, e)
+            for config in configs:
+                set_prices(config, prices)
+    return items
+
+
+def price_source(config):
+    """
+    A key for everything that decides where a config's prices come from: its
+    price provider, API key and quote cache settings. Configs with the same key
+    can share a lookup.
+    """
+    return json.dumps(
+        [
+            config.get(key)
+            for key in (
+                "price_provider",
+                "apikey",
+                "requests_per_minute",
+                "quote_ttl",
+                "cache_dir",
+            )
+        ],
+        sort_keys=True,
+    )
+
+
+def price_error(config):
+    """The exception a config got instead of one of its prices, if any"""
+    for price in [config["price"], *config.get("prices", {}).values()]:
+        if isinstance(price, Exception):
+            return price
+    return None
+
+
+def _valuate_item(item):
+    path, config = item
+    if isinstance(config, Exception):
+        return {"file": path, "error": str(config)}
+    error = price_error(config)
+    if error is not None:
+        return {"file": path, "error": str(error)}
+    try:
+        return valuation_row(path, valuate(config), config["thresholds"])
+    except Exception as e:
+        return {"file": path, "error": str(e)}
@@ -0,0 +1,350 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import os
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import shared_memory
+
+from equity import RSU
+from equity_group import sweep_thresholds
+from schedule_bin import VESTED, ScheduleBin
+from tranches import Tranches, config_symbols
+from valuation import symbol_prices
+
+# Cohort analytics
+#
+# Answers questions about a whole population of configs (one per employee, say)
+# at once: how much vests across all of them in each period, and how many of
+# them see their unvested equity drop below each of their thresholds in each
+# period.
+#
+# Every config's tranches go into one columnar CohortTable, each config's rows
+# together and in date order, with the price of each tranche's symbol alongside.
+# To spread the work over processes, the table is copied once into shared
+# memory, and each worker maps it and handles a contiguous range of configs, so
+# nothing but the range and the partial totals is pickled.
+
+# Below this many tranches, starting worker processes costs more than it saves
+MIN_PARALLEL_ROWS = 200_000
+
+"""
+Totals for one schedule bin across a cohort
+
+    value is what vests in the bin, employees is how many configs have something
+    vesting in it, and crossings has, for each threshold amount of the table,
+    how many of the configs with that threshold see their unvested equity drop
+    below it during the bin. Configs already below a threshold by the as-of date
+    count towards the Vested bin.
+"""
+CohortBin = namedtuple("CohortBin", ["schedule_bin", "value", "employees", "crossings"])
+
+
+class CohortTable:
+    """
+    The tranches of many configs, as flat columns
+
+    The rows of config i run from starts[i] to starts[i + 1]. Each row has a vest
+    date ordinal, quantity, strike, the price of its symbol and its kind (RSU or
+    NSO), and each config has its flat tax rate. Config i's own threshold
+    amounts run from threshold_starts[i] to threshold_starts[i + 1] of thresholds.
+    """
+
+    def __init__(
+        self,
+        names,
+        starts,
+        tax_rates,
+        threshold_starts,
+        thresholds,
+        ordinals,
+        quantities,
+        strikes,
+        prices,
+        kinds,
+    ):
+        self.names = names
+        self.starts = starts
+        self.tax_rates = tax_rates
+        self.threshold_starts = threshold_starts
+        self.thresholds = thresholds
+        self.ordinals = ordinals
+        self.quantities = quantities
+        self.strikes = strikes
+        self.prices = prices
+        self.kinds = kinds
+
+    def __len__(self):
+        return len(self.tax_rates)
+
+    def amounts(self):
+        """Every config's threshold amounts, largest first"""
+        return sorted(set(self.thresholds), reverse=True)
+
+    @staticmethod
+    def from_configs(named_configs):
+        """
+        Build a table from (name, config) pairs of configs that have all their
+        prices. Every symbol of each config is included, at its flat tax_rate.
+        """
+        table = CohortTable(
+            [],
+            array("q", [0]),
+            array("d"),
+            array("q", [0]),
+            array("d"),
+            array("q"),
+            array("d"),
+            array("d"),
+            array("d"),
+            array("b"),
+        )
+        for name, config in named_configs:
+            prices = symbol_prices(config["price"], config)
+            rows = []
+            for symbol in config_symbols(config):
+                tranches = Tranches.from_config(config, symbol)
+                price = prices[symbol]
+                rows.extend(
+                    (ordinal, quantity, strike, price, kind)
+                    for ordinal, quantity, strike, kind in zip(
+                        tranches.ordinals,
+                        tranches.quantities,
+                        tranches.strikes,
+                        tranches.kinds,
+                    )
+                )
+            rows.sort(key=_first)
+            for ordinal, quantity, strike, price, kind in rows:
+                table.ordinals.append(ordinal)
+                table.quantities.append(quantity)
+                table.strikes.append(strike)
+                table.prices.append(price)
+                table.kinds.append(kind)
+            table.names.append(name)
+            table.starts.append(len(table.ordinals))
+            table.tax_rates.append(config["tax_rate"])
+            table.thresholds.extend(dict.fromkeys(config.get("thresholds", [])))
+            table.threshold_starts.append(len(table.thresholds))
+        return table
+
+    def to_shared_memory(self):
+        """
+        A new SharedMemory block holding the table's columns, see from_buffer.
+        The caller closes and unlinks it.
+        """
+        layout, size = _layout(len(self), len(self.ordinals), len(self.thresholds))
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for column, typecode, _, offset in layout:
+            data = array(typecode, getattr(self, column)).tobytes()
+            block.buf[offset : offset + len(data)] = data
+        return block
+
+    @staticmethod
+    def from_buffer(buffer, configs, rows, thresholds):
+        """A table (without names) of views over columns laid out by to_shared_memory"""
+        layout, _ = _layout(configs, rows, thresholds)
+        columns = {
+            column: buffer[offset : offset + length * _ITEMSIZE[typecode]].cast(
+                typecode
+            )
+            for column, typecode, length, offset in layout
+        }
+        return CohortTable(None, **columns)
+
+    def release(self):
+        """Let go of the views from from_buffer, so their buffer can be closed"""
+        for column, _, _, _ in _layout(0, 0, 0)[0]:
+            view = getattr(self, column)
+            if isinstance(view, memoryview):
+                view.release()
+
+
+_ITEMSIZE = {"q": 8, "d": 8, "b": 1}
+
+
+def _first(row):
+    return row[0]
+
+
+def _layout(configs, rows, thresholds):
+    """
+    (column, typecode, length, offset) of each column in shared memory, and the
+    total size. Each column starts on an 8 byte boundary.
+    """
+    columns = [
+        ("starts", "q", configs + 1),
+        ("tax_rates", "d", configs),
+        ("threshold_starts", "q", configs + 1),
+        ("thresholds", "d", thresholds),
+        ("ordinals", "q", rows),
+        ("quantities", "d", rows),
+        ("strikes", "d", rows),
+        ("prices", "d", rows),
+        ("kinds", "b", rows),
+    ]
+    layout = []
+    offset = 0
+    for column, typecode, length in columns:
+        layout.append((column, typecode, length, offset))
+        offset += (length * _ITEMSIZE[typecode] + 7) // 8 * 8
+    return layout, offset
+
+
+def summarize_cohort(table, interval, as_of=None, jobs=None):
+    """
+    A CohortBin for each schedule bin (of interval) that anything in the table
+    vests in, or any threshold is crossed in, in order
+
+    crossings are in the same order as table.amounts(). With jobs other than 1
+    (and a table of at least MIN_PARALLEL_ROWS tranches) the configs are split
+    between a pool of worker processes; jobs=None means one per CPU.
+    """
+    amounts = table.amounts()
+    today = (as_of or date.today()).toordinal()
+    if jobs == 1 or len(table.ordinals) < MIN_PARALLEL_ROWS:
+        parts = [_summarize_range(table, 0, len(table), interval, amounts, today)]
+    else:
+        parts = _summarize_shared(table, interval, amounts, today, jobs)
+
+    values = Counter()
+    employees = Counter()
+    crossings = [Counter() for _ in amounts]
+    for part_values, part_employees, part_crossings in parts:
+        values.update(part_values)
+        employees.update(part_employees)
+        for total, part in zip(crossings, part_crossings):
+            total.update(part)
+    keys = sorted(set(values).union(*crossings))
+    return [
+        CohortBin(
+            ScheduleBin(key, interval),
+            values[key],
+            employees[key],
+            [counts[key] for counts in crossings],
+        )
+        for key in keys
+    ]
+
+
+def _summarize_shared(table, interval, amounts, today, jobs):
+    workers = jobs or os.cpu_count() or 1
+    block = table.to_shared_memory()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            sizes = (len(table), len(table.ordinals), len(table.thresholds))
+            tasks = [
+                (block.name, sizes, start, end, interval, amounts, today)
+                for start, end in _split(table.starts, workers * 4)
+            ]
+            return list(executor.map(_summarize_task, tasks))
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _split(starts, pieces):
+    """Split the configs into up to pieces ranges, with about as many rows in each"""
+    configs = len(starts) - 1
+    rows = starts[-1]
+    ranges = []
+    start = 0
+    for piece in range(1, pieces + 1):
+        # the first config whose rows start at or past this piece's share
+        end = start
+        while end < configs and starts[end] < rows * piece / pieces:
+            end += 1
+        if piece == pieces:
+            end = configs
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _summarize_task(task):
+    name, sizes, start, end, interval, amounts, today = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        table = CohortTable.from_buffer(block.buf, *sizes)
+        try:
+            return _summarize_range(table, start, end, interval, amounts, today)
+        finally:
+            table.release()
+    finally:
+        block.close()
+
+
+def _summarize_range(table, start, end, interval, amounts, today):
+    """Partial CohortBin totals for configs start to end, as plain Counters keyed by bin key"""
+    values = Counter()
+    employees = Counter()
+    crossings = [Counter() for _ in amounts]
+    position_of = {amount: position for position, amount in enumerate(amounts)}
+    ordinals = table.ordinals
+    for config in range(start, end):
+        first, last = table.starts[config], table.starts[config + 1]
+        after_tax = 1.0 - table.tax_rates[config]
+        keys = set()
+        cumulative = []
+        running = 0.0
+        for row in range(first, last):
+            price = table.prices[row]
+            quantity = table.quantities[row]
+            if table.kinds[row] == RSU:
+                value = price * quantity
+            else:
+                value = max(price * quantity - quantity * table.strikes[row], 0.0)
+            value *= after_tax
+            key = VESTED if ordinals[row] <= today else interval.key(ordinals[row])
+            values[key] += value
+            keys.add(key)
+            running += value
+            cumulative.append(running)
+        employees.update(keys)
+        own = table.thresholds[
+            table.threshold_starts[config] : table.threshold_starts[config + 1]
+        ]
+        thresholds = sweep_thresholds(ordinals[first:last], cumulative, own)
+        for amount, threshold in zip(own, thresholds):
+            counts = crossings[position_of[amount]]
+            if threshold is None or threshold.date <= today:
+                counts[VESTED] += 1
+            else:
+                counts[interval.key(threshold.date)] += 1
+    return values, employees, crossings
+
+
+def format_cohort_table(cohort_bins, amounts):
+    """Lines of a table of the bins, with a column of crossings per amount"""
+    from util import format_currency, format_table
+
+    header = ["Period", "Vesting", "Employees"]
+    header += [f"< {format_currency(amount)}" for amount in amounts]
+    rows = [header]
+    for cohort_bin in cohort_bins:
+        row = [
+            str(cohort_bin.schedule_bin),
+            format_currency(cohort_bin.value),
+            f"{cohort_bin.employees:,}",
+        ]
+        row += [f"{count:,}" for count in cohort_bin.crossings]
+        rows.append(row)
+    return format_table(rows)
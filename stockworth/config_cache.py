@@ -0,0 +1,196 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import hashlib
+import json
+import mmap
+import os
+from array import array
+
+from instrumentation import count
+from tranches import Tranches, config_symbols
+
+# Compiled configs
+#
+# A config with tens of thousands of tranches spends most of a run in json.loads
+# and parsing vest dates. The compiled form of a config file is its tranches,
+# already expanded and sorted, as raw columns that are memory-mapped and handed
+# to Tranches as memoryviews, without parsing or copying anything. The rest of
+# the config (everything but its rsus, options and grants) is kept as json.
+#
+# Layout, in native byte order:
+#   8 bytes   _MAGIC
+#   8 bytes   length of the header
+#   header    json: the source file's mtime_ns, size and sha256, the rest of the
+#             config, and [symbol, offset, count] for each symbol's tranches,
+#             padded to a multiple of 8 bytes
+#   columns   for each symbol, from its offset after the header: ordinals
+#             (int64), quantities, strikes and vest prices (float64), then
+#             kinds (int8, padded to a multiple of 8 bytes)
+
+_MAGIC = b"swcfg1\0\0"
+
+# Smaller config files are quicker to parse than to check against the cache
+DEFAULT_MIN_SIZE = 256 * 1024
+
+_TRANCHE_KEYS = ("rsus", "options", "grants")
+
+
+class CompiledConfigCache:
+    """
+    Keeps a compiled copy of each large config file read through it, in cache_dir
+
+    A compiled copy is used while the source file has the mtime and size it was
+    compiled from, or failing that, the same sha256. Configs loaded from one
+    have a "compiled_tranches" entry mapping each symbol to its Tranches, which
+    Tranches.from_config uses instead of the config's entries. Those Tranches
+    are read-only.
+    """
+
+    def __init__(self, cache_dir, min_size=DEFAULT_MIN_SIZE):
+        self.cache_dir = cache_dir
+        self.min_size = min_size
+
+    def _path(self, source_path):
+        name = hashlib.sha256(os.path.abspath(source_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, name[:32] + ".config")
+
+    def load(self, path):
+        """The config in the json file at path, compiling it if need be"""
+        stat = os.stat(path)
+        if stat.st_size < self.min_size:
+            with open(path, "rb") as config_file:
+                return json.loads(config_file.read())
+
+        cache_path = self._path(path)
+        mapped = _map(cache_path)
+        if mapped is not None:
+            header, columns = mapped
+            if (header["mtime_ns"], header["size"]) == (stat.st_mtime_ns, stat.st_size):
+                count("compiled config hits")
+                return _compiled_config(header, columns)
+
+        with open(path, "rb") as config_file:
+            source = config_file.read()
+        digest = hashlib.sha256(source).hexdigest()
+        if mapped is not None and header["sha256"] == digest:
+            # touched, but not changed
+            count("compiled config hits")
+            return _compiled_config(header, columns)
+
+        count("compiled config misses")
+        config = json.loads(source)
+        try:
+            self.store(cache_path, config, stat, digest)
+        except (KeyError, TypeError, ValueError, OSError):
+            pass  # a config that doesn't compile fails as usual once it is used
+        return config
+
+    def store(self, cache_path, config, stat, digest):
+        everything = dict(config, use_rsus=True, use_nsos=True)
+        symbols = []
+        columns = []
+        offset = 0
+        for symbol in config_symbols(config):
+            tranches = Tranches.from_config(everything, symbol)
+            symbols.append([symbol, offset, len(tranches)])
+            columns.append(tranches)
+            offset += _columns_size(len(tranches))
+        header = json.dumps(
+            {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "config": {
+                    key: value
+                    for key, value in config.items()
+                    if key not in _TRANCHE_KEYS
+                },
+                "symbols": symbols,
+            }
+        ).encode()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written to the side and renamed, so a reader never sees half a file
+        with open(cache_path + ".tmp", "wb") as cache_file:
+            cache_file.write(_MAGIC)
+            array("q", [len(header)]).tofile(cache_file)
+            cache_file.write(header.ljust(_padded(len(header)), b" "))
+            for tranches in columns:
+                array("q", tranches.ordinals).tofile(cache_file)
+                array("d", tranches.quantities).tofile(cache_file)
+                array("d", tranches.strikes).tofile(cache_file)
+                array("d", tranches.vest_prices).tofile(cache_file)
+                kinds = array("b", tranches.kinds)
+                kinds.extend(bytes(_padded(len(kinds)) - len(kinds)))
+                kinds.tofile(cache_file)
+        os.replace(cache_path + ".tmp", cache_path)
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+def _columns_size(length):
+    return 32 * length + _padded(length)
+
+
+def _map(cache_path):
+    """The header and columns of a compiled config, or None if there isn't a good one"""
+    try:
+        with open(cache_path, "rb") as cache_file:
+            mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    view = memoryview(mapped)
+    if len(view) < 16 or view[:8] != _MAGIC:
+        return None
+    header_size = view[8:16].cast("q")[0]
+    try:
+        header = json.loads(bytes(view[16 : 16 + header_size]))
+    except ValueError:
+        return None
+    columns = view[16 + _padded(header_size) :]
+    needed = sum(_columns_size(length) for _, _, length in header["symbols"])
+    if len(columns) < needed:
+        return None
+    return header, columns
+
+
+def _compiled_config(header, columns):
+    config = header["config"]
+    config["compiled_tranches"] = {
+        symbol: _tranches_at(columns, offset, length)
+        for symbol, offset, length in header["symbols"]
+    }
+    return config
+
+
+def _tranches_at(columns, offset, length):
+    def column(index, typecode):
+        start = offset + 8 * length * index
+        return columns[start : start + 8 * length].cast(typecode)
+
+    kinds_start = offset + 32 * length
+    return Tranches(
+        column(0, "q"),
+        column(1, "d"),
+        column(2, "d"),
+        columns[kinds_start : kinds_start + length].cast("b"),
+        column(3, "d"),
+    )
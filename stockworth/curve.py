@@ -0,0 +1,85 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+
+"""
+The vested and unvested value of some equity on one day
+"""
+CurvePoint = namedtuple("CurvePoint", ["date", "vested_value", "unvested_value"])
+
+CURVE_FIELDS = CurvePoint._fields
+
+
+class VestingCurve:
+    """
+    The value vested by any date, as a step function
+
+    Kept as the distinct vest dates (as ordinals) in ascending order and the
+    cumulative value vested by each, so it is built once (see
+    EquityGroup.vesting_curve) and each date asked about afterwards is a binary
+    search. A run of consecutive days, as daily() gives, is a single sweep.
+    """
+
+    def __init__(self, ordinals, cumulative):
+        self.ordinals = ordinals
+        self.cumulative = cumulative
+
+    @property
+    def total(self):
+        return self.cumulative[-1] if self.cumulative else 0.0
+
+    @property
+    def final_date(self):
+        """The date the last of the equity vests, or None if there is none"""
+        return date.fromordinal(self.ordinals[-1]) if self.ordinals else None
+
+    def vested_at(self, dates):
+        """The value vested on or before each of dates"""
+        return [
+            self._vested_through(bisect_right(self.ordinals, d.toordinal()))
+            for d in dates
+        ]
+
+    def unvested_at(self, dates):
+        """The value still to vest after each of dates"""
+        total = self.total
+        return [total - vested for vested in self.vested_at(dates)]
+
+    def daily(self, start=None, end=None):
+        """
+        A CurvePoint for every day from start (defaulting to today) to end
+        (defaulting to the final vest date, or start if that is later), inclusive
+        """
+        start = (start or date.today()).toordinal()
+        if end is not None:
+            end = end.toordinal()
+        else:
+            end = max(self.ordinals[-1] if self.ordinals else start, start)
+        total = self.total
+        position = bisect_right(self.ordinals, start)
+        for ordinal in range(start, end + 1):
+            while position < len(self.ordinals) and self.ordinals[position] <= ordinal:
+                position += 1
+            vested = self._vested_through(position)
+            yield CurvePoint(date.fromordinal(ordinal), vested, total - vested)
+
+    def _vested_through(self, count):
+        return self.cumulative[count - 1] if count else 0.0
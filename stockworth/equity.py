@@ -19,6 +19,11 @@
 import locale
 from datetime import date
 
+# Grant types. Equity made directly from a value (rather than from a RSU or
+# option) has a kind of None.
+RSU = 0
+NSO = 1
+
 
 class Equity:
     """
@@ -26,14 +31,32 @@ class Equity:
 
     This is not very useful by itself, but is used to build a EquityGroup,
     which can model a RSU or NSO grant with multiple vesting dates.
+
+    Equity created with from_rsu/from_option remembers what its value was computed
+    from, so it can be repriced or retaxed later.
     """
 
+    __slots__ = (
+        "date",
+        "value",
+        "kind",
+        "quantity",
+        "strike_price",
+        "price",
+        "tax_rate",
+    )
+
     # Accept either a date object or an ISO8601 date string
     def __init__(self, vest_date, value):
         self.date = (
             vest_date if isinstance(vest_date, date) else date.fromisoformat(vest_date)
         )
         self.value = value
+        self.kind = None
+        self.quantity = None
+        self.strike_price = 0.0
+        self.price = None
+        self.tax_rate = 0.0
 
     def __repr__(self):
         return f"({self.date} -> {locale.currency(self.value)})"
@@ -42,18 +65,50 @@ class Equity:
         """The value of the equity at a given date"""
         return self.value if target_date >= self.date else 0.0
 
+    def reprice(self, new_price):
+        self._check_repriceable()
+        self.price = new_price
+        self._revalue()
+
+    def retax(self, tax_rate):
+        self._check_repriceable()
+        self.tax_rate = tax_rate
+        self._revalue()
+
+    def _check_repriceable(self):
+        if self.kind is None:
+            raise ValueError("Only equity from a RSU or option can be repriced")
+
+    def _revalue(self):
+        if self.kind == RSU:
+            value = self.price * self.quantity
+        else:
+            purchase_price = self.quantity * self.strike_price
+            sale_price = self.price * self.quantity
+            value = max(
+                sale_price - purchase_price, 0.0
+            )  # options have a minimum value of worthless
+        self.value = value * (1.0 - self.tax_rate)
+
+    @staticmethod
+    def _from_grant(kind, current_price, quantity, vest_date, strike_price, tax_rate):
+        equity = Equity(vest_date, 0.0)
+        equity.kind = kind
+        equity.quantity = quantity
+        equity.strike_price = strike_price
+        equity.price = current_price
+        equity.tax_rate = tax_rate
+        equity._revalue()
+        return equity
+
     @staticmethod
     def from_rsu(current_price, quantity, vest_date, tax_rate):
-        value = current_price * quantity
-        after_tax_value = value * (1.0 - tax_rate)
-        return Equity(vest_date, after_tax_value)
+        return Equity._from_grant(
+            RSU, current_price, quantity, vest_date, 0.0, tax_rate
+        )
 
     @staticmethod
     def from_option(current_price, quantity, vest_date, strike_price, tax_rate):
-        purchase_price = quantity * strike_price
-        sale_price = current_price * quantity
-        value = max(
-            sale_price - purchase_price, 0.0
-        )  # options have a minimum value of worthless
-        after_tax_value = value * (1.0 - tax_rate)
-        return Equity(vest_date, after_tax_value)
+        return Equity._from_grant(
+            NSO, current_price, quantity, vest_date, strike_price, tax_rate
+        )
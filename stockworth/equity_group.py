@@ -16,46 +16,444 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
+import math
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import date
 
+from curve import VestingCurve
+from equity import Equity
+from price_target import PriceTarget
+from schedule_bin import bin_ends
 from threshold import Threshold
+from tranches import Tranches
 
 
 class EquityGroup:
-    """Models a RSU or NSO grant with multiple vesting dates"""
+    """
+    Models a RSU or NSO grant with multiple vesting dates
+
+    Stored as two flat arrays rather than a list of Equity objects: the vest date
+    of each piece of equity as an ordinal day, and its value. That is 16 bytes per
+    piece of equity, and equity_list hands out Equity objects on demand for code
+    that wants them.
+
+    A group built from RSUs and options (with from_tranches, or from Equity made
+    by from_rsu/from_option at a common price and tax rate) also keeps their
+    quantities and strike prices, so it can be repriced or retaxed in place.
+    """
 
     def __init__(self, equity_list):
-        self.equity_list = equity_list
-        self.vesting_dates = set(e.date for e in equity_list)
+        self.ordinals = array("l")
+        self._values = array("d")
+        self.tranches = Tranches(array("l"), array("d"), array("d"), array("b"))
+        # from_tranches shares the caller's tranches, which add copies before changing
+        self._shared_tranches = False
+        self.price = 0.0
+        self.tax_rate = 0.0
+        self._index = None
+        for e in equity_list:
+            self.add(e)
+
+    @staticmethod
+    def from_columns(ordinals, values):
+        """Build a group straight from vest date ordinals and values, without Equity objects"""
+        group = EquityGroup(())
+        group.ordinals = array("l", ordinals)
+        group._values = array("d", values)
+        group.tranches = None
+        return group
+
+    @staticmethod
+    def from_tranches(tranches, price, tax_rate):
+        """Build a group that values tranches at price, and can be repriced later"""
+        group = EquityGroup(())
+        group.ordinals = array("l", tranches.ordinals)
+        group._values = None  # computed when first needed
+        group.tranches = tranches
+        group._shared_tranches = True
+        group.price = price
+        group.tax_rate = tax_rate
+        return group
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    @property
+    def values(self):
+        if self._values is None:
+            self._values = array("d", self.tranches.values(self.price, self.tax_rate))
+        return self._values
+
+    @property
+    def equity_list(self):
+        return [
+            Equity(date.fromordinal(ordinal), value)
+            for ordinal, value in zip(self.ordinals, self.values)
+        ]
+
+    @property
+    def vesting_dates(self):
+        return set(date.fromordinal(ordinal) for ordinal in set(self.ordinals))
+
+    def add(self, equity):
+        """Add a piece of equity to the group"""
+        values = self.values
+        self.ordinals.append(equity.date.toordinal())
+        values.append(equity.value)
+        if self.tranches is not None:
+            if equity.kind is None or (
+                len(self.tranches) > 0
+                and (equity.price, equity.tax_rate) != (self.price, self.tax_rate)
+            ):
+                self.tranches = None  # can't be repriced as a whole any more
+            else:
+                if self._shared_tranches:
+                    self.tranches = self.tranches.copy()
+                    self._shared_tranches = False
+                self.tranches.ordinals.append(equity.date.toordinal())
+                self.tranches.quantities.append(equity.quantity)
+                self.tranches.strikes.append(equity.strike_price)
+                self.tranches.kinds.append(equity.kind)
+                if self.tranches.vest_prices is not None:
+                    self.tranches.vest_prices.append(math.nan)
+                self.price = equity.price
+                self.tax_rate = equity.tax_rate
+        self._index = None
+
+    def reprice(self, new_price):
+        """Revalue the group at a new price, without rebuilding it"""
+        self._check_repriceable()
+        self.price = new_price
+        self._values = None
+        if self._index is not None:
+            self._index.reprice(new_price)
+
+    def retax(self, tax_rate):
+        """Revalue the group with a new tax rate, without rebuilding it"""
+        self._check_repriceable()
+        self.tax_rate = tax_rate
+        self._values = None
+        if self._index is not None:
+            self._index.retax(tax_rate)
+
+    def _check_repriceable(self):
+        if self.tranches is None:
+            raise ValueError("Only a group of RSUs and options can be repriced")
+
+    def _get_index(self):
+        """Built lazily and cached, so that every lookup afterwards is a binary search"""
+        if self._index is None:
+            if self.tranches is None:
+                self._index = _CumulativeIndex(self.ordinals, self.values)
+            else:
+                self._index = _PriceIndex(self.tranches, self.price, self.tax_rate)
+        return self._index
 
     def total_value(self):
         """The value after all equities in the group have vested"""
-        return sum(e.value for e in self.equity_list)
+        return self._get_index().total()
 
-    def vested_value(self):
-        """The value of the group today"""
-        return self.value_at(date.today())
+    def vested_value(self, as_of=None):
+        """The value of the group vested as of a date, defaulting to today"""
+        return self.value_at(as_of or date.today())
 
     def value_at(self, target_date):
         """The value of the group at a given date"""
-        return sum(e.value_at(target_date) for e in self.equity_list)
+        index = self._get_index()
+        return index.value_through(
+            bisect_right(index.ordinals, target_date.toordinal())
+        )
+
+    def vesting_curve(self):
+        """A VestingCurve of the value vested by any date, at the group's current price"""
+        index = self._get_index()
+        if not isinstance(index, _CumulativeIndex):
+            index = _CumulativeIndex(self.ordinals, self.values)
+        return VestingCurve(index.ordinals, index.cumulative)
+
+    def binned_values(self, interval, today=None):
+        """(ScheduleBin, value) pairs in ascending order, see schedule_bin.bin_ends"""
+        index = self._get_index()
+        bins = []
+        previous = 0.0
+        for schedule_bin, end in bin_ends(index.ordinals, interval, today):
+            value = index.value_through(end)
+            bins.append((schedule_bin, value - previous))
+            previous = value
+        return bins
 
     def compute_thresholds(self, amounts):
-        return list(map(lambda amount: self.compute_threshold(amount), amounts))
+        """Compute a threshold for each amount, returned in the same order as amounts"""
+        amounts = list(amounts)
+        index = self._get_index()
+        total = index.total()
+        positions = index.positions_reaching([total - amount for amount in amounts])
+        return [
+            (
+                Threshold(amount, date.fromordinal(index.ordinals[position]))
+                if position < len(index.ordinals)
+                else None
+            )
+            for amount, position in zip(amounts, positions)
+        ]
 
     def compute_threshold(self, amount):
         """
         Compute a threshold for this equity group
         For an amount X, the threshold date is when this group's unvested equity will be less than X.
         """
-        # We don't expect to have more than 10s of entries, so a linear search is fine
-        # Iterate through all vesting dates in ascending order, until we find one where
-        # the unvested value is less than the threshold amount.
+        # Find the first vesting date where the unvested value is less than the threshold amount.
         # All equity vests _eventually_, at which point unvested will be 0,
         # so we're guaranteed to find an answer.
+        index = self._get_index()
+        position = index.first_reaching(index.total() - amount)
+        if position < len(index.ordinals):
+            return Threshold(amount, date.fromordinal(index.ordinals[position]))
+
+    def prices_for_unvested(self, amounts, on_date=None):
+        """
+        The price at which the equity still unvested after on_date (defaulting to
+        today) is worth each amount, as a PriceTarget per amount in the same order
+        """
+        cutoff = (on_date or date.today()).toordinal()
+        return self._solve_prices(amounts, lambda ordinal: ordinal > cutoff)
+
+    def prices_for_vested(self, amounts, by_date=None):
+        """
+        The price at which the equity vested on or before by_date (defaulting to all
+        of it) is worth each amount, as a PriceTarget per amount in the same order
+        """
+        cutoff = math.inf if by_date is None else by_date.toordinal()
+        return self._solve_prices(amounts, lambda ordinal: ordinal <= cutoff)
+
+    def _solve_prices(self, amounts, include):
+        self._check_repriceable()
+        tranches = self.tranches
+        solver = _PriceSolver(
+            (
+                (strike, quantity)
+                for ordinal, quantity, strike in zip(
+                    tranches.ordinals, tranches.quantities, tranches.strikes
+                )
+                if include(ordinal)
+            ),
+            self.tax_rate,
+        )
+        return [PriceTarget(amount, solver.price_for(amount)) for amount in amounts]
+
+
+class _PriceSolver:
+    """
+    Solves for the price at which some RSUs and options are worth a given amount
+
+    At a price P, they are worth after_tax * (P * Q - K), where Q and K are the
+    total quantity and strike cost of the tranches with a strike below P. That is
+    piecewise linear and rising in P, with a kink at each strike. Sorted by strike,
+    the value at each strike is a breakpoint, so the piece an amount falls on is a
+    binary search away, and the price on that piece follows exactly from Q and K.
+    """
+
+    def __init__(self, strikes_and_quantities, tax_rate):
+        self.after_tax = 1.0 - tax_rate
+        self._breakpoints = array("d")
+        self._quantities = array("d")
+        self._purchase_prices = array("d")
+        quantity = purchase_price = 0.0
+        for strike, tranche_quantity in sorted(strikes_and_quantities):
+            self._breakpoints.append(
+                self.after_tax * (strike * quantity - purchase_price)
+            )
+            quantity += tranche_quantity
+            purchase_price += tranche_quantity * strike
+            self._quantities.append(quantity)
+            self._purchase_prices.append(purchase_price)
+
+    def price_for(self, amount):
+        if amount <= 0.0:
+            return 0.0
+        # the number of tranches in the money at the price we're after
+        count = bisect_right(self._breakpoints, amount)
+        if count == 0 or self.after_tax <= 0.0 or self._quantities[count - 1] <= 0.0:
+            return None
+        return (
+            amount / self.after_tax + self._purchase_prices[count - 1]
+        ) / self._quantities[count - 1]
+
+
+class _CumulativeIndex:
+    """Sorted vesting date ordinals, and the cumulative value vested on or before each of them"""
+
+    def __init__(self, ordinals, values):
+        order = sorted(range(len(ordinals)), key=ordinals.__getitem__)
+        self.ordinals = array("l")
+        self.cumulative = array("d")
+        running = 0.0
+        for i in order:
+            running += values[i]
+            if self.ordinals and self.ordinals[-1] == ordinals[i]:
+                self.cumulative[-1] = running
+            else:
+                self.ordinals.append(ordinals[i])
+                self.cumulative.append(running)
+
+    def total(self):
+        return self.cumulative[-1] if self.cumulative else 0.0
+
+    def value_through(self, count):
+        """The value vested on the first count vesting dates"""
+        return self.cumulative[count - 1] if count else 0.0
+
+    def first_reaching(self, needed):
+        """The position of the first vesting date by which needed has vested"""
+        return bisect_left(self.cumulative, needed)
+
+    def positions_reaching(self, needs):
+        return _sweep_positions(self.cumulative, needs)
+
+
+class _PriceIndex:
+    """
+    Like _CumulativeIndex, but for RSUs and options whose price can change
+
+    By any vesting date, the vested value is after_tax * (price * Q - K), where Q
+    and K are the total quantity and total strike cost (quantity * strike) of the
+    tranches that have vested and are in the money. A RSU is an option with a
+    strike of 0. Q and K are kept in Fenwick trees over the vesting dates, so any
+    prefix of them is O(log n) to look up or update.
+
+    Tranches are also sorted by strike, so repricing only has to move the options
+    whose strike lies between the old and the new price in or out of the money.
+    Retaxing only changes after_tax.
+    """
+
+    def __init__(self, tranches, price, tax_rate):
+        self.ordinals = array("l", sorted(set(tranches.ordinals)))
+        position_of = {ordinal: i + 1 for i, ordinal in enumerate(self.ordinals)}
+        self._positions = array("l", (position_of[o] for o in tranches.ordinals))
+        self._quantities = tranches.quantities
+        self._purchase_prices = array(
+            "d", (q * s for q, s in zip(tranches.quantities, tranches.strikes))
+        )
+        self._by_strike = sorted(range(len(tranches)), key=tranches.strikes.__getitem__)
+        self._strikes = array("d", (tranches.strikes[i] for i in self._by_strike))
+        self.after_tax = 1.0 - tax_rate
+        self.price = price
+        self._build()
+
+    def _build(self):
+        size = len(self.ordinals) + 1
+        self._quantity_tree = array("d", bytes(8 * size))
+        self._purchase_tree = array("d", bytes(8 * size))
+        self._in_the_money = bisect_left(self._strikes, self.price)
+        for i in self._by_strike[: self._in_the_money]:
+            self._quantity_tree[self._positions[i]] += self._quantities[i]
+            self._purchase_tree[self._positions[i]] += self._purchase_prices[i]
+        for node in range(1, size):
+            parent = node + (node & -node)
+            if parent < size:
+                self._quantity_tree[parent] += self._quantity_tree[node]
+                self._purchase_tree[parent] += self._purchase_tree[node]
+        self._updates = 0
+
+    def reprice(self, price):
+        in_the_money = bisect_left(self._strikes, price)
+        self.price = price
+        changed = abs(in_the_money - self._in_the_money)
+        # Adding and later removing a tranche can leave rounding residue in the
+        # trees, so start afresh once there have been as many updates as tranches.
+        if self._updates + changed > len(self._strikes):
+            self._build()
+            return
+        if in_the_money > self._in_the_money:
+            for i in self._by_strike[self._in_the_money : in_the_money]:
+                self._update(i, 1.0)
+        else:
+            for i in self._by_strike[in_the_money : self._in_the_money]:
+                self._update(i, -1.0)
+        self._in_the_money = in_the_money
+        self._updates += changed
+
+    def retax(self, tax_rate):
+        self.after_tax = 1.0 - tax_rate
+
+    def _update(self, i, sign):
+        quantity = sign * self._quantities[i]
+        purchase_price = sign * self._purchase_prices[i]
+        node = self._positions[i]
+        while node < len(self._quantity_tree):
+            self._quantity_tree[node] += quantity
+            self._purchase_tree[node] += purchase_price
+            node += node & -node
+
+    def _value(self, quantity, purchase_price):
+        return self.after_tax * (self.price * quantity - purchase_price)
+
+    def total(self):
+        return self.value_through(len(self.ordinals))
+
+    def value_through(self, count):
+        """The value vested on the first count vesting dates"""
+        quantity = purchase_price = 0.0
+        node = count
+        while node > 0:
+            quantity += self._quantity_tree[node]
+            purchase_price += self._purchase_tree[node]
+            node -= node & -node
+        return self._value(quantity, purchase_price)
+
+    def first_reaching(self, needed):
+        """The position of the first vesting date by which needed has vested"""
+        # Values are rounded differently depending on how a prefix is split up in
+        # the trees. Each of the O(log n) additions can be off by a rounding error
+        # of the total, so allow that much slack and no more.
+        needed -= sys.float_info.epsilon * (len(self.ordinals) + 1) * abs(self.total())
+        position = 0
+        quantity = purchase_price = 0.0
+        step = 1 << len(self.ordinals).bit_length()
+        while step:
+            node = position + step
+            if node <= len(self.ordinals):
+                node_quantity = quantity + self._quantity_tree[node]
+                node_purchase_price = purchase_price + self._purchase_tree[node]
+                if self._value(node_quantity, node_purchase_price) < needed:
+                    position = node
+                    quantity = node_quantity
+                    purchase_price = node_purchase_price
+            step >>= 1
+        return position
+
+    def positions_reaching(self, needs):
+        return [self.first_reaching(needed) for needed in needs]
+
+
+def sweep_thresholds(dates, cumulative, amounts):
+    """
+    Compute a threshold for each amount, given dates (or date ordinals) in ascending
+    order and the cumulative value vested by each of them. Dates may repeat.
+    """
+    amounts = list(amounts)
+    total = cumulative[-1] if cumulative else 0.0
+    positions = _sweep_positions(cumulative, [total - amount for amount in amounts])
+    return [
+        Threshold(amount, dates[position]) if position < len(dates) else None
+        for amount, position in zip(amounts, positions)
+    ]
+
+
+def _sweep_positions(cumulative, needs):
+    """
+    For each needed value, the position of the first entry of cumulative (which is
+    ascending) that reaches it, or len(cumulative) if none do.
 
-        sorted_vesting_dates = sorted(self.vesting_dates)
-        for vesting_date in sorted_vesting_dates:
-            vested_at_threshold = self.total_value() - amount
-            if self.value_at(vesting_date) >= vested_at_threshold:
-                return Threshold(amount, vesting_date)
+    Smaller needs are reached earlier, so handling them in ascending order lets
+    all of them be answered in a single sweep.
+    """
+    positions = [len(cumulative)] * len(needs)
+    position = 0
+    for i in sorted(range(len(needs)), key=needs.__getitem__):
+        while position < len(cumulative) and cumulative[position] < needs[i]:
+            position += 1
+        positions[i] = position
+    return positions
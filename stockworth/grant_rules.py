@@ -0,0 +1,125 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import calendar
+import math
+from datetime import date
+
+from equity import NSO, RSU, Equity
+
+# Grant rules describe a whole RSU or NSO grant, instead of listing every tranche
+#
+#     {
+#         "type": "rsu",            # or "nso"
+#         "grant_date": "2021-03-01",
+#         "qty": 4800,
+#         "price": 6.02,            # strike price, for NSOs only
+#         "duration_months": 48,
+#         "cliff_months": 12,       # optional, defaults to no cliff
+#         "cadence_months": 1,      # optional, defaults to monthly
+#         "back_loading": [5, 15, 40, 40]  # optional, relative weight of each year
+#     }
+#
+# Nothing vests before the cliff, and at the cliff everything accrued up to then
+# vests at once. Grants with a whole number of shares vest whole shares.
+
+
+def grant_kind(grant):
+    kind = grant.get("type", "rsu").lower()
+    if kind == "rsu":
+        return RSU
+    if kind in ("nso", "option"):
+        return NSO
+    raise ValueError(f"Unknown grant type '{grant['type']}'")
+
+
+def expand_grant(grant):
+    """Generate the (vest_date, qty) tranches of a grant, in date order"""
+    grant_date = grant["grant_date"]
+    if not isinstance(grant_date, date):
+        grant_date = date.fromisoformat(grant_date)
+    total = grant["qty"]
+    whole_shares = float(total).is_integer()
+    vested = 0
+    for months, fraction in vesting_fractions(
+        grant["duration_months"],
+        grant.get("cliff_months", 0),
+        grant.get("cadence_months", 1),
+        grant.get("back_loading"),
+    ):
+        cumulative = total * fraction
+        if whole_shares:
+            # the small fudge stops e.g. 0.9999999 of a share being rounded away
+            cumulative = math.floor(cumulative + 1e-9)
+        if cumulative > vested:
+            yield add_months(grant_date, months), cumulative - vested
+            vested = cumulative
+
+
+def vesting_fractions(duration_months, cliff_months=0, cadence_months=1, weights=None):
+    """
+    Generate (months after grant, fraction of the grant vested by then) pairs,
+    one per vesting event, ending with (duration_months, 1.0)
+    """
+    if duration_months <= 0 or cadence_months <= 0:
+        raise ValueError("Grant duration and cadence must be positive")
+    years = math.ceil(duration_months / 12)
+    if weights is not None and len(weights) != years:
+        raise ValueError(
+            f"Grant back_loading needs exactly one weight per year ({years}), "
+            f"not {len(weights)}"
+        )
+
+    def fraction(months):
+        if weights is None:
+            return months / duration_months
+        year, months_into_year = divmod(months, 12)
+        # the last year may be short of 12 months
+        year_length = min(12, duration_months - year * 12)
+        accrued = sum(weights[:year])
+        if months_into_year:
+            accrued += weights[year] * months_into_year / year_length
+        return accrued / sum(weights)
+
+    months = cadence_months
+    while months < duration_months:
+        if months >= cliff_months:
+            yield months, fraction(months)
+        months += cadence_months
+    yield duration_months, 1.0
+
+
+def add_months(start, months):
+    """The same day of the month, months later (or the end of the month, if shorter)"""
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def iter_equity(grants, current_price, tax_rate):
+    """Generate an Equity for every tranche of every grant, for building an EquityGroup"""
+    for grant in grants:
+        kind = grant_kind(grant)
+        for vest_date, quantity in expand_grant(grant):
+            if kind == RSU:
+                yield Equity.from_rsu(current_price, quantity, vest_date, tax_rate)
+            else:
+                yield Equity.from_option(
+                    current_price, quantity, vest_date, grant["price"], tax_rate
+                )
@@ -0,0 +1,156 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import sys
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager, nullcontext
+
+# Where time goes and how much work gets done in a run
+#
+# Code marks out phases with `with phase("name"):` and bumps counters with
+# count("name"). Both only do anything while a Metrics is being collected into
+# (see collect), so they can sit in hot paths and cost next to nothing the rest
+# of the time. Counts made in worker processes (--jobs) stay in those processes.
+
+# The Metrics being collected into, if any
+_current = None
+
+# What phase gives out while nothing is being collected. Reusing one saves
+# making a new context manager for every phase.
+_NOT_COLLECTING = nullcontext()
+
+"""
+One phase of a run, with its wall clock and CPU time in seconds
+
+    depth is how many phases it is nested inside.
+"""
+Phase = namedtuple("Phase", ["name", "depth", "wall", "cpu"])
+
+
+class Metrics:
+    """Per-phase wall and CPU times, and counters, collected over a run"""
+
+    def __init__(self):
+        self.phases = []
+        self.counters = Counter()
+        self._depth = 0
+
+    def add_phase(self, name, wall, cpu):
+        self.phases.append(Phase(name, self._depth, wall, cpu))
+
+    def as_dict(self):
+        """The metrics as plain dicts, with the times of phases that ran more than once added up"""
+        phases = {}
+        for p in self.phases:
+            totals = phases.setdefault(p.name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+            totals["wall"] += p.wall
+            totals["cpu"] += p.cpu
+            totals["calls"] += 1
+        return {"phases": phases, "counters": dict(self.counters)}
+
+    def report(self, stream):
+        stream.write(f"{'phase':<24}{'wall ms':>10}{'cpu ms':>10}\n")
+        for p in self.phases:
+            name = "  " * p.depth + p.name
+            stream.write(f"{name:<24}{p.wall * 1000:10.1f}{p.cpu * 1000:10.1f}\n")
+        if self.counters:
+            stream.write(f"{'counter':<24}{'count':>10}\n")
+        for name, value in sorted(self.counters.items()):
+            stream.write(f"{name:<24}{value:>10,}\n")
+        loaded = [
+            name
+            for name in ("alpha_vantage", "aiohttp", "dateutil")
+            if name in sys.modules
+        ]
+        stream.write(f"{'loaded':<24}{', '.join(loaded) or 'no optional modules'}\n")
+
+
+@contextmanager
+def collect(metrics=None):
+    """
+    Collect metrics from everything run inside the block, into metrics (or a new
+    Metrics), which the block is given
+    """
+    global _current
+    previous = _current
+    _current = Metrics() if metrics is None else metrics
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+def phase(name):
+    """Time a with block as a phase of the metrics being collected, if any"""
+    if _current is None:
+        return _NOT_COLLECTING
+    return _timed_phase(_current, name)
+
+
+@contextmanager
+def _timed_phase(metrics, name):
+    # hold the phase's place, so it is listed ahead of any phases nested in it
+    index = len(metrics.phases)
+    metrics.add_phase(name, 0.0, 0.0)
+    metrics._depth += 1
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        metrics._depth -= 1
+        metrics.phases[index] = Phase(
+            name,
+            metrics._depth,
+            time.perf_counter() - wall,
+            time.process_time() - cpu,
+        )
+
+
+def count(name, amount=1):
+    """Add amount to a counter of the metrics being collected, if any"""
+    if _current is not None:
+        _current.counters[name] += amount
+
+
+@contextmanager
+def profile(path):
+    """Run the block under cProfile, and dump the stats to path for pstats to read"""
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextmanager
+def trace_memory(path):
+    """Trace allocations in the block, and dump a tracemalloc snapshot to path"""
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.take_snapshot().dump(path)
+        tracemalloc.stop()
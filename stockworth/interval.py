@@ -16,9 +16,54 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
+from datetime import date
 from enum import Enum, auto
 
 
 class Interval(Enum):
+    """
+    How finely a VestingSchedule is binned
+
+    Each bin has an integer key that increases with time, so a vest date's bin can
+    be worked out, compared and hashed without making any objects.
+    """
+
     YEARLY = auto()
     MONTHLY = auto()
+    QUARTERLY = auto()
+    WEEKLY = auto()
+
+    def key(self, ordinal):
+        """The key of the bin containing a date ordinal"""
+        if self is Interval.WEEKLY:
+            # date.fromordinal(1) is a Monday, so weeks run Monday to Sunday
+            return (ordinal - 1) // 7
+        day = date.fromordinal(ordinal)
+        if self is Interval.MONTHLY:
+            return day.year * 12 + day.month - 1
+        elif self is Interval.QUARTERLY:
+            return day.year * 4 + (day.month - 1) // 3
+        else:
+            return day.year
+
+    def start(self, key):
+        """The first day of a bin"""
+        if self is Interval.WEEKLY:
+            return date.fromordinal(key * 7 + 1)
+        elif self is Interval.MONTHLY:
+            return date(key // 12, key % 12 + 1, 1)
+        elif self is Interval.QUARTERLY:
+            return date(key // 4, key % 4 * 3 + 1, 1)
+        else:
+            return date(key, 1, 1)
+
+    def label(self, key):
+        """A bin's name, as shown in the schedule"""
+        if self is Interval.WEEKLY:
+            return self.start(key).strftime("Week of %d %b %Y")
+        elif self is Interval.MONTHLY:
+            return self.start(key).strftime("%b %Y")
+        elif self is Interval.QUARTERLY:
+            return f"Q{key % 4 + 1} {key // 4}"
+        else:
+            return str(key)
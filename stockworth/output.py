@@ -0,0 +1,189 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import csv
+import json
+
+# Output formats for results. Everything but "text" writes the raw numbers, one
+# row (a dict) per result. "ndjson" is another name for "jsonl".
+FORMATS = ("text", "json", "jsonl", "ndjson", "csv", "msgpack")
+
+VALUATION_FIELDS = [
+    "file",
+    "symbol",
+    "price",
+    "tax_rate",
+    "total_value",
+    "vested_value",
+    "unvested_value",
+    "schedule",
+    "thresholds",
+    "prices",
+    "symbol_values",
+    "as_of",
+    "error",
+]
+
+SCENARIO_FIELDS = [
+    "price",
+    "total_value",
+    "vested_value",
+    "unvested_value",
+    "schedule",
+    "thresholds",
+]
+
+TAX_SCENARIO_FIELDS = [
+    "name",
+    "total_value",
+    "vested_value",
+    "unvested_value",
+    "thresholds",
+]
+
+PRICE_TARGET_FIELDS = ["amount", "unvested_price", "vested_price"]
+
+COHORT_FIELDS = ["period", "value", "employees", "crossings"]
+
+
+def valuation_row(path, valuation, amounts):
+    return {
+        "file": path,
+        "symbol": valuation.symbol,
+        "price": valuation.price,
+        "tax_rate": valuation.tax_rate,
+        "total_value": valuation.total_value,
+        "vested_value": valuation.vested_value,
+        "unvested_value": valuation.unvested_value,
+        "schedule": schedule_dict(valuation.schedule),
+        "thresholds": thresholds_list(valuation.thresholds, amounts),
+        "prices": valuation.prices,
+        "symbol_values": valuation.symbol_values,
+        "as_of": valuation.as_of.isoformat(),
+    }
+
+
+def scenario_row(scenario, amounts):
+    """A row for one price_sweep.PriceScenario"""
+    return {
+        "price": scenario.price,
+        "total_value": scenario.total_value,
+        "vested_value": scenario.vested_value,
+        "unvested_value": scenario.unvested_value,
+        "schedule": schedule_dict(scenario.schedule),
+        "thresholds": thresholds_list(scenario.thresholds, amounts),
+    }
+
+
+def tax_scenario_row(scenario, amounts):
+    """A row for one tax.TaxScenario"""
+    return {
+        "name": scenario.name,
+        "total_value": scenario.total_value,
+        "vested_value": scenario.vested_value,
+        "unvested_value": scenario.unvested_value,
+        "thresholds": thresholds_list(scenario.thresholds, amounts),
+    }
+
+
+def price_target_row(unvested, vested):
+    """A row for the PriceTargets of the same amount from prices_for_unvested and prices_for_vested"""
+    return {
+        "amount": unvested.amount,
+        "unvested_price": unvested.price,
+        "vested_price": vested.price,
+    }
+
+
+def cohort_row(cohort_bin, amounts):
+    """A row for one cohort.CohortBin, with crossings keyed by amount"""
+    return {
+        "period": str(cohort_bin.schedule_bin),
+        "value": cohort_bin.value,
+        "employees": cohort_bin.employees,
+        "crossings": {
+            str(amount): count for amount, count in zip(amounts, cohort_bin.crossings)
+        },
+    }
+
+
+def schedule_dict(schedule):
+    return {str(key): value for key, value in schedule}
+
+
+def thresholds_list(thresholds, amounts):
+    """Thresholds as dicts, with a None date for an amount that has no threshold"""
+    return [
+        {"amount": amount, "date": t.date.isoformat() if t is not None else None}
+        for amount, t in zip(amounts, thresholds)
+    ]
+
+
+def write_rows(rows, output_format, stream, fields=VALUATION_FIELDS):
+    """
+    Write rows as they come, so a long run of them never has to be held in memory
+
+    "json" is a single array, "jsonl" (or "ndjson") has one line per row, "csv"
+    has a column per field (nested values are squashed into key=value lists) and
+    "msgpack" is one map per row, written to stream's underlying binary buffer.
+    """
+    if output_format in ("jsonl", "ndjson"):
+        for row in rows:
+            stream.write(json.dumps(row))
+            stream.write("\n")
+    elif output_format == "json":
+        separator = "[\n"
+        for row in rows:
+            stream.write(separator)
+            stream.write(json.dumps(row))
+            separator = ",\n"
+        stream.write("[]\n" if separator == "[\n" else "\n]\n")
+    elif output_format == "csv":
+        writer = csv.DictWriter(stream, fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: _squash(value) for key, value in row.items()})
+    elif output_format == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("msgpack output needs the msgpack package installed")
+        stream.flush()
+        buffer = getattr(stream, "buffer", stream)
+        packer = msgpack.Packer()
+        for row in rows:
+            buffer.write(packer.pack(row))
+        buffer.flush()
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'")
+
+
+def _squash(value):
+    """CSV is flat, so dicts become key=value lists, and lists of dicts value=value lists"""
+    if isinstance(value, dict):
+        return ";".join(f"{key}={item}" for key, item in value.items())
+    if isinstance(value, list):
+        return ";".join(
+            (
+                "=".join(str(part) for part in item.values())
+                if isinstance(item, dict)
+                else str(item)
+            )
+            for item in value
+        )
+    return value
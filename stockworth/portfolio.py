@@ -0,0 +1,118 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+from array import array
+
+from equity_group import EquityGroup
+from tax import TaxSchedule, after_tax_values
+from tranches import Tranches
+
+
+class Portfolio:
+    """
+    Equity in several symbols, valued together
+
+    Keeps an EquityGroup per symbol, so each can be repriced on its own, and
+    answers the same questions as an EquityGroup (total and vested value,
+    thresholds, schedule bins) for all of them combined. Thresholds are worked
+    out on the combined unvested value, not symbol by symbol.
+
+    symbol is the config's own symbol, which reprice applies to.
+    """
+
+    def __init__(self, groups, symbol):
+        self.groups = groups
+        self.symbol = symbol
+        self._combined = None
+
+    @staticmethod
+    def from_config(config, prices):
+        """Build a portfolio from a config, given a price for each of its symbols"""
+        tranches_by_symbol = {
+            symbol: Tranches.from_config(config, symbol) for symbol in prices
+        }
+        schedule = TaxSchedule.from_config(config)
+        if schedule is None:
+            groups = {
+                symbol: EquityGroup.from_tranches(
+                    tranches, prices[symbol], config["tax_rate"]
+                )
+                for symbol, tranches in tranches_by_symbol.items()
+            }
+        else:
+            values = after_tax_values(schedule, tranches_by_symbol, prices)
+            groups = {
+                symbol: EquityGroup.from_columns(tranches.ordinals, values[symbol])
+                for symbol, tranches in tranches_by_symbol.items()
+            }
+            for symbol, group in groups.items():
+                group.price = prices[symbol]
+        return Portfolio(groups, config["symbol"])
+
+    def __len__(self):
+        return sum(len(group) for group in self.groups.values())
+
+    @property
+    def prices(self):
+        return {symbol: group.price for symbol, group in self.groups.items()}
+
+    def reprice(self, new_price, symbol=None):
+        """Revalue one symbol's equity (by default the config's own symbol)"""
+        self.groups[symbol or self.symbol].reprice(new_price)
+        self._combined = None
+
+    def retax(self, tax_rate):
+        for group in self.groups.values():
+            group.retax(tax_rate)
+        self._combined = None
+
+    def symbol_values(self):
+        """The total value of each symbol's equity"""
+        return {symbol: group.total_value() for symbol, group in self.groups.items()}
+
+    def _get_combined(self):
+        """Every symbol's vest dates and values in one group, built lazily and cached"""
+        if self._combined is None:
+            ordinals = array("l")
+            values = array("d")
+            for group in self.groups.values():
+                ordinals.extend(group.ordinals)
+                values.extend(group.values)
+            self._combined = EquityGroup.from_columns(ordinals, values)
+        return self._combined
+
+    def total_value(self):
+        return self._get_combined().total_value()
+
+    def vested_value(self, as_of=None):
+        return self._get_combined().vested_value(as_of)
+
+    def value_at(self, target_date):
+        return self._get_combined().value_at(target_date)
+
+    def vesting_curve(self):
+        return self._get_combined().vesting_curve()
+
+    def binned_values(self, interval, today=None):
+        return self._get_combined().binned_values(interval, today)
+
+    def compute_thresholds(self, amounts):
+        return self._get_combined().compute_thresholds(amounts)
+
+    def compute_threshold(self, amount):
+        return self._get_combined().compute_threshold(amount)
@@ -0,0 +1,192 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import csv
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date
+from itertools import accumulate
+
+from instrumentation import count
+from quote_cache import last_market_close
+
+"""
+The value of a set of tranches on one day, at that day's closing price
+"""
+SeriesPoint = namedtuple(
+    "SeriesPoint", ["date", "price", "vested_value", "unvested_value"]
+)
+
+SERIES_FIELDS = SeriesPoint._fields
+
+_MAGIC = b"swc1"
+
+
+def read_daily_closes(path):
+    """
+    Read daily closing prices from a CSV file of date,close rows. Returns arrays
+    of date ordinals and closes, in date order. A header row is skipped if present.
+    """
+    rows = []
+    with open(path, "r", newline="") as closes_file:
+        for row in csv.reader(closes_file):
+            if len(row) < 2:
+                continue
+            try:
+                rows.append(
+                    (date.fromisoformat(row[0].strip()).toordinal(), float(row[1]))
+                )
+            except ValueError:
+                continue  # header, or a line we can't make sense of
+    rows.sort()
+    return array("q", (o for o, _ in rows)), array("d", (c for _, c in rows))
+
+
+class CloseCache:
+    """
+    Keeps the daily closes for each symbol in a file of its own
+
+    Each file is the date ordinals and then the closes, as raw 8 byte columns,
+    so loading decades of them is two reads straight into arrays. A file is
+    reused until there has been a market close since it was written.
+
+    Closes are fetched with the fetch callable passed to get_closes, which
+    returns (ordinals, closes) like read_daily_closes.
+    """
+
+    def __init__(self, cache_dir, now=time.time):
+        self.cache_dir = cache_dir
+        self.now = now
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol}.closes")
+
+    def lookup(self, symbol):
+        """The cached (ordinals, closes) for symbol if still good, otherwise None"""
+        cached = self._read(symbol)
+        count("close cache misses" if cached is None else "close cache hits")
+        return cached
+
+    def _read(self, symbol):
+        path = self._path(symbol)
+        try:
+            if os.path.getmtime(path) < last_market_close(self.now()):
+                return None
+            with open(path, "rb") as closes_file:
+                if closes_file.read(len(_MAGIC)) != _MAGIC:
+                    return None
+                length = array("q")
+                length.fromfile(closes_file, 1)
+                ordinals = array("q")
+                ordinals.fromfile(closes_file, length[0])
+                closes = array("d")
+                closes.fromfile(closes_file, length[0])
+        except (OSError, EOFError):
+            return None
+        return ordinals, closes
+
+    def store(self, symbol, ordinals, closes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written to the side and renamed, so a reader never sees half a file
+        path = self._path(symbol)
+        with open(path + ".tmp", "wb") as closes_file:
+            closes_file.write(_MAGIC)
+            array("q", [len(ordinals)]).tofile(closes_file)
+            array("q", ordinals).tofile(closes_file)
+            array("d", closes).tofile(closes_file)
+        os.replace(path + ".tmp", path)
+
+    def get_closes(self, symbol, fetch):
+        """The closes for symbol, calling fetch(symbol) only if the cache can't answer"""
+        cached = self.lookup(symbol)
+        if cached is not None:
+            return cached
+        ordinals, closes = fetch(symbol)
+        self.store(symbol, ordinals, closes)
+        return ordinals, closes
+
+
+def value_series(tranches, ordinals, closes, tax_rate, start=None, end=None):
+    """
+    The vested and unvested value of tranches on every day from start to end
+    (inclusive, defaulting to the first and last close), each valued at the
+    latest close on or before that day. Days before the first close are skipped.
+
+    Like _PriceIndex in equity_group, a value is after_tax * (price * Q - K) over
+    the tranches that are in the money, where Q is their quantity and K their
+    total strike cost. Tranches are ranked by strike, so the ones in the money at
+    a price are a prefix of that ranking. Prefix sums over all tranches give the
+    total value, and Fenwick trees that tranches are added to as they vest give
+    the vested value, so each day costs O(log n) however many tranches there are.
+    """
+    if not closes:
+        return []
+    start = max(start.toordinal() if start else ordinals[0], ordinals[0])
+    end = end.toordinal() if end else ordinals[-1]
+    after_tax = 1.0 - tax_rate
+
+    by_strike = sorted(range(len(tranches)), key=tranches.strikes.__getitem__)
+    strikes = [tranches.strikes[i] for i in by_strike]
+    rank = [0] * len(tranches)
+    for position, i in enumerate(by_strike):
+        rank[i] = position + 1
+    purchase_prices = [q * s for q, s in zip(tranches.quantities, tranches.strikes)]
+    total_quantity = [0.0] + list(accumulate(tranches.quantities[i] for i in by_strike))
+    total_purchase = [0.0] + list(accumulate(purchase_prices[i] for i in by_strike))
+
+    size = len(tranches) + 1
+    quantity_tree = [0.0] * size
+    purchase_tree = [0.0] * size
+
+    def vest(i):
+        node = rank[i]
+        while node < size:
+            quantity_tree[node] += tranches.quantities[i]
+            purchase_tree[node] += purchase_prices[i]
+            node += node & -node
+
+    def vested_through(count):
+        quantity = purchase_price = 0.0
+        while count > 0:
+            quantity += quantity_tree[count]
+            purchase_price += purchase_tree[count]
+            count -= count & -count
+        return quantity, purchase_price
+
+    # Tranches are in date order, so vesting is a pointer moving forwards
+    next_tranche = 0
+    next_close = bisect_right(ordinals, start)
+    points = []
+    for day in range(start, end + 1):
+        while next_tranche < len(tranches) and tranches.ordinals[next_tranche] <= day:
+            vest(next_tranche)
+            next_tranche += 1
+        while next_close < len(ordinals) and ordinals[next_close] <= day:
+            next_close += 1
+        price = closes[next_close - 1]
+        in_the_money = bisect_left(strikes, price)
+        total = after_tax * (
+            price * total_quantity[in_the_money] - total_purchase[in_the_money]
+        )
+        quantity, purchase_price = vested_through(in_the_money)
+        vested = after_tax * (price * quantity - purchase_price)
+        points.append(SeriesPoint(date.fromordinal(day), price, vested, total - vested))
+    return points
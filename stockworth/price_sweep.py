@@ -0,0 +1,135 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import argparse
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+from itertools import accumulate
+
+from equity_group import sweep_thresholds
+from schedule_bin import VESTED, bin_ends
+from util import format_currency, format_table
+
+"""
+The outcome of valuing a set of tranches at one candidate price
+
+    schedule is a list of (ScheduleBin, value) pairs in ascending order, and
+    thresholds is in the same order as the amounts that were asked for.
+"""
+PriceScenario = namedtuple(
+    "PriceScenario",
+    [
+        "price",
+        "total_value",
+        "vested_value",
+        "unvested_value",
+        "schedule",
+        "thresholds",
+    ],
+)
+
+
+def parse_price_range(text):
+    """Parse a start:stop:step string into a list of prices. stop is inclusive."""
+    try:
+        start, stop, step = (float(part) for part in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"price range must look like start:stop:step, got '{text}'"
+        )
+    if step <= 0.0 or stop < start:
+        raise argparse.ArgumentTypeError(
+            f"price range needs a positive step and start <= stop, got '{text}'"
+        )
+    # Allow a little slack so that e.g. 0.1:0.3:0.1 still includes 0.3
+    count = int((stop - start) / step + 1e-9) + 1
+    return [start + i * step for i in range(count)]
+
+
+def sweep_prices(tranches, prices, tax_rate, amounts, bin_size, today=None):
+    """
+    Value the same tranches at every price in prices
+
+    Everything that doesn't depend on price (sort order, schedule bins, which
+    tranches have already vested) is worked out once up front. Each price then
+    only costs a pass over its row of tranche values. What has vested is as of
+    today, unless another date is given.
+    """
+    return list(
+        iter_price_scenarios(tranches, prices, tax_rate, amounts, bin_size, today)
+    )
+
+
+def iter_price_scenarios(tranches, prices, tax_rate, amounts, bin_size, today=None):
+    """Like sweep_prices, but generates each scenario as soon as it is worked out"""
+    dates = tranches.dates()
+    today = today or date.today()
+    vested_count = bisect_right(tranches.ordinals, today.toordinal())
+
+    # Tranches are sorted by date, so each bin is a run of them
+    bins = bin_ends(tranches.ordinals, bin_size, today)
+
+    amounts = list(amounts)
+    for price in prices:
+        values = tranches.values(price, tax_rate)
+        cumulative = list(accumulate(values))
+        total_value = cumulative[-1] if cumulative else 0.0
+        vested_value = cumulative[vested_count - 1] if vested_count else 0.0
+        schedule = []
+        previous = 0.0
+        for schedule_bin, end in bins:
+            schedule.append((schedule_bin, cumulative[end - 1] - previous))
+            previous = cumulative[end - 1]
+        yield PriceScenario(
+            price,
+            total_value,
+            vested_value,
+            total_value - vested_value,
+            schedule,
+            sweep_thresholds(dates, cumulative, amounts),
+        )
+
+
+def format_sweep_table(scenarios, amounts, today=None):
+    """Lay out the scenarios as a table, one line per price"""
+    if not scenarios:
+        return []
+    header = ["Price", "Total", "Vested", "Unvested"]
+    # the Vested bin gets its own name, so it isn't mistaken for the Vested total
+    header += [
+        "Vested bin" if schedule_bin.key == VESTED else str(schedule_bin)
+        for schedule_bin, _ in scenarios[0].schedule
+    ]
+    header += [f"< {format_currency(amount)}" for amount in amounts]
+    rows = [header]
+    today = today or date.today()
+    for scenario in scenarios:
+        row = [
+            f"{scenario.price:,.2f}",
+            format_currency(scenario.total_value),
+            format_currency(scenario.vested_value),
+            format_currency(scenario.unvested_value),
+        ]
+        row += [format_currency(value) for _, value in scenario.schedule]
+        row += [
+            t.date.isoformat() if t is not None and t.date > today else "-"
+            for t in scenario.thresholds
+        ]
+        rows.append(row)
+    return format_table(rows)
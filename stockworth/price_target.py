@@ -0,0 +1,31 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+from collections import namedtuple
+
+"""
+A price target is the share price at which some of your equity is worth an amount
+
+    It answers the inverse of a threshold: "What would the stock have to close at for
+    my unvested equity to be worth X", or "for what I've vested by some date to be
+    worth X". The price is None when no price gets there, e.g. for a group with
+    nothing unvested.
+
+    Price targets are created using the `prices_for_unvested` and
+    `prices_for_vested` methods of an EquityGroup.
+"""
+PriceTarget = namedtuple("PriceTarget", ["amount", "price"])
@@ -0,0 +1,216 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+from array import array
+from datetime import date
+
+from instrumentation import count
+
+# Where quotes come from
+#
+# A price provider has fetch_prices(symbols), which maps each symbol to its price
+# (or to the exception explaining why it has none), and fetch_prices_async, the
+# same for code already running in an event loop. All the symbols a run needs
+# are asked for in one call, so a provider that can look up many symbols in one
+# request gets to. cacheable says whether its quotes go through the quote cache;
+# local fixtures are read afresh every time instead.
+#
+# The config's "price_provider" picks one, either by name or as an object with a
+# "type" and its settings:
+#   "alpha_vantage"       the quote endpoint, a request per symbol (the default)
+#   "alpha_vantage_bulk"  the bulk quotes endpoint, up to 100 symbols a request
+#   "csv"                 symbol,price rows from "path"
+#   "sqlite"              the quotes table of "path", e.g. a copied quote cache
+#   "static"              "prices" given inline, or a json object in "path"
+# Fixtures ignore how old their prices are, so they work fully offline.
+
+
+class AlphaVantageProvider:
+    """Quotes from Alpha Vantage, fetched concurrently and rate limited (see async_quotes)"""
+
+    cacheable = True
+
+    def __init__(self, api_key, bulk=False, **fetcher_options):
+        self.api_key = api_key
+        self.bulk = bulk
+        self.fetcher_options = fetcher_options
+        self._fetcher = None
+
+    def fetch_prices(self, symbols):
+        symbols = list(symbols)
+        if len(symbols) == 1 and not self.bulk:
+            # alpha_vantage's own client is quicker to start for a single quote
+            try:
+                return {symbols[0]: fetch_latest_price(symbols[0], self.api_key)}
+            except Exception as e:
+                return {symbols[0]: e}
+        return asyncio.run(self._new_fetcher().fetch_prices(symbols))
+
+    async def fetch_prices_async(self, symbols):
+        # One fetcher for the life of the provider, so its rate limit holds
+        # across calls
+        if self._fetcher is None:
+            self._fetcher = self._new_fetcher()
+        return await self._fetcher.fetch_prices(list(symbols))
+
+    def _new_fetcher(self):
+        from async_quotes import AsyncQuoteFetcher
+
+        return AsyncQuoteFetcher(self.api_key, bulk=self.bulk, **self.fetcher_options)
+
+
+class StaticPrices:
+    """Fixed prices, from a dict of symbol to price"""
+
+    cacheable = False
+
+    def __init__(self, prices, source="the config"):
+        self.prices = prices
+        self.source = source
+
+    def fetch_prices(self, symbols):
+        prices = self.read()
+        return {
+            symbol: (
+                float(prices[symbol])
+                if symbol in prices
+                else ValueError(f"No price for {symbol} in {self.source}")
+            )
+            for symbol in symbols
+        }
+
+    async def fetch_prices_async(self, symbols):
+        return self.fetch_prices(symbols)
+
+    def read(self):
+        return self.prices
+
+
+class JsonPrices(StaticPrices):
+    """Prices from a json file holding an object of symbol to price"""
+
+    def __init__(self, path):
+        super().__init__(None, path)
+
+    def read(self):
+        with open(self.source, "r") as prices_file:
+            return json.load(prices_file)
+
+
+class CsvPrices(StaticPrices):
+    """Prices from a CSV file of symbol,price rows. A header row is skipped if present."""
+
+    def __init__(self, path):
+        super().__init__(None, path)
+
+    def read(self):
+        prices = {}
+        with open(self.source, "r", newline="") as prices_file:
+            for row in csv.reader(prices_file):
+                if len(row) < 2:
+                    continue
+                try:
+                    prices[row[0].strip()] = float(row[1])
+                except ValueError:
+                    continue  # header, or a line we can't make sense of
+        return prices
+
+
+class SqlitePrices(StaticPrices):
+    """Prices from the quotes table of a SQLite database, laid out like quote_cache's"""
+
+    def __init__(self, path):
+        super().__init__(None, path)
+
+    def read(self):
+        # read-only, so a missing file is an error rather than a new empty database
+        connection = sqlite3.connect(f"file:{self.source}?mode=ro", uri=True)
+        try:
+            return dict(connection.execute("SELECT symbol, price FROM quotes"))
+        finally:
+            connection.close()
+
+
+_FIXTURES = {"csv": CsvPrices, "sqlite": SqlitePrices}
+
+
+def provider_from_config(config):
+    """The price provider the config asks for, see above"""
+    spec = config.get("price_provider", "alpha_vantage")
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    kind = spec.get("type")
+    if kind in ("alpha_vantage", "alpha_vantage_bulk"):
+        fetcher_options = {}
+        if "requests_per_minute" in config:
+            fetcher_options["requests_per_minute"] = config["requests_per_minute"]
+        return AlphaVantageProvider(
+            api_key_for(config), bulk=kind == "alpha_vantage_bulk", **fetcher_options
+        )
+    if kind == "static":
+        if "path" in spec:
+            return JsonPrices(spec["path"])
+        return StaticPrices(spec.get("prices", {}))
+    if kind in _FIXTURES:
+        return _FIXTURES[kind](spec["path"])
+    raise ValueError(f"Unknown price provider '{kind}'")
+
+
+def api_key_for(config):
+    # if config did not contain apikey, try to read it from env var
+    if "apikey" not in config:
+        env_api_key = os.getenv("ALPHAVANTAGE_API_KEY")
+        if env_api_key is None:
+            raise Exception(
+                "Could not find api key, and price override was not specified"
+            )
+        else:
+            config["apikey"] = env_api_key
+    return config["apikey"]
+
+
+# Use the "quote endpoint" from alphavantage
+# <https://www.alphavantage.co/documentation/#latestprice>
+def fetch_latest_price(ticker_symbol, api_key):
+    from alpha_vantage.timeseries import TimeSeries
+
+    ts = TimeSeries(key=api_key)
+    count("api calls")
+    data, meta_data = ts.get_quote_endpoint(ticker_symbol)
+    latest_price = float(data["05. price"])
+    return latest_price
+
+
+# Use the "daily endpoint" from alphavantage
+# <https://www.alphavantage.co/documentation/#daily>
+def fetch_daily_closes(ticker_symbol, api_key):
+    from alpha_vantage.timeseries import TimeSeries
+
+    ts = TimeSeries(key=api_key)
+    count("api calls")
+    data, meta_data = ts.get_daily(ticker_symbol, outputsize="full")
+    rows = sorted(
+        (date.fromisoformat(day).toordinal(), float(values["4. close"]))
+        for day, values in data.items()
+    )
+    return array("q", (o for o, _ in rows)), array("d", (c for _, c in rows))
@@ -0,0 +1,163 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from instrumentation import count
+
+DEFAULT_TTL = 15 * 60  # seconds
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+
+class QuoteCache:
+    """
+    Keeps the last quote for each symbol in a SQLite database
+
+    A cached quote is reused while it is younger than ttl seconds. If the market
+    is closed, a quote fetched after the most recent close is reused no matter
+    how old it is, since the price can't have moved since then.
+    Market hours are regular NYSE/NASDAQ hours, without accounting for holidays.
+
+    Quotes are fetched with the fetch callable passed to get_price, so any price
+    source (or a stub, in tests) can sit behind the cache.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, now=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.now = now
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+
+    @staticmethod
+    def in_dir(cache_dir, ttl=DEFAULT_TTL):
+        os.makedirs(cache_dir, exist_ok=True)
+        return QuoteCache(os.path.join(cache_dir, "quotes.sqlite3"), ttl)
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS quotes ("
+                "symbol TEXT PRIMARY KEY, price REAL NOT NULL, fetched_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def lookup(self, symbol):
+        """The cached price for symbol if it is still good, otherwise None"""
+        row = (
+            self._connect()
+            .execute("SELECT price, fetched_at FROM quotes WHERE symbol = ?", (symbol,))
+            .fetchone()
+        )
+        if row is not None and self._is_fresh(row[1]):
+            self.hits += 1
+            count("quote cache hits")
+            return row[0]
+        self.misses += 1
+        count("quote cache misses")
+        return None
+
+    def _is_fresh(self, fetched_at):
+        now = self.now()
+        if now - fetched_at < self.ttl:
+            return True
+        return not market_is_open(now) and fetched_at >= last_market_close(now)
+
+    def store(self, symbol, price):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO quotes (symbol, price, fetched_at) VALUES (?, ?, ?)",
+                (symbol, price, self.now()),
+            )
+
+    def get_price(self, symbol, fetch):
+        """The price for symbol, calling fetch(symbol) only if the cache can't answer"""
+        price = self.lookup(symbol)
+        if price is None:
+            price = fetch(symbol)
+            self.store(symbol, price)
+        return price
+
+    def get_prices(self, symbols, fetch_many):
+        """
+        Map each symbol to its price, calling fetch_many once with all the symbols
+        the cache can't answer. fetch_many returns a dict, where a symbol may map to
+        an exception if it couldn't be fetched; those are passed through uncached.
+        """
+        prices, missing = self._lookup_all(symbols)
+        if missing:
+            self._store_fetched(prices, fetch_many(missing))
+        return prices
+
+    async def get_prices_async(self, symbols, fetch_many):
+        """Like get_prices, for when fetch_many is a coroutine function"""
+        prices, missing = self._lookup_all(symbols)
+        if missing:
+            self._store_fetched(prices, await fetch_many(missing))
+        return prices
+
+    def _lookup_all(self, symbols):
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            price = self.lookup(symbol)
+            if price is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = price
+        return prices, missing
+
+    def _store_fetched(self, prices, fetched):
+        for symbol, price in fetched.items():
+            if not isinstance(price, Exception):
+                self.store(symbol, price)
+            prices[symbol] = price
+
+
+def market_is_open(timestamp):
+    moment = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE)
+    if moment.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= (moment.hour, moment.minute) < MARKET_CLOSE
+
+
+def last_market_close(timestamp):
+    """The timestamp of the most recent weekday close at or before timestamp"""
+    moment = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE)
+    close = moment.replace(
+        hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0
+    )
+    if close > moment:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
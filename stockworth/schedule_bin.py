@@ -16,23 +16,26 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
+from bisect import bisect_left, bisect_right
 from datetime import date
-from interval import Interval
+
+# Key of the bin for everything that has already vested. It sorts before the key
+# of any Interval.
+VESTED = -1
 
 
 class ScheduleBin:
     """
-    For a given Equity, the "bin" that should be used for the VestingSchedule
+    A bin of the VestingSchedule, for formatting
 
-    Implements hashable and sortable.
+    key is VESTED or an Interval key. Implements hashable and sortable.
     """
 
-    already_vested = date.fromisoformat("2000-01-01")  # flag date for "already vested"
+    __slots__ = ("key", "interval")
 
-    def __init__(self, equity, interval):
-        self.equity = equity
+    def __init__(self, key, interval):
+        self.key = key
         self.interval = interval
-        self.key = self.compute_key()
 
     def __hash__(self):
         return hash(self.key)
@@ -43,24 +46,31 @@ class ScheduleBin:
     def __lt__(self, other):
         return self.key < other.key
 
-    # Key used for sorting and hashing (e.g. as the key in a dict)
-    def compute_key(self):
-        equity_date = self.equity.date
-        if equity_date <= date.today():
-            return self.already_vested
-        else:
-            if self.interval is Interval.MONTHLY:
-                return equity_date.replace(day=1)
-            else:
-                return equity_date.replace(day=1, month=1)
-
     # Formatted string version
     def __repr__(self):
-        # Replace the flag date with "Vested"
-        if self.key == self.already_vested:
+        if self.key == VESTED:
             return "Vested"
         else:
-            if self.interval is Interval.MONTHLY:
-                return self.key.strftime("%b %Y")
-            else:
-                return self.key.strftime("%Y")
+            return self.interval.label(self.key)
+
+
+def bin_ends(ordinals, interval, today=None):
+    """
+    Split vest date ordinals (ascending, and may repeat) into schedule bins
+
+    Returns (ScheduleBin, end) pairs in ascending order, where end is the position
+    just past the bin's last ordinal. Everything vested by today goes in a single
+    bin. The end of each bin is a binary search for the start of the next one, so
+    only one date per bin is ever worked out, not one per tranche.
+    """
+    today = (today or date.today()).toordinal()
+    ends = []
+    position = bisect_right(ordinals, today)
+    if position:
+        ends.append((ScheduleBin(VESTED, interval), position))
+    while position < len(ordinals):
+        key = interval.key(ordinals[position])
+        next_start = interval.start(key + 1).toordinal()
+        position = bisect_left(ordinals, next_start, position)
+        ends.append((ScheduleBin(key, interval), position))
+    return ends
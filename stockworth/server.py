@@ -0,0 +1,224 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import hashlib
+import json
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from aiohttp import web
+
+from interval import Interval
+from output import valuation_row
+from valuation import (
+    convert_to_equity,
+    set_prices,
+    symbol_prices,
+    unpriced_symbols,
+    valuate,
+)
+
+DEFAULT_CACHE_SIZE = 1024
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LRUCache:
+    """Keeps the max_size most recently used entries"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """The value for key, or None if it isn't cached"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
+
+
+class LatencyHistogram:
+    """How many requests took at most each of LATENCY_BUCKETS milliseconds"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # the last is for slower ones
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds * 1000.0)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+
+    def stats(self):
+        buckets = {}
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            running += count
+            buckets[str(bound)] = running
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "buckets_ms": buckets,
+        }
+
+
+class ValuationService:
+    """
+    Values configs sent over HTTP, keeping what it can between requests
+
+    POST /valuate takes a config (the same json as a config file) as the body,
+    and price, tax, interval and rsu_only query parameters like the command line
+    flags. It returns the same numbers as --format json. Parsed configs are kept
+    by the hash of the body, and built EquityGroups by that hash and the prices
+    and tax rate they were built at, so a repeat request skips straight to
+    working out the valuation.
+
+    get_prices is a coroutine function taking a list of symbols and the config
+    that needs them (for its apikey and price_provider), and returning a dict of
+    symbol to price, or to the exception explaining why there isn't one. It
+    raises ValueError if the config asks for a provider it can't have.
+    GET /metrics reports a latency histogram per endpoint, and cache hit rates.
+    """
+
+    def __init__(self, get_prices, cache_size=DEFAULT_CACHE_SIZE, quote_cache=None):
+        self.get_prices = get_prices
+        self.quote_cache = quote_cache
+        self.configs = LRUCache(cache_size)
+        self.models = LRUCache(cache_size)
+        self.latency = {}
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._timed])
+        app.router.add_post("/valuate", self.handle_valuate)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/health", self.handle_health)
+        return app
+
+    @web.middleware
+    async def _timed(self, request, handler):
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            resource = request.match_info.route.resource
+            endpoint = resource.canonical if resource is not None else "unknown"
+            if endpoint not in self.latency:
+                self.latency[endpoint] = LatencyHistogram()
+            self.latency[endpoint].observe(time.perf_counter() - started)
+
+    async def handle_valuate(self, request):
+        body = await request.read()
+        try:
+            config_hash, config = self._read_config(body, request.query)
+        except (ValueError, KeyError, TypeError) as e:
+            return _error(400, f"Bad config: {e}")
+
+        missing = unpriced_symbols(config)
+        if missing:
+            try:
+                prices = await self.get_prices(missing, config)
+            except ValueError as e:
+                return _error(400, f"Bad config: {e}")
+            for symbol in missing:
+                if isinstance(prices[symbol], Exception):
+                    return _error(502, f"No price for {symbol}: {prices[symbol]}")
+            set_prices(config, prices)
+
+        key = (
+            config_hash,
+            config["use_nsos"],
+            config["tax_rate"],
+            tuple(symbol_prices(config["price"], config).items()),
+        )
+        all_equity = self.models.get(key)
+        try:
+            if all_equity is None:
+                all_equity = convert_to_equity(config["price"], config)
+                self.models.put(key, all_equity)
+            row = valuation_row(None, valuate(config, all_equity), config["thresholds"])
+        except (ValueError, KeyError, TypeError) as e:
+            return _error(400, f"Bad config: {e}")
+        del row["file"]
+        return web.json_response(row)
+
+    def _read_config(self, body, query):
+        """The request's config, ready to be priced, and the hash of its body"""
+        config_hash = hashlib.sha256(body).hexdigest()
+        parsed = self.configs.get(config_hash)
+        if parsed is None:
+            parsed = json.loads(body)
+            if not isinstance(parsed, dict) or "symbol" not in parsed:
+                raise ValueError("expected a json object with a symbol")
+            self.configs.put(config_hash, parsed)
+
+        # A copy, so the cached config is never changed
+        config = dict(parsed)
+        config["prices"] = dict(parsed.get("prices", {}))
+        config["price"] = float(query["price"]) if "price" in query else None
+        config["tax_rate"] = float(query.get("tax", parsed.get("tax_rate", 0.0)))
+        config["use_rsus"] = True
+        config["use_nsos"] = query.get("rsu_only", "false").lower() not in (
+            "1",
+            "true",
+        )
+        config["bin_size"] = Interval[query.get("interval", "yearly").upper()]
+        config.setdefault("thresholds", [])
+        return config_hash, config
+
+    async def handle_metrics(self, request):
+        metrics = {
+            "latency": {
+                endpoint: histogram.stats()
+                for endpoint, histogram in self.latency.items()
+            },
+            "configs": self.configs.stats(),
+            "models": self.models.stats(),
+        }
+        if self.quote_cache is not None:
+            metrics["quotes"] = {
+                "hits": self.quote_cache.hits,
+                "misses": self.quote_cache.misses,
+            }
+        return web.json_response(metrics)
+
+    async def handle_health(self, request):
+        return web.json_response({"status": "ok"})
+
+
+def _error(status, message):
+    return web.json_response({"error": message}, status=status)
@@ -0,0 +1,303 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import math
+import random
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from operator import mul
+from statistics import NormalDist
+
+from equity import RSU
+from price_history import read_daily_closes
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+DAYS_PER_YEAR = 365.25
+
+"""
+Summary of a Monte Carlo run
+
+    total_value maps each percentile in PERCENTILES to a total equity value, and
+    thresholds holds one such mapping per amount, from percentile to the date on
+    which unvested equity first drops to that amount or below.
+"""
+SimulationResult = namedtuple(
+    "SimulationResult", ["paths", "total_value", "thresholds"]
+)
+
+
+class GeometricBrownianMotion:
+    """Log-normal price moves, with annualized drift and volatility"""
+
+    def __init__(self, drift, volatility):
+        self.drift = drift
+        self.volatility = volatility
+
+    def describe(self):
+        return f"GBM, drift {self.drift:.2%}, volatility {self.volatility:.2%}"
+
+    def step_sampler(self, step_days, rng):
+        """
+        Build a function returning random price multipliers for a step, one for
+        each of size paths. step_days is the number of days covered by each step.
+        """
+        drifts = []
+        scales = []
+        for days in step_days:
+            years = days / DAYS_PER_YEAR
+            drifts.append((self.drift - 0.5 * self.volatility**2) * years)
+            scales.append(self.volatility * math.sqrt(years))
+        normals = _normal_quantiles()
+        getrandbits = rng.getrandbits
+        exp = math.exp
+
+        def sample(step, size):
+            drift = drifts[step]
+            scale = scales[step]
+            # 16 random bits per path pick one of the normal quantiles
+            picks = array("H", getrandbits(16 * size).to_bytes(2 * size, "little"))
+            return [exp(drift + scale * normals[pick]) for pick in picks]
+
+        return sample
+
+
+@lru_cache(maxsize=None)
+def _normal_quantiles():
+    """
+    The standard normal distribution's quantiles at the middle of each of 65,536
+    equal slices of probability. Picking one with 16 random bits is a normal draw
+    (to within the slice, and up to 4.3 standard deviations out) at a fraction
+    of the cost of random.gauss.
+    """
+    inv_cdf = NormalDist().inv_cdf
+    return [inv_cdf((k + 0.5) / 65536) for k in range(65536)]
+
+
+class HistoricalBootstrap:
+    """
+    Resample price moves from a series of historical closes
+
+    Each step of a path replays the move over a randomly chosen window of history
+    with the same length as the step (wrapping around the end of the series), so
+    a step costs one draw no matter how many days it covers.
+    """
+
+    def __init__(self, closes):
+        if len(closes) < 2:
+            raise ValueError("Need at least two historical closes to bootstrap from")
+        self.closes = closes
+        log_returns = [math.log(b / a) for a, b in zip(closes, closes[1:])]
+        # prefix sums over two laps of the returns, so windows can wrap around
+        self._cumulative = [0.0]
+        for log_return in log_returns + log_returns:
+            self._cumulative.append(self._cumulative[-1] + log_return)
+        self._count = len(log_returns)
+
+    def describe(self):
+        return f"bootstrap from {len(self.closes):,} historical closes"
+
+    def step_sampler(self, step_days, rng):
+        # closes are one per trading day, so convert calendar days to trading days
+        lengths = [
+            max(1, min(self._count, round(days * 252 / DAYS_PER_YEAR)))
+            for days in step_days
+        ]
+        cumulative = self._cumulative
+        count = self._count
+        choices = rng.choices
+        exp = math.exp
+        moves = {}
+
+        def sample(step, size):
+            # every window of this length's move, so each path just picks one
+            length = lengths[step]
+            if length not in moves:
+                moves[length] = [
+                    exp(cumulative[start + length] - cumulative[start])
+                    for start in range(count)
+                ]
+            return choices(moves[length], k=size)
+
+        return sample
+
+
+def read_closes(path):
+    """
+    Read daily closing prices from a CSV file of date,close rows, in date order.
+    A header row is skipped if present.
+    """
+    return list(read_daily_closes(path)[1])
+
+
+def simulate(
+    tranches,
+    spot_price,
+    tax_rate,
+    amounts,
+    model,
+    paths,
+    seed=0,
+    chunk_size=50_000,
+    jobs=None,
+):
+    """
+    Value tranches along randomly generated price paths
+
+    Each tranche is valued at the path's price on its own vest date, the same way
+    as Equity.from_rsu/from_option would. Tranches that have already vested are
+    valued at spot_price. Paths are generated in fixed-size chunks, each with its
+    own seed derived from seed, so the result doesn't depend on how many worker
+    processes (jobs) are used.
+    """
+    amounts = list(amounts)
+    dates, steps = _build_steps(tranches, tax_rate)
+    chunks = [
+        (model, spot_price, dates, steps, amounts, seed, chunk, size)
+        for chunk, size in enumerate(_chunk_sizes(paths, chunk_size))
+    ]
+    if jobs == 1 or len(chunks) <= 1:
+        results = map(_simulate_chunk, chunks)
+        return _summarize(results, paths, dates, amounts)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(_simulate_chunk, chunks)
+        return _summarize(results, paths, dates, amounts)
+
+
+def _chunk_sizes(paths, chunk_size):
+    full, remainder = divmod(paths, chunk_size)
+    return [chunk_size] * full + ([remainder] if remainder else [])
+
+
+def _build_steps(tranches, tax_rate):
+    """
+    Group tranches by vest date. Each group gets its RSU quantity and its options
+    as (quantity, quantity * strike) pairs, with the tax rate already applied.
+    """
+    after_tax = 1.0 - tax_rate
+    dates = []
+    steps = []
+    for ordinal, quantity, strike, kind in zip(
+        tranches.ordinals, tranches.quantities, tranches.strikes, tranches.kinds
+    ):
+        if not dates or dates[-1] != ordinal:
+            dates.append(ordinal)
+            steps.append([0.0, []])
+        if kind == RSU:
+            steps[-1][0] += quantity * after_tax
+        else:
+            steps[-1][1].append((quantity * after_tax, quantity * strike * after_tax))
+    return dates, steps
+
+
+def _simulate_chunk(args):
+    """
+    Simulate one chunk of paths a step at a time, each step covering every path
+    in the chunk, so the per-tranche work runs as a few list comprehensions
+    rather than as a loop per path
+    """
+    model, spot_price, dates, steps, amounts, seed, chunk, size = args
+    rng = random.Random(f"{seed}:{chunk}")
+    today = date.today().toordinal()
+    first_future = bisect_right(dates, today)
+    step_days = [
+        later - earlier
+        for earlier, later in zip([today] + dates[first_future:], dates[first_future:])
+    ]
+    sample = model.step_sampler(step_days, rng)
+
+    # Everything vested by today is valued at spot_price on every path, so its
+    # cumulative values are the same for all of them
+    vested = 0.0
+    cumulative = []
+    for rsu_quantity, options in steps[:first_future]:
+        vested += rsu_quantity * spot_price
+        for quantity, purchase_price in options:
+            vested += max(spot_price * quantity - purchase_price, 0.0)
+        cumulative.append(vested)
+
+    prices = [spot_price] * size
+    running = [vested] * size
+    for step, (rsu_quantity, options) in enumerate(steps[first_future:]):
+        prices = list(map(mul, prices, sample(step, size)))
+        running = [
+            total + rsu_quantity * price for total, price in zip(running, prices)
+        ]
+        for quantity, purchase_price in options:
+            running = [
+                total + max(price * quantity - purchase_price, 0.0)
+                for total, price in zip(running, prices)
+            ]
+        if amounts:
+            cumulative.append(array("d", running))
+    totals = array("d", running)
+
+    # Each path's threshold for an amount is the first date by which it has
+    # vested all but that amount (or the last date, if it never does)
+    counts = [[0] * len(dates) for _ in amounts]
+    if not dates or not amounts:
+        return totals, counts
+    for amount, amount_counts in zip(amounts, counts):
+        needed = [total - amount for total in totals]
+        remaining = range(size)
+        for i, column in enumerate(cumulative):
+            if isinstance(column, float):
+                still = [path for path in remaining if column < needed[path]]
+            else:
+                still = [path for path in remaining if column[path] < needed[path]]
+            amount_counts[i] += len(remaining) - len(still)
+            remaining = still
+            if not remaining:
+                break
+        amount_counts[-1] += len(remaining)
+    return totals, counts
+
+
+def _summarize(results, paths, dates, amounts):
+    totals = array("d")
+    counts = [[0] * len(dates) for _ in amounts]
+    for chunk_totals, chunk_counts in results:
+        totals.extend(chunk_totals)
+        for amount_counts, chunk_amount_counts in zip(counts, chunk_counts):
+            for i, count in enumerate(chunk_amount_counts):
+                amount_counts[i] += count
+
+    ordered = sorted(totals)
+    total_value = {
+        p: ordered[round(p / 100 * (len(ordered) - 1))] if ordered else 0.0
+        for p in PERCENTILES
+    }
+    thresholds = [
+        {p: _percentile_date(amount_counts, dates, paths, p) for p in PERCENTILES}
+        for amount_counts in counts
+    ]
+    return SimulationResult(paths, total_value, thresholds)
+
+
+def _percentile_date(counts, dates, paths, percentile):
+    needed = percentile / 100 * paths
+    seen = 0
+    for ordinal, count in zip(dates, counts):
+        seen += count
+        if seen >= needed and seen > 0:
+            return date.fromordinal(ordinal)
+    return None
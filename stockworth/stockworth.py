@@ -18,63 +18,188 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+_IMPORT_CPU_STARTED = time.process_time()
+
 import argparse
+import importlib.util
 import json
+import locale
 import os
+import sys
+from contextlib import ExitStack
 from datetime import date
 
-from alpha_vantage.timeseries import TimeSeries
-
-from equity import Equity
 from equity_group import EquityGroup
+from instrumentation import collect, phase, profile, trace_memory
 from interval import Interval
-from util import format_currency, format_date_delta
-from vesting_schedule import VestingSchedule
+from output import FORMATS
+from price_sweep import format_sweep_table, iter_price_scenarios, parse_price_range
+from tax import parse_tax_sweep
+from tranches import Tranches
+from util import (
+    default_cache_dir,
+    format_currency,
+    format_date_delta,
+    parse_address,
+    parse_amounts,
+    parse_date,
+    parse_date_range,
+    set_currency_locale,
+)
+from valuation import convert_to_equity, set_prices, unpriced_symbols, valuate
+from vesting_schedule import format_schedule
+
+# Anything that is only needed by some modes (alpha_vantage and aiohttp in particular)
+# is imported where it is used, to keep startup fast when e.g. --price is given.
 
 
 def main():
+    imports = (
+        time.perf_counter() - _IMPORT_STARTED,
+        time.process_time() - _IMPORT_CPU_STARTED,
+    )
+    wall, cpu = time.perf_counter(), time.process_time()
+    args = parse_args()
+    parsing = (time.perf_counter() - wall, time.process_time() - cpu)
+    with ExitStack() as stack:
+        if args.timings:
+            metrics = stack.enter_context(collect())
+            metrics.add_phase("imports", *imports)
+            metrics.add_phase("parse args", *parsing)
+            stack.callback(metrics.report, sys.stderr)
+        if args.profile is not None:
+            stack.enter_context(profile(args.profile))
+        if args.profile_memory is not None:
+            stack.enter_context(trace_memory(args.profile_memory))
+        run(args)
+
+
+def run(args):
+    if args.batch is not None:
+        with phase("batch"):
+            print_batch(args)
+        return
+    if args.cohort is not None:
+        with phase("cohort"):
+            print_cohort(args)
+        return
+    if args.watch is not None:
+        print_watch(args)
+        return
+    if args.serve is not None:
+        serve(args)
+        return
+
     # read in config file
-    config = read_config()
+    with phase("read config"):
+        config = read_config(args)
 
-    # look up current price
-    ticker_symbol = config["symbol"]
-    latest_price = config["price"]
+    if config["price_range"] is not None:
+        with phase("price sweep"):
+            print_price_sweep(config, args)
+        return
+    if config["simulate"] is not None:
+        with phase("simulation"):
+            print_simulation(config)
+        return
+    if config["series"] is not None:
+        with phase("series"):
+            print_series(config, args)
+        return
+    if config["tax_sweep"] is not None:
+        with phase("tax sweep"):
+            print_tax_sweep(config, args)
+        return
+    if config["price_for"] is not None:
+        with phase("price targets"):
+            print_price_targets(config, args)
+        return
+    if config["curve"] is not None:
+        with phase("curve"):
+            print_curve(config, args)
+        return
 
-    # convert RSUs and options into date/value pairs
-    all_equity = convert_to_equity(latest_price, config)
+    with phase("valuate"):
+        valuation = valuate(config)
 
-    # compute total value
-    total_value = all_equity.total_value()
+    with phase("format"):
+        if args.format == "text":
+            print(format_message(config, valuation))
+        else:
+            from output import valuation_row, write_rows
 
-    # split out unvested equity from vested
-    vested_value = all_equity.vested_value()
-    unvested_value = total_value - vested_value
+            write_rows(
+                [valuation_row(args.file, valuation, config["thresholds"])],
+                args.format,
+                sys.stdout,
+            )
 
-    # produce threshold/date pairs
-    thresholds = all_equity.compute_thresholds(amounts=config["thresholds"])
 
-    message_tax_suffix = "(post-tax)" if config["tax_rate"] > 0.0 else "(pre-tax)"
+def format_message(config, valuation):
+    post_tax = config["tax_rate"] > 0.0 or "tax" in config
+    message_tax_suffix = "(post-tax)" if post_tax else "(pre-tax)"
 
     # pretty print
-    message = (
-        f"{ticker_symbol} last closed at {latest_price:,.2f}. "
-        f"At that price, your total equity is worth {format_currency(total_value)} {message_tax_suffix}."
-        f"\nYour vesting schedule is"
-    )
-    for entry in VestingSchedule(
-        all_equity, config["bin_size"]
-    ).compute_and_format_schedule():
+    if len(valuation.prices) > 1:
+        others = "".join(
+            f", {symbol} at {price:,.2f}"
+            for symbol, price in valuation.prices.items()
+            if symbol != valuation.symbol
+        )
+        message = (
+            f"{valuation.symbol} last closed at {valuation.price:,.2f}{others}. "
+            f"At those prices, your total equity is worth {format_currency(valuation.total_value)} {message_tax_suffix}."
+        )
+        for symbol, value in valuation.symbol_values.items():
+            message += f"\n\t{symbol}: {format_currency(value)}"
+        message += "\nYour vesting schedule is"
+    else:
+        message = (
+            f"{valuation.symbol} last closed at {valuation.price:,.2f}. "
+            f"At that price, your total equity is worth {format_currency(valuation.total_value)} {message_tax_suffix}."
+            f"\nYour vesting schedule is"
+        )
+    for entry in format_schedule(valuation.schedule):
         message += f"\n\t{entry}"
-    message += f"\nIf you quit today, you will be walking away from {format_currency(unvested_value)}."
-    for threshold in thresholds:
-        if threshold.date > date.today():
-            message += f"\n\tOnly {format_date_delta(threshold.date)} until that's less than {format_currency(threshold.amount)}."
+    as_of = valuation.as_of
+    when = "today" if as_of == date.today() else f"on {as_of.isoformat()}"
+    message += f"\nIf you quit {when}, you will be walking away from {format_currency(valuation.unvested_value)}."
+    for threshold in valuation.thresholds:
+        # an empty group has no thresholds, since there's nothing left to vest
+        if threshold is not None and threshold.date > as_of:
+            message += f"\n\tOnly {format_date_delta(threshold.date, as_of)} until that's less than {format_currency(threshold.amount)}."
     message += "\nHang in there!"
-    print(message)
+    return message
+
+
+# Flags that each run a different mode instead of the usual message, so only one
+# of them can be given. Each one's value is None when it isn't.
+MODES = (
+    "--price-range",
+    "--simulate",
+    "--series",
+    "--tax-sweep",
+    "--price-for",
+    "--curve",
+    "--batch",
+    "--cohort",
+    "--watch",
+    "--serve",
+)
+
+# Modes whose results only make sense as rows, or only as text
+ROWS_ONLY_MODES = ("--batch", "--series", "--curve")
+TEXT_ONLY_MODES = ("--simulate", "--watch")
 
 
-def read_config():
-    # read in config file name
+def _dest(flag):
+    return flag[2:].replace("-", "_")
+
+
+def parse_args():
     parser = argparse.ArgumentParser(prog="stockworth.py")
     parser.add_argument(
         "-f",
@@ -82,12 +207,20 @@ def read_config():
         default="config.json",
         help="The json file to read the config from (defaults to config.json).",
     )
-    parser.add_argument(
+    price_group = parser.add_mutually_exclusive_group()
+    price_group.add_argument(
         "-p",
         "--price",
         type=float,
         help="The price to use instead of the most recent closing price",
     )
+    price_group.add_argument(
+        "--price-range",
+        type=parse_price_range,
+        metavar="START:STOP:STEP",
+        help="Evaluate every price from START to STOP (inclusive) in steps of STEP, "
+        "and print a table instead of the usual message",
+    )
     parser.add_argument(
         "-i",
         "--interval",
@@ -101,29 +234,227 @@ def read_config():
         type=float,
         help="Tax rate. If provided, after-tax values will be shown.",
     )
+    parser.add_argument(
+        "--tax-sweep",
+        type=parse_tax_sweep,
+        metavar="RATES_OR_FILE",
+        help="Compare the after-tax value under many tax schedules: flat rates "
+        'from START:STOP:STEP, or a json file holding a list of "tax" entries',
+    )
+    parser.add_argument(
+        "--price-for",
+        type=parse_amounts,
+        metavar="AMOUNT[,AMOUNT...]",
+        help="Print the price at which your unvested equity, and the equity you "
+        "will have vested (by --by, or in all), would be worth each AMOUNT",
+    )
+    parser.add_argument(
+        "--by",
+        type=parse_date,
+        metavar="DATE",
+        help="The date --price-for values vested equity at (defaults to when "
+        "everything has vested)",
+    )
     parser.add_argument(
         "--rsu-only", action="store_true", default=False, help="Ignore NSOs"
     )
+    parser.add_argument(
+        "--simulate",
+        type=int,
+        metavar="PATHS",
+        help="Run a Monte Carlo simulation over PATHS random price paths, starting "
+        "from the current (or --price) price",
+    )
+    parser.add_argument(
+        "--volatility",
+        type=float,
+        default=0.3,
+        help="Annualized volatility for --simulate (defaults to 0.3)",
+    )
+    parser.add_argument(
+        "--drift",
+        type=float,
+        default=0.0,
+        help="Annualized drift for --simulate (defaults to 0)",
+    )
+    parser.add_argument(
+        "--history",
+        metavar="CSV",
+        help="Resample price moves for --simulate from a CSV of date,close rows "
+        "instead of using --volatility and --drift. With --series, the closes "
+        "to value at instead of fetching them",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for --simulate, so runs can be reproduced (defaults to 0)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes to use (defaults to one per CPU)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Always fetch a fresh quote instead of reusing a recent one, and "
+        "parse the config file instead of reusing a compiled copy",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="DIR_OR_GLOB",
+        help="Value every config file in a directory (or matching a glob), "
+        "writing one row per config instead of the usual message",
+    )
+    parser.add_argument(
+        "--cohort",
+        metavar="DIR_OR_GLOB",
+        help="Total up every config file in a directory (or matching a glob): "
+        "how much vests in each period, and how many configs' unvested equity "
+        "drops below each of their thresholds in it",
+    )
+    parser.add_argument(
+        "--series",
+        type=parse_date_range,
+        nargs="?",
+        const=(None, None),
+        metavar="START:END",
+        help="Write the vested and unvested value on every day from START to END "
+        "(either can be left out), valued at each day's closing price",
+    )
+    parser.add_argument(
+        "--as-of",
+        type=parse_date,
+        metavar="DATE",
+        help="Work out what has vested, the schedule and thresholds as of DATE "
+        "instead of today",
+    )
+    parser.add_argument(
+        "--curve",
+        type=parse_date_range,
+        nargs="?",
+        const=(None, None),
+        metavar="START:END",
+        help="Write the vested and unvested value on every day from START "
+        "(defaulting to --as-of or today) to END (defaulting to the final vest), "
+        "at the current price",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Output format. Anything but text writes the raw numbers, with no "
+        "rounding or prose (defaults to text, or jsonl for --batch and --series)",
+    )
+    parser.add_argument(
+        "--locale",
+        metavar="LOCALE",
+        help="Format amounts as LOCALE's currency (\"\" for your environment's) "
+        "instead of dollars",
+    )
+    parser.add_argument(
+        "--serve",
+        type=parse_address,
+        metavar="[HOST:]PORT",
+        help="Run an HTTP service that values configs POSTed to /valuate, "
+        "instead of reading --file (the host defaults to 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--timings",
+        "--profile-startup",
+        action="store_true",
+        default=False,
+        help="Print the wall and CPU time of imports and each phase of the run, "
+        "and counts of the work done (tranches, cache hits, API calls), to stderr",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Run under cProfile and write the stats to FILE, for pstats or snakeviz",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        metavar="FILE",
+        help="Trace memory allocations and write a tracemalloc snapshot to FILE",
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="SECONDS",
+        help="Keep running, checking for a new price (and config file changes) "
+        "every SECONDS, and print what changed",
+    )
     args = parser.parse_args()
+    modes = [flag for flag in MODES if getattr(args, _dest(flag)) is not None]
+    if len(modes) > 1:
+        parser.error(f"{modes[0]} can't be combined with {modes[1]}")
+    mode = modes[0] if modes else None
+    if args.as_of is not None and mode in ("--simulate", "--series", "--serve"):
+        parser.error(f"--as-of can't be combined with {mode}")
+    if args.by is not None and args.price_for is None:
+        parser.error("--by only applies to --price-for")
+    if args.format is None:
+        args.format = "jsonl" if mode in ROWS_ONLY_MODES else "text"
+    if args.format == "text" and mode in ROWS_ONLY_MODES:
+        parser.error(f"{mode} doesn't have text output")
+    if args.format != "text" and mode in TEXT_ONLY_MODES:
+        parser.error(f"{mode} only has text output")
+    if args.locale is not None:
+        try:
+            set_currency_locale(args.locale)
+        except locale.Error:
+            parser.error(f"--locale {args.locale!r} isn't available")
+    if args.format == "msgpack" and importlib.util.find_spec("msgpack") is None:
+        parser.error("--format msgpack needs the msgpack package (pip install msgpack)")
+    return args
 
-    with open(args.file, "r") as config_file:
-        config = json.loads(config_file.read())
 
-    # If price was specified as an arg, copy it into the config
-    # Otherwise, we'll need an apikey to look it up
-    if args.price is not None:
-        config["price"] = args.price
+def read_config(args):
+    config = load_config(args.file, args)
+    # --price-range and --series bring their own prices, and --price-for solves for one
+    if (
+        config["price_range"] is not None
+        or config["series"] is not None
+        or config["price_for"] is not None
+    ):
+        return config
+
+    # Look up the price of every symbol that wasn't given one. Only the config's own
+    # symbol is simulated or tax swept, so nothing else needs a price then.
+    missing = unpriced_symbols(config)
+    if config["simulate"] is not None or config["tax_sweep"] is not None:
+        missing = [symbol for symbol in missing if symbol == config["symbol"]]
+    with phase("quote lookup"):
+        if missing == [config["symbol"]]:
+            config["price"] = lookup_price(config["symbol"], config, args)
+        elif missing:
+            # all in one go, rather than one symbol at a time
+            prices = lookup_prices({symbol: config for symbol in missing}, args)
+            for price in prices.values():
+                if isinstance(price, Exception):
+                    raise price
+            set_prices(config, prices)
+    return config
+
+
+def load_config(path, args):
+    """Read a config file, and copy the relevant args into it"""
+    if args.no_cache:
+        with open(path, "r") as config_file:
+            config = json.loads(config_file.read())
     else:
-        # if config did not contain apikey, try to read it from env var
-        if "apikey" not in config:
-            env_api_key = os.getenv("ALPHAVANTAGE_API_KEY")
-            if env_api_key is None:
-                raise Exception(
-                    "Could not find api key, and price override was not specified"
-                )
-            else:
-                config["apikey"] = env_api_key
-        config["price"] = get_latest_price(config["symbol"], config["apikey"])
+        from config_cache import CompiledConfigCache
+
+        cache = CompiledConfigCache(os.path.join(default_cache_dir(), "configs"))
+        config = cache.load(path)
+
+    # If price was specified as an arg, copy it into the config
+    config["price_range"] = args.price_range
+    config["price"] = args.price
+    # Prices of the config's other symbols can be fixed in the config itself
+    config.setdefault("prices", {})
 
     # If tax rate was specified as an arg, copy it into the config
     # Otherwise, default to 0
@@ -139,53 +470,331 @@ def read_config():
     # Copy ScheduleBinSize from args to config
     config["bin_size"] = Interval[args.interval.upper()]
 
+    config["simulate"] = args.simulate
+    config["series"] = args.series
+    config["tax_sweep"] = args.tax_sweep
+    config["price_for"] = args.price_for
+    config["curve"] = args.curve
+    config["as_of"] = args.as_of
+    config["price_for_date"] = args.by
+    if args.simulate is not None:
+        from simulation import GeometricBrownianMotion, HistoricalBootstrap, read_closes
+
+        if args.history is not None:
+            config["model"] = HistoricalBootstrap(read_closes(args.history))
+        else:
+            config["model"] = GeometricBrownianMotion(args.drift, args.volatility)
+    config["seed"] = args.seed
+    config["jobs"] = args.jobs
+
     return config
 
 
-# Use the "quote endpoint" from alphavantage
-# <https://www.alphavantage.co/documentation/#latestprice>
-def get_latest_price(ticker_symbol, api_key):
-    ts = TimeSeries(key=api_key)
-    data, meta_data = ts.get_quote_endpoint(ticker_symbol)
-    latest_price = float(data["05. price"])
-    return latest_price
-
-
-def convert_to_equity(latest_price, config):
-    # convert rsus into date/value pairs
-    rsus = list(
-        map(
-            lambda rsu: Equity.from_rsu(
-                current_price=latest_price,
-                quantity=rsu["qty"],
-                vest_date=rsu["vest_date"],
-                tax_rate=config["tax_rate"],
-            ),
-            config["rsus"],
+def lookup_price(ticker_symbol, config, args):
+    price = lookup_prices({ticker_symbol: config}, args)[ticker_symbol]
+    if isinstance(price, Exception):
+        raise price
+    return price
+
+
+def lookup_prices(configs_by_symbol, args):
+    """
+    Look up several symbols at once, using the first config's price provider and
+    settings. A symbol that couldn't be looked up maps to the exception.
+    """
+    from providers import provider_from_config
+
+    config = next(iter(configs_by_symbol.values()))
+    provider = provider_from_config(config)
+    cache = open_quote_cache(config, args) if provider.cacheable else None
+    if cache is None:
+        return provider.fetch_prices(list(configs_by_symbol))
+    return cache.get_prices(list(configs_by_symbol), provider.fetch_prices)
+
+
+def open_quote_cache(config, args):
+    if args.no_cache:
+        return None
+    from quote_cache import DEFAULT_TTL, QuoteCache
+
+    return QuoteCache.in_dir(
+        config.get("cache_dir", default_cache_dir()),
+        ttl=config.get("quote_ttl", DEFAULT_TTL),
+    )
+
+
+def print_batch(args):
+    from batch import find_config_files, valuate_batch
+    from output import write_rows
+
+    rows = valuate_batch(
+        find_config_files(args.batch),
+        load_config=lambda path: load_config(path, args),
+        get_prices=lambda configs_by_symbol: lookup_prices(configs_by_symbol, args),
+        jobs=args.jobs,
+    )
+    write_rows(rows, args.format, sys.stdout)
+
+
+def print_cohort(args):
+    from batch import find_config_files, load_priced_configs, price_error
+    from cohort import CohortTable, format_cohort_table, summarize_cohort
+    from output import COHORT_FIELDS, cohort_row, write_rows
+
+    items = load_priced_configs(
+        find_config_files(args.cohort),
+        load_config=lambda path: load_config(path, args),
+        get_prices=lambda configs_by_symbol: lookup_prices(configs_by_symbol, args),
+    )
+    configs = []
+    for path, config in items:
+        error = config if isinstance(config, Exception) else price_error(config)
+        if error is not None:
+            print(f"Skipping {path}: {error}", file=sys.stderr)
+        else:
+            configs.append((path, config))
+
+    with phase("cohort table"):
+        table = CohortTable.from_configs(configs)
+    with phase("summarize"):
+        cohort_bins = summarize_cohort(
+            table, Interval[args.interval.upper()], as_of=args.as_of, jobs=args.jobs
         )
+    amounts = table.amounts()
+    if args.format == "text":
+        for line in format_cohort_table(cohort_bins, amounts):
+            print(line)
+    else:
+        rows = (cohort_row(cohort_bin, amounts) for cohort_bin in cohort_bins)
+        write_rows(rows, args.format, sys.stdout, COHORT_FIELDS)
+
+
+def print_watch(args):
+    from watch import Watcher
+
+    def get_price(symbol, config):
+        # Cached quotes only need to be as fresh as how often we check
+        ttl = min(config.get("quote_ttl", args.watch), args.watch)
+        return lookup_price(symbol, dict(config, quote_ttl=ttl), args)
+
+    watcher = Watcher(
+        args.file,
+        load_config=lambda path: load_config(path, args),
+        get_price=get_price,
+        render=format_message,
+    )
+    try:
+        watcher.run(sys.stdout, interval=args.watch)
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(args):
+    from aiohttp import web
+
+    from batch import price_source
+    from providers import provider_from_config
+    from quote_cache import QuoteCache
+    from server import ValuationService
+
+    # One quote cache, and one provider per price source, shared by every request
+    # so that each Alpha Vantage key keeps a single rate limit
+    cache = None if args.no_cache else QuoteCache.in_dir(default_cache_dir())
+    providers = {}
+
+    def provider_for(config):
+        spec = config.get("price_provider")
+        if isinstance(spec, dict) and "path" in spec:
+            raise ValueError("price_provider can't read files on the server")
+        key = price_source(config)
+        if key not in providers:
+            providers[key] = provider_from_config(config)
+        return providers[key]
+
+    async def get_prices(symbols, config):
+        try:
+            provider = provider_for(config)
+        except ValueError:
+            raise
+        except Exception as e:
+            # e.g. no API key in the config or the environment
+            return {symbol: e for symbol in symbols}
+        if cache is None or not provider.cacheable:
+            return await provider.fetch_prices_async(symbols)
+        return await cache.get_prices_async(symbols, provider.fetch_prices_async)
+
+    service = ValuationService(get_prices, quote_cache=cache)
+    host, port = args.serve
+    web.run_app(service.make_app(), host=host, port=port)
+
+
+def print_price_sweep(config, args):
+    tranches = Tranches.from_config(config)
+    scenarios = iter_price_scenarios(
+        tranches,
+        config["price_range"],
+        config["tax_rate"],
+        amounts=config["thresholds"],
+        bin_size=config["bin_size"],
+        today=config["as_of"],
+    )
+    if args.format == "text":
+        for line in format_sweep_table(
+            list(scenarios), config["thresholds"], config["as_of"]
+        ):
+            print(line)
+    else:
+        from output import SCENARIO_FIELDS, scenario_row, write_rows
+
+        rows = (scenario_row(scenario, config["thresholds"]) for scenario in scenarios)
+        write_rows(rows, args.format, sys.stdout, fields=SCENARIO_FIELDS)
+
+
+def print_series(config, args):
+    from output import write_rows
+    from price_history import (
+        SERIES_FIELDS,
+        CloseCache,
+        read_daily_closes,
+        value_series,
     )
 
-    # convert options into date/value pairs
-    options = list(
-        map(
-            lambda option: Equity.from_option(
-                current_price=latest_price,
-                quantity=option["qty"],
-                vest_date=option["vest_date"],
-                strike_price=option["price"],
-                tax_rate=config["tax_rate"],
-            ),
-            config["options"],
+    if args.history is not None:
+        ordinals, closes = read_daily_closes(args.history)
+    else:
+        from providers import api_key_for, fetch_daily_closes
+
+        api_key = api_key_for(config)
+
+        def fetch(symbol):
+            return fetch_daily_closes(symbol, api_key)
+
+        if args.no_cache:
+            ordinals, closes = fetch(config["symbol"])
+        else:
+            cache = CloseCache(config.get("cache_dir", default_cache_dir()))
+            ordinals, closes = cache.get_closes(config["symbol"], fetch)
+
+    start, end = config["series"]
+    points = value_series(
+        Tranches.from_config(config),
+        ordinals,
+        closes,
+        config["tax_rate"],
+        start=start,
+        end=end,
+    )
+    rows = (dict(point._asdict(), date=point.date.isoformat()) for point in points)
+    write_rows(rows, args.format, sys.stdout, fields=SERIES_FIELDS)
+
+
+def print_tax_sweep(config, args):
+    from tax import format_tax_sweep_table, read_tax_schedules, sweep_tax_schedules
+
+    scenarios = sweep_tax_schedules(
+        Tranches.from_config(config),
+        config["price"],
+        read_tax_schedules(config["tax_sweep"], config["tax_rate"]),
+        amounts=config["thresholds"],
+        today=config["as_of"],
+    )
+    if args.format == "text":
+        for line in format_tax_sweep_table(
+            list(scenarios), config["thresholds"], config["as_of"]
+        ):
+            print(line)
+    else:
+        from output import TAX_SCENARIO_FIELDS, tax_scenario_row, write_rows
+
+        rows = (
+            tax_scenario_row(scenario, config["thresholds"]) for scenario in scenarios
         )
+        write_rows(rows, args.format, sys.stdout, fields=TAX_SCENARIO_FIELDS)
+
+
+def print_price_targets(config, args):
+    # Like the other sweeps, this is for the config's own symbol at its flat tax rate
+    group = EquityGroup.from_tranches(
+        Tranches.from_config(config), 0.0, config["tax_rate"]
     )
+    amounts = config["price_for"]
+    by_date = config["price_for_date"]
+    unvested = group.prices_for_unvested(amounts, config["as_of"])
+    vested = group.prices_for_vested(amounts, by_date)
+    if args.format == "text":
+        print(format_price_targets(config["symbol"], unvested, vested, by_date))
+    else:
+        from output import PRICE_TARGET_FIELDS, price_target_row, write_rows
+
+        rows = (price_target_row(u, v) for u, v in zip(unvested, vested))
+        write_rows(rows, args.format, sys.stdout, fields=PRICE_TARGET_FIELDS)
+
+
+def format_price_targets(symbol, unvested, vested, by_date=None):
+    vested_description = (
+        f"the equity vested by {by_date.isoformat()}"
+        if by_date is not None
+        else "all of your equity"
+    )
+    lines = []
+    for unvested_target, vested_target in zip(unvested, vested):
+        lines.append(
+            f"For {format_currency(unvested_target.amount)}, {symbol} would need to close at"
+        )
+        for target, description in (
+            (unvested_target, "your unvested equity"),
+            (vested_target, vested_description),
+        ):
+            price = "no price" if target.price is None else f"{target.price:,.2f}"
+            lines.append(f"\t{price} for {description}")
+    return "\n".join(lines)
+
+
+def print_curve(config, args):
+    from curve import CURVE_FIELDS
+    from output import write_rows
 
-    equity_inputs_to_use = list()
-    if config["use_rsus"]:
-        equity_inputs_to_use = equity_inputs_to_use + rsus
-    if config["use_nsos"]:
-        equity_inputs_to_use = equity_inputs_to_use + options
+    curve = convert_to_equity(config["price"], config).vesting_curve()
+    start, end = config["curve"]
+    points = curve.daily(start or config["as_of"], end)
+    rows = (dict(point._asdict(), date=point.date.isoformat()) for point in points)
+    write_rows(rows, args.format, sys.stdout, fields=CURVE_FIELDS)
 
-    return EquityGroup(equity_inputs_to_use)
+
+def print_simulation(config):
+    from simulation import PERCENTILES, simulate
+
+    tranches = Tranches.from_config(config)
+    model = config["model"]
+    result = simulate(
+        tranches,
+        config["price"],
+        config["tax_rate"],
+        amounts=config["thresholds"],
+        model=model,
+        paths=config["simulate"],
+        seed=config["seed"],
+        jobs=config["jobs"],
+    )
+
+    message_tax_suffix = "(post-tax)" if config["tax_rate"] > 0.0 else "(pre-tax)"
+    message = (
+        f"Simulated {result.paths:,} price paths for {config['symbol']} starting at "
+        f"{config['price']:,.2f} ({model.describe()})."
+        f"\nYour total equity is worth {message_tax_suffix}"
+    )
+    for percentile in PERCENTILES:
+        message += f"\n\t{percentile:>2}th percentile: {format_currency(result.total_value[percentile])}"
+    for amount, threshold_dates in zip(config["thresholds"], result.thresholds):
+        message += f"\nYour unvested equity will be less than {format_currency(amount)}"
+        for percentile in PERCENTILES:
+            threshold_date = threshold_dates[percentile]
+            if threshold_date is None or threshold_date <= date.today():
+                when = "already"
+            else:
+                when = f"in {format_date_delta(threshold_date)}"
+            message += f"\n\t{percentile:>2}th percentile: {when}"
+    print(message)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import argparse
+import heapq
+import json
+import math
+import os
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+from itertools import accumulate
+from operator import itemgetter
+
+from equity import RSU
+from equity_group import sweep_thresholds
+from price_sweep import parse_price_range
+from util import format_currency, format_table
+
+_first = itemgetter(0)
+
+"""
+The price-dependent inputs to a TaxSchedule, one entry per tranche in date order
+
+    pre_tax is the tranche's value before tax, income what it counted as ordinary
+    income when it vested, gain how much it has gained since, and year the
+    calendar year it vested in.
+"""
+TaxColumns = namedtuple("TaxColumns", ["pre_tax", "incomes", "gains", "kinds", "years"])
+
+"""
+The outcome of valuing a set of tranches under one TaxSchedule
+
+    thresholds is in the same order as the amounts that were asked for.
+"""
+TaxScenario = namedtuple(
+    "TaxScenario",
+    ["name", "total_value", "vested_value", "unvested_value", "thresholds"],
+)
+
+
+class TaxSchedule:
+    """
+    How equity is taxed, for when a flat tax_rate isn't good enough
+
+    Vesting is ordinary income: the value of a RSU, or the spread of an option,
+    at the price it vested at (an entry's "vest_price", or else the current
+    price). Ordinary income is taxed at rsu_rate or nso_rate, or progressively
+    if brackets are given, with each calendar year's vests stacked in date order
+    on top of other_income. Brackets are (income, rate) pairs, each rate applying
+    from that income up to the next bracket's.
+
+    Any gain since vesting is taxed at capital_gains_rate. Losses aren't taxed,
+    and no tranche is worth less than nothing after tax.
+    """
+
+    def __init__(
+        self,
+        rsu_rate=0.0,
+        nso_rate=None,
+        capital_gains_rate=None,
+        brackets=None,
+        other_income=0.0,
+        name=None,
+    ):
+        self.rsu_rate = rsu_rate
+        self.nso_rate = rsu_rate if nso_rate is None else nso_rate
+        self.capital_gains_rate = (
+            rsu_rate if capital_gains_rate is None else capital_gains_rate
+        )
+        self.brackets = sorted(brackets) if brackets else None
+        self.other_income = other_income
+        self.name = name
+        if self.brackets:
+            # the tax owed on income up to the start of each bracket
+            self._bracket_starts = [start for start, _ in self.brackets]
+            self._tax_at_start = [0.0]
+            for (start, rate), (end, _) in zip(self.brackets, self.brackets[1:]):
+                self._tax_at_start.append(self._tax_at_start[-1] + (end - start) * rate)
+
+    @staticmethod
+    def from_dict(spec, default_rate=0.0):
+        """Build a schedule from a config's "tax" entry, with rates defaulting to default_rate"""
+        rsu_rate = spec.get("rsu_rate", default_rate)
+        return TaxSchedule(
+            rsu_rate=rsu_rate,
+            nso_rate=spec.get("nso_rate", rsu_rate),
+            capital_gains_rate=spec.get("capital_gains_rate", rsu_rate),
+            brackets=[tuple(bracket) for bracket in spec.get("brackets", [])],
+            other_income=spec.get("other_income", 0.0),
+            name=spec.get("name"),
+        )
+
+    @staticmethod
+    def from_config(config):
+        """The config's TaxSchedule, or None if it only has a flat tax_rate"""
+        if "tax" not in config:
+            return None
+        return TaxSchedule.from_dict(config["tax"], config.get("tax_rate", 0.0))
+
+    def describe(self):
+        if self.name is not None:
+            return self.name
+        if self.brackets:
+            return (
+                f"{len(self.brackets)} brackets, {self.capital_gains_rate:g} on gains"
+            )
+        if self.rsu_rate == self.nso_rate == self.capital_gains_rate:
+            return f"{self.rsu_rate:g} flat"
+        return (
+            f"{self.rsu_rate:g} RSU, {self.nso_rate:g} NSO, "
+            f"{self.capital_gains_rate:g} on gains"
+        )
+
+    def income_tax(self, income):
+        """Tax on a year's ordinary income, under the brackets"""
+        position = bisect_right(self._bracket_starts, income) - 1
+        if position < 0:
+            return 0.0
+        start, rate = self.brackets[position]
+        return self._tax_at_start[position] + (income - start) * rate
+
+    def values(self, columns):
+        """The after-tax value of each tranche in columns"""
+        gains_rate = self.capital_gains_rate
+        if self.brackets is None:
+            rates = {RSU: self.rsu_rate}
+            return [
+                max(
+                    pre_tax
+                    - income * rates.get(kind, self.nso_rate)
+                    - max(gain, 0.0) * gains_rate,
+                    0.0,
+                )
+                for pre_tax, income, gain, kind in zip(
+                    columns.pre_tax, columns.incomes, columns.gains, columns.kinds
+                )
+            ]
+
+        values = []
+        year = None
+        earned = taxed = 0.0
+        for pre_tax, income, gain, vest_year in zip(
+            columns.pre_tax, columns.incomes, columns.gains, columns.years
+        ):
+            if vest_year != year:
+                year = vest_year
+                earned = self.other_income
+                taxed = self.income_tax(earned)
+            earned += income
+            owed = self.income_tax(earned)
+            values.append(
+                max(pre_tax - (owed - taxed) - max(gain, 0.0) * gains_rate, 0.0)
+            )
+            taxed = owed
+        return values
+
+
+def tax_columns(tranches, price):
+    """The TaxColumns of tranches, valued at price"""
+    vest_prices = tranches.vest_prices
+    if vest_prices is None:
+        vest_prices = (math.nan for _ in range(len(tranches)))
+    pre_tax = array("d")
+    incomes = array("d")
+    gains = array("d")
+    years = array("l")
+    year_of = {}
+    for ordinal, quantity, strike, kind, vest_price in zip(
+        tranches.ordinals,
+        tranches.quantities,
+        tranches.strikes,
+        tranches.kinds,
+        vest_prices,
+    ):
+        if math.isnan(vest_price):
+            vest_price = price
+        if kind == RSU:
+            pre_tax.append(price * quantity)
+            incomes.append(vest_price * quantity)
+            basis = vest_price
+        else:
+            pre_tax.append(max(price - strike, 0.0) * quantity)
+            incomes.append(max(vest_price - strike, 0.0) * quantity)
+            # an option that was underwater at vest still cost the strike, so it
+            # never gains more than it's worth
+            basis = max(vest_price, strike)
+        gains.append((price - basis) * quantity)
+        if ordinal not in year_of:
+            year_of[ordinal] = date.fromordinal(ordinal).year
+        years.append(year_of[ordinal])
+    return TaxColumns(pre_tax, incomes, gains, tranches.kinds, years)
+
+
+def after_tax_values(schedule, tranches_by_symbol, prices):
+    """
+    The after-tax value of each symbol's tranches, as a dict of symbol to values
+
+    Income from every symbol counts towards the same brackets, so the tranches
+    are taxed all together, in date order.
+    """
+    if len(tranches_by_symbol) == 1:
+        ((symbol, tranches),) = tranches_by_symbol.items()
+        return {symbol: schedule.values(tax_columns(tranches, prices[symbol]))}
+
+    columns = {
+        symbol: tax_columns(tranches, prices[symbol])
+        for symbol, tranches in tranches_by_symbol.items()
+    }
+    order = list(
+        heapq.merge(
+            *(
+                _tagged(symbol, tranches.ordinals)
+                for symbol, tranches in tranches_by_symbol.items()
+            ),
+            key=_first,
+        )
+    )
+    merged = TaxColumns(
+        *(
+            [getattr(columns[symbol], field)[i] for _, symbol, i in order]
+            for field in TaxColumns._fields
+        )
+    )
+    values = {
+        symbol: array("d", bytes(8 * len(tranches)))
+        for symbol, tranches in tranches_by_symbol.items()
+    }
+    for (_, symbol, i), value in zip(order, schedule.values(merged)):
+        values[symbol][i] = value
+    return values
+
+
+def _tagged(symbol, ordinals):
+    for i, ordinal in enumerate(ordinals):
+        yield ordinal, symbol, i
+
+
+def sweep_tax_schedules(tranches, price, schedules, amounts, today=None):
+    """
+    Value the same tranches at price under every schedule in schedules
+
+    The price-dependent columns are worked out once, so each schedule only costs
+    a pass over them.
+    """
+    columns = tax_columns(tranches, price)
+    dates = tranches.dates()
+    today = today or date.today()
+    vested_count = bisect_right(tranches.ordinals, today.toordinal())
+    amounts = list(amounts)
+    for schedule in schedules:
+        cumulative = list(accumulate(schedule.values(columns)))
+        total_value = cumulative[-1] if cumulative else 0.0
+        vested_value = cumulative[vested_count - 1] if vested_count else 0.0
+        yield TaxScenario(
+            schedule.describe(),
+            total_value,
+            vested_value,
+            total_value - vested_value,
+            sweep_thresholds(dates, cumulative, amounts),
+        )
+
+
+def parse_tax_sweep(text):
+    """
+    Check a --tax-sweep argument (see read_tax_schedules) as it's parsed, so a bad
+    range or a missing file is a usage error. Returns text unchanged.
+    """
+    if text.count(":") == 2:
+        parse_price_range(text)
+    elif not os.path.isfile(text):
+        raise argparse.ArgumentTypeError(
+            f"tax sweep must be start:stop:step or a json file, got '{text}'"
+        )
+    return text
+
+
+def read_tax_schedules(text, default_rate=0.0):
+    """
+    The schedules for --tax-sweep: flat rates from a start:stop:step range, or a
+    json file holding a list of "tax" entries
+    """
+    if text.count(":") == 2:
+        return [TaxSchedule(rate) for rate in parse_price_range(text)]
+    with open(text, "r") as schedules_file:
+        return [
+            TaxSchedule.from_dict(spec, default_rate)
+            for spec in json.load(schedules_file)
+        ]
+
+
+def format_tax_sweep_table(scenarios, amounts, today=None):
+    """Lay out the scenarios as a table, one line per tax schedule"""
+    header = ["Taxes", "Total", "Vested", "Unvested"]
+    header += [f"< {format_currency(amount)}" for amount in amounts]
+    rows = [header]
+    today = today or date.today()
+    for scenario in scenarios:
+        row = [
+            scenario.name,
+            format_currency(scenario.total_value),
+            format_currency(scenario.vested_value),
+            format_currency(scenario.unvested_value),
+        ]
+        row += [
+            t.date.isoformat() if t is not None and t.date > today else "-"
+            for t in scenario.thresholds
+        ]
+        rows.append(row)
+    return format_table(rows)
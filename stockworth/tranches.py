@@ -0,0 +1,221 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import heapq
+import math
+from array import array
+from datetime import date
+from operator import itemgetter
+
+from equity import NSO, RSU
+from grant_rules import expand_grant, grant_kind
+from instrumentation import count
+
+_first = itemgetter(0)
+
+
+class Tranches:
+    """
+    Columnar storage for the tranches of a config's RSU and NSO grants
+
+    Rather than baking a price into one Equity object per tranche, this keeps the
+    inputs (vest date as an ordinal day, quantity, strike price and grant type,
+    RSU or NSO) in flat arrays, so the same tranches can be valued at any number of
+    prices without re-reading the config. Tranches from a config are sorted by
+    vest date.
+
+    vest_prices, if there are any, holds the share price each tranche vested at
+    (from the config's "vest_price"), or NaN where it isn't known. Only the tax
+    engine uses them.
+    """
+
+    def __init__(self, ordinals, quantities, strikes, kinds, vest_prices=None):
+        self.ordinals = ordinals
+        self.quantities = quantities
+        self.strikes = strikes
+        self.kinds = kinds
+        self.vest_prices = vest_prices
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def copy(self):
+        """Tranches with their own (writable) copy of every column"""
+        return Tranches(
+            array("l", self.ordinals),
+            array("d", self.quantities),
+            array("d", self.strikes),
+            array("b", self.kinds),
+            None if self.vest_prices is None else array("d", self.vest_prices),
+        )
+
+    def __reduce__(self):
+        # Compiled tranches are memoryviews of a mapped file, which can't be
+        # pickled, so they go to other processes (e.g. batch workers) as arrays
+        return (
+            Tranches,
+            (
+                _to_array("l", self.ordinals),
+                _to_array("d", self.quantities),
+                _to_array("d", self.strikes),
+                _to_array("b", self.kinds),
+                _to_array("d", self.vest_prices),
+            ),
+        )
+
+    @staticmethod
+    def from_config(config, symbol=None):
+        """
+        Tranches for the config's rsus and options, plus those generated from its
+        grants (see grant_rules), streamed straight into the arrays in date order
+
+        Only the entries for symbol (defaulting to the config's own symbol) are
+        included. An entry without a "symbol" of its own is for the config's symbol.
+
+        A config loaded from a config_cache.CompiledConfigCache already has its
+        tranches, which are used as they are.
+        """
+        default_symbol = config.get("symbol")
+        symbol = symbol or default_symbol
+
+        if "compiled_tranches" in config:
+            return _compiled_tranches(config, symbol)
+
+        def entries(key):
+            return (
+                entry
+                for entry in config.get(key, [])
+                if entry.get("symbol", default_symbol) == symbol
+            )
+
+        sources = []
+        if config["use_rsus"]:
+            sources.append(
+                sorted(
+                    (
+                        (
+                            _to_ordinal(rsu["vest_date"]),
+                            rsu["qty"],
+                            0.0,
+                            RSU,
+                            rsu.get("vest_price", math.nan),
+                        )
+                        for rsu in entries("rsus")
+                    ),
+                    key=_first,
+                )
+            )
+        if config["use_nsos"]:
+            sources.append(
+                sorted(
+                    (
+                        (
+                            _to_ordinal(option["vest_date"]),
+                            option["qty"],
+                            option["price"],
+                            NSO,
+                            option.get("vest_price", math.nan),
+                        )
+                        for option in entries("options")
+                    ),
+                    key=_first,
+                )
+            )
+        for grant in entries("grants"):
+            kind = grant_kind(grant)
+            if config["use_rsus"] if kind == RSU else config["use_nsos"]:
+                sources.append(_grant_tranches(grant, kind))
+
+        tranches = Tranches(array("l"), array("d"), array("d"), array("b"), array("d"))
+        for ordinal, quantity, strike, kind, vest_price in heapq.merge(
+            *sources, key=_first
+        ):
+            tranches.ordinals.append(ordinal)
+            tranches.quantities.append(quantity)
+            tranches.strikes.append(strike)
+            tranches.kinds.append(kind)
+            tranches.vest_prices.append(vest_price)
+        count("tranches", len(tranches))
+        return tranches
+
+    def dates(self):
+        return [date.fromordinal(o) for o in self.ordinals]
+
+    def values(self, price, tax_rate):
+        """The value of each tranche at a given price, same as Equity.from_rsu/from_option"""
+        after_tax = 1.0 - tax_rate
+        return [
+            (
+                price * quantity
+                if kind == RSU
+                else max(price * quantity - quantity * strike, 0.0)
+            )
+            * after_tax
+            for quantity, strike, kind in zip(self.quantities, self.strikes, self.kinds)
+        ]
+
+
+def config_symbols(config):
+    """Every symbol the config has equity in, starting with the config's own"""
+    if "compiled_tranches" in config:
+        return list(config["compiled_tranches"])
+    symbols = {config["symbol"]: None}
+    for key in ("rsus", "options", "grants"):
+        for entry in config.get(key, []):
+            symbols.setdefault(entry.get("symbol", config["symbol"]), None)
+    return list(symbols)
+
+
+def _compiled_tranches(config, symbol):
+    compiled = config["compiled_tranches"].get(symbol)
+    if compiled is None:
+        return Tranches(array("l"), array("d"), array("d"), array("b"), array("d"))
+    if not (config["use_rsus"] and config["use_nsos"]):
+        # --rsu-only is rare enough to copy the tranches it keeps
+        keep = [
+            i
+            for i, kind in enumerate(compiled.kinds)
+            if (config["use_rsus"] if kind == RSU else config["use_nsos"])
+        ]
+        compiled = Tranches(
+            array("l", (compiled.ordinals[i] for i in keep)),
+            array("d", (compiled.quantities[i] for i in keep)),
+            array("d", (compiled.strikes[i] for i in keep)),
+            array("b", (compiled.kinds[i] for i in keep)),
+            array("d", (compiled.vest_prices[i] for i in keep)),
+        )
+    count("tranches", len(compiled))
+    return compiled
+
+
+def _to_array(typecode, column):
+    if isinstance(column, memoryview):
+        return array(typecode, column)
+    return column
+
+
+def _grant_tranches(grant, kind):
+    strike = grant["price"] if kind == NSO else 0.0
+    for vest_date, quantity in expand_grant(grant):
+        yield vest_date.toordinal(), quantity, strike, kind, math.nan
+
+
+def _to_ordinal(vest_date):
+    if not isinstance(vest_date, date):
+        vest_date = date.fromisoformat(vest_date)
+    return vest_date.toordinal()
@@ -16,16 +16,126 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
+import argparse
+import locale
+import os
 from datetime import date
-from dateutil.relativedelta import relativedelta
+from functools import lru_cache
+
+# How many distinct formatted amounts and date deltas to remember. Big tables
+# repeat the same few over and over, and working them out again is the slow part
+# of writing them.
+FORMAT_CACHE_SIZE = 4096
+
+# Whether format_currency uses the LC_MONETARY locale, see set_currency_locale
+_localized_currency = False
 
 
 def format_currency(amount):
     # prefix with $, separate at thousands with ',', no decimal places
-    return f"${amount:,.0f}"
+    if not _localized_currency:
+        return f"${amount:,.0f}"
+    # rounded first, so every amount that formats the same shares a cache entry
+    return _format_locale_currency(round(amount, 0) + 0.0)
+
+
+def set_currency_locale(name):
+    """
+    Format currency for the locale name ("" for the environment's), or as plain
+    dollars if name is None. Raises locale.Error if the locale isn't available.
+    """
+    global _localized_currency
+    if name is not None:
+        locale.setlocale(locale.LC_MONETARY, name)
+    _localized_currency = name is not None
+    _format_locale_currency.cache_clear()
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_locale_currency(amount):
+    # whole units, grouped and placed around the symbol the way the locale does
+    conventions = locale.localeconv()
+    negative = amount < 0
+    number = locale.format_string("%.0f", abs(amount), grouping=True, monetary=True)
+    symbol = conventions["currency_symbol"]
+    if symbol:
+        prefix = "n_" if negative else "p_"
+        space = " " if conventions[prefix + "sep_by_space"] == 1 else ""
+        if conventions[prefix + "cs_precedes"] == 1:
+            number = f"{symbol}{space}{number}"
+        else:
+            number = f"{number}{space}{symbol}"
+    return f"-{number}" if negative else number
+
+
+def format_table(rows):
+    """Right-align rows of cells into columns, the first row being the header"""
+    if not rows:
+        return []
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [
+        "  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows
+    ]
+
+
+def format_date_delta(future_date, start_date=None):
+    return _format_date_delta(future_date, start_date or date.today())
+
 
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_date_delta(future_date, start_date):
+    # dateutil is only needed here, so don't pay for importing it until now
+    from dateutil.relativedelta import relativedelta
 
-def format_date_delta(future_date):
-    start_date = date.today()
     diff = relativedelta(future_date, start_date)
     return f"{diff.years} years, {diff.months} months, and {diff.days} days"
+
+
+def parse_date_range(text):
+    """Parse a START:END string of ISO dates, where either may be left out"""
+    start, _, end = text.partition(":")
+    try:
+        return (
+            date.fromisoformat(start) if start else None,
+            date.fromisoformat(end) if end else None,
+        )
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"date range must look like YYYY-MM-DD:YYYY-MM-DD, got '{text}'"
+        )
+
+
+def parse_date(text):
+    """Parse an ISO date"""
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"date must look like YYYY-MM-DD, got '{text}'"
+        )
+
+
+def parse_amounts(text):
+    """Parse a comma separated list of amounts"""
+    try:
+        return [float(amount) for amount in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"amounts must look like 1000,5000.50, got '{text}'"
+        )
+
+
+def parse_address(text):
+    """Parse [HOST:]PORT, with the host defaulting to localhost"""
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def default_cache_dir():
+    """$STOCKWORTH_CACHE_DIR, or stockworth under the XDG cache dir"""
+    if "STOCKWORTH_CACHE_DIR" in os.environ:
+        return os.environ["STOCKWORTH_CACHE_DIR"]
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "stockworth")
@@ -0,0 +1,161 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+from collections import namedtuple
+from datetime import date
+
+from equity_group import EquityGroup
+from instrumentation import phase
+from portfolio import Portfolio
+from tax import TaxSchedule, after_tax_values
+from tranches import Tranches, config_symbols
+from vesting_schedule import VestingSchedule
+
+"""
+The numbers behind stockworth's message, for a single config at a single price
+
+    schedule is a list of (ScheduleBin, value) pairs in ascending order, and
+    thresholds is in the same order as the config's thresholds. symbol and price
+    are for the config's own symbol; prices and symbol_values map every symbol
+    the config has equity in to its price and the total value of that equity.
+    Vested and unvested are as of as_of, which is today unless the config has an
+    "as_of" date.
+"""
+Valuation = namedtuple(
+    "Valuation",
+    [
+        "symbol",
+        "price",
+        "tax_rate",
+        "total_value",
+        "vested_value",
+        "unvested_value",
+        "schedule",
+        "thresholds",
+        "prices",
+        "symbol_values",
+        "as_of",
+    ],
+)
+
+
+def valuate(config, all_equity=None):
+    """
+    Value a config at config["price"]
+
+    all_equity can be passed in to reuse an EquityGroup already built from the
+    config and priced at config["price"], rather than building a new one.
+    """
+    # convert RSUs and options into date/value pairs
+    as_of = config.get("as_of") or date.today()
+    if all_equity is None:
+        with phase("convert to equity"):
+            all_equity = convert_to_equity(config["price"], config)
+
+    with phase("totals"):
+        # compute total value
+        total_value = all_equity.total_value()
+
+        # split out unvested equity from vested
+        vested_value = all_equity.vested_value(as_of)
+        unvested_value = total_value - vested_value
+
+    # produce threshold/date pairs
+    with phase("thresholds"):
+        thresholds = all_equity.compute_thresholds(amounts=config["thresholds"])
+
+    with phase("schedule"):
+        schedule = VestingSchedule(all_equity, config["bin_size"], as_of).sorted_bins()
+
+    if isinstance(all_equity, Portfolio):
+        symbol_values = all_equity.symbol_values()
+    else:
+        symbol_values = {config["symbol"]: total_value}
+
+    return Valuation(
+        config["symbol"],
+        config["price"],
+        config["tax_rate"],
+        total_value,
+        vested_value,
+        unvested_value,
+        schedule,
+        thresholds,
+        symbol_prices(config["price"], config),
+        symbol_values,
+        as_of,
+    )
+
+
+def convert_to_equity(latest_price, config):
+    """
+    An EquityGroup for the config at latest_price, or a Portfolio if the config
+    has equity in other symbols too (priced from config["prices"])
+
+    With a "tax" entry in the config (see tax.TaxSchedule), the group holds
+    after-tax values that can't be repriced or retaxed in place.
+    """
+    if len(config_symbols(config)) > 1:
+        return Portfolio.from_config(config, symbol_prices(latest_price, config))
+
+    # convert rsus and options into date/value pairs, without going through
+    # an Equity object for each of them
+    tranches = Tranches.from_config(config)
+    schedule = TaxSchedule.from_config(config)
+    if schedule is not None:
+        values = after_tax_values(
+            schedule, {config["symbol"]: tranches}, {config["symbol"]: latest_price}
+        )
+        return EquityGroup.from_columns(tranches.ordinals, values[config["symbol"]])
+    return EquityGroup.from_tranches(tranches, latest_price, config["tax_rate"])
+
+
+def symbol_prices(latest_price, config):
+    """The price of every symbol in the config, with latest_price for its own symbol"""
+    prices = {}
+    for symbol in config_symbols(config):
+        if symbol == config["symbol"]:
+            prices[symbol] = latest_price
+        elif symbol in config.get("prices", {}):
+            prices[symbol] = config["prices"][symbol]
+        else:
+            raise ValueError(f"No price for {symbol}")
+    return prices
+
+
+def unpriced_symbols(config):
+    """The symbols in the config that still need a price looking up"""
+    prices = config.get("prices", {})
+    return [
+        symbol
+        for symbol in config_symbols(config)
+        if (
+            config["price"] is None
+            if symbol == config["symbol"]
+            else symbol not in prices
+        )
+    ]
+
+
+def set_prices(config, prices):
+    """Fill in the price of each of the config's unpriced symbols from prices"""
+    for symbol in unpriced_symbols(config):
+        if symbol == config["symbol"]:
+            config["price"] = prices[symbol]
+        else:
+            config.setdefault("prices", {})[symbol] = prices[symbol]
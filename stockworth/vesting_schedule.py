@@ -16,35 +16,32 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # </editor-fold>
 
-from datetime import date
-
-from schedule_bin import ScheduleBin
 from util import format_currency
 
-
 # Given a EquityGroup, bin the value by vesting month.
 # Put everything already vested in a single bin.
 
 
 class VestingSchedule:
-    def __init__(self, equity_group, bin_size):
+    def __init__(self, equity_group, bin_size, today=None):
         self.equity_group = equity_group
-        self.vesting_bins = self._compute_schedule(bin_size)
-
-    def _compute_schedule(self, bin_size):
-        output = {}
-        for equity in self.equity_group.equity_list:
-            key = ScheduleBin(equity, bin_size)
-            if key in output:
-                output[key] = output[key] + equity.value
-            else:
-                output[key] = equity.value
-        return output
+        self.vesting_bins = self._compute_schedule(bin_size, today)
+
+    def _compute_schedule(self, bin_size, today=None):
+        # Bins come out of the group already in order, and dicts keep that order
+        return dict(self.equity_group.binned_values(bin_size, today))
+
+    def sorted_bins(self):
+        """(ScheduleBin, value) pairs in ascending order"""
+        return list(self.vesting_bins.items())
 
     def compute_and_format_schedule(self):
-        # sort the dictionary,
-        formatted_lines = []
-        for key, value in sorted(self.vesting_bins.items()):
-            formatted_value = format_currency(value)
-            formatted_lines.append(f"{key}: {formatted_value}")
-        return formatted_lines
+        return format_schedule(self.sorted_bins())
+
+
+def format_schedule(sorted_bins):
+    formatted_lines = []
+    for key, value in sorted_bins:
+        formatted_value = format_currency(value)
+        formatted_lines.append(f"{key}: {formatted_value}")
+    return formatted_lines
@@ -0,0 +1,128 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import difflib
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from valuation import convert_to_equity, unpriced_symbols, valuate
+
+
+class Watcher:
+    """
+    Keeps a config and its EquityGroup in memory, and only works out the output
+    again when the price, the date or the config file changes
+
+    load_config(path) reads the config, and get_price(symbol, config) looks up
+    the latest price of each of its symbols that doesn't have a fixed one. render(config,
+    valuation) turns a Valuation into the text to show. A price change reprices
+    the existing EquityGroup; only a change to the config file rebuilds it.
+    """
+
+    def __init__(self, path, load_config, get_price, render, today=date.today):
+        self.path = path
+        self.load_config = load_config
+        self.get_price = get_price
+        self.render = render
+        self.today = today
+        self.config = None
+        self.all_equity = None
+        self.lines = None
+        self._fixed_price = False
+        self._mtime = None
+        self._price = None
+        self._other_prices = {}
+        self._date = None
+
+    def poll(self):
+        """Check for changes, returning the new output lines, or None if nothing changed"""
+        mtime = os.stat(self.path).st_mtime_ns
+        reload = mtime != self._mtime
+        if reload:
+            self.config = self.load_config(self.path)
+            self._fixed_price = self.config["price"] is not None
+
+        if self._fixed_price:
+            price = self.config["price"]
+        else:
+            price = self.get_price(self.config["symbol"], self.config)
+        other_prices = {
+            symbol: self.get_price(symbol, self.config)
+            for symbol in unpriced_symbols(self.config)
+            if symbol != self.config["symbol"]
+        }
+        today = self.today()
+        if (
+            not reload
+            and price == self._price
+            and other_prices == self._other_prices
+            and today == self._date
+        ):
+            return None
+
+        config = dict(
+            self.config,
+            price=price,
+            prices=dict(self.config.get("prices", {}), **other_prices),
+        )
+        # After-tax values from a tax schedule can't be repriced in place
+        if reload or "tax" in config:
+            self.all_equity = convert_to_equity(price, config)
+            self._mtime = mtime
+        else:
+            if price != self._price:
+                self.all_equity.reprice(price)
+            for symbol, other_price in other_prices.items():
+                if other_price != self._other_prices.get(symbol):
+                    self.all_equity.reprice(other_price, symbol)
+        self._price = price
+        self._other_prices = other_prices
+        self._date = today
+
+        lines = self.render(config, valuate(config, self.all_equity)).splitlines()
+        if lines == self.lines:
+            return None
+        self.lines = lines
+        return lines
+
+    def run(self, stream, interval, sleep=time.sleep):
+        """Print the output, then keep polling every interval seconds and print what changed"""
+        while True:
+            previous = self.lines
+            try:
+                lines = self.poll()
+            except Exception as e:
+                # e.g. the network is down, or the config is half-written; try again later
+                print(f"stockworth: {e}", file=sys.stderr)
+                lines = None
+            if lines is not None:
+                for line in format_update(previous, lines):
+                    stream.write(line + "\n")
+                stream.flush()
+            sleep(interval)
+
+
+def format_update(previous, lines):
+    """All of lines the first time around, and after that just a diff against previous"""
+    if previous is None:
+        return lines
+    diff = difflib.unified_diff(previous, lines, lineterm="", n=0)
+    changes = [line for line in diff if not line.startswith(("---", "+++", "@@"))]
+    return [f"@ {datetime.now():%Y-%m-%d %H:%M:%S}"] + changes
@@ -0,0 +1,131 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from stockworth.async_quotes import BULK_SIZE, AsyncQuoteFetcher, RateLimiter
+
+
+class StubAlphaVantage(BaseHTTPRequestHandler):
+    """Answers GLOBAL_QUOTE and REALTIME_BULK_QUOTES requests from the server's prices dict"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        symbol = query["symbol"][0]
+        self.server.requests.append(symbol)
+        if query["function"][0] == "REALTIME_BULK_QUOTES":
+            data = {
+                "data": [
+                    {"symbol": s, "close": str(self.server.prices[s])}
+                    for s in symbol.split(",")
+                    if s in self.server.prices
+                ]
+            }
+        elif self.server.notes.get(symbol, 0) > 0:
+            self.server.notes[symbol] -= 1
+            data = {"Note": "Thank you for using Alpha Vantage!"}
+        elif symbol in self.server.prices:
+            data = {"Global Quote": {"05. price": str(self.server.prices[symbol])}}
+        else:
+            data = {"Error Message": "Invalid API call."}
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncQuoteFetcher(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAlphaVantage)
+        self.server.prices = {f"SYM{i}": float(i) for i in range(20)}
+        self.server.notes = {}
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.fetcher = AsyncQuoteFetcher(
+            "demo",
+            url=f"http://127.0.0.1:{self.server.server_port}/query",
+            requests_per_minute=None,
+            backoff=0.0,
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_many(self):
+        symbols = list(self.server.prices)
+        result = asyncio.run(self.fetcher.fetch_prices(symbols))
+        self.assertEqual(result, self.server.prices)
+        self.assertEqual(sorted(self.server.requests), sorted(symbols))
+
+    def test_retry_on_note(self):
+        self.server.notes["SYM3"] = 2
+        result = asyncio.run(self.fetcher.fetch_prices(["SYM3"]))
+        self.assertEqual(result, {"SYM3": 3.0})
+        self.assertEqual(self.server.requests, ["SYM3"] * 3)
+
+    def test_error_per_symbol(self):
+        result = asyncio.run(self.fetcher.fetch_prices(["SYM1", "NOPE"]))
+        self.assertEqual(result["SYM1"], 1.0)
+        self.assertIsInstance(result["NOPE"], ValueError)
+        self.assertEqual(self.server.requests.count("NOPE"), 1)
+
+    def test_bulk(self):
+        self.fetcher.bulk = True
+        symbols = [f"SYM{i}" for i in range(BULK_SIZE + 10)]
+        self.server.prices.update({symbol: 1.5 for symbol in symbols[20:]})
+        result = asyncio.run(self.fetcher.fetch_prices(symbols + ["NOPE"]))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(result["SYM3"], 3.0)
+        self.assertEqual(result[symbols[-1]], 1.5)
+        self.assertIsInstance(result["NOPE"], ValueError)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_waits_for_window(self):
+        clock = [0.0]
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        async def run():
+            limiter = RateLimiter(2, clock=lambda: clock[0], sleep=fake_sleep)
+            for _ in range(3):
+                await limiter.acquire()
+                clock[0] += 1.0
+
+        asyncio.run(run())
+        self.assertEqual(sleeps, [58.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
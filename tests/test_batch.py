@@ -0,0 +1,120 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import io
+import json
+import unittest
+from datetime import date, timedelta
+
+from stockworth.batch import valuate_batch
+from stockworth.output import write_rows
+from stockworth.interval import Interval
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        today = date.today()
+        self.configs = {}
+        for name, symbol in (("a", "GME"), ("b", "AMC"), ("c", "GME")):
+            self.configs[name] = {
+                "symbol": symbol,
+                "price": None,
+                "rsus": [{"qty": 10.0, "vest_date": today + timedelta(days=40)}],
+                "options": [],
+                "thresholds": [50.0],
+                "tax_rate": 0.0,
+                "use_rsus": True,
+                "use_nsos": True,
+                "bin_size": Interval.YEARLY,
+            }
+        self.lookups = []
+
+    def load_config(self, path):
+        return dict(self.configs[path])
+
+    def get_prices(self, configs_by_symbol):
+        self.lookups.append(sorted(configs_by_symbol))
+        prices = {"GME": 10.0, "AMC": 5.0, "BBBY": ValueError("Delisted")}
+        return {symbol: prices[symbol] for symbol in configs_by_symbol}
+
+    def test_one_lookup_per_symbol(self):
+        rows = list(valuate_batch(["a", "b", "c"], self.load_config, self.get_prices))
+        self.assertEqual(self.lookups, [["AMC", "GME"]])
+        self.assertEqual([row["file"] for row in rows], ["a", "b", "c"])
+        self.assertEqual([row["total_value"] for row in rows], [100.0, 50.0, 100.0])
+
+    def test_error_row(self):
+        rows = list(valuate_batch(["a", "missing"], self.load_config, self.get_prices))
+        self.assertNotIn("error", rows[0])
+        self.assertIn("error", rows[1])
+
+    def test_price_error_row(self):
+        self.configs["b"]["symbol"] = "BBBY"
+        rows = list(valuate_batch(["a", "b"], self.load_config, self.get_prices))
+        self.assertNotIn("error", rows[0])
+        self.assertEqual(rows[1]["error"], "Delisted")
+
+    def test_lookup_failure_rows(self):
+        def get_prices(configs_by_symbol):
+            raise ValueError("No API key")
+
+        rows = list(valuate_batch(["a", "b"], self.load_config, get_prices))
+        self.assertEqual([row["error"] for row in rows], ["No API key"] * 2)
+
+    def test_price_sources(self):
+        # each config is priced by its own provider, never another config's
+        self.configs["a"]["price_provider"] = {"type": "static", "prices": {"GME": 1.0}}
+        self.configs["c"]["price_provider"] = {
+            "type": "static",
+            "prices": {"GME": 20.0, "AMC": 4.0},
+        }
+        self.configs["c"]["rsus"].append(
+            dict(self.configs["c"]["rsus"][0], symbol="AMC")
+        )
+
+        def get_prices(configs_by_symbol):
+            self.lookups.append(sorted(configs_by_symbol))
+            provider = next(iter(configs_by_symbol.values()))["price_provider"]
+            return {symbol: provider["prices"][symbol] for symbol in configs_by_symbol}
+
+        self.configs["b"]["price_provider"] = self.configs["a"]["price_provider"]
+        self.configs["b"]["symbol"] = "GME"
+        rows = list(valuate_batch(["a", "b", "c"], self.load_config, get_prices))
+        self.assertEqual(sorted(self.lookups), [["AMC", "GME"], ["GME"]])
+        self.assertEqual([row["price"] for row in rows], [1.0, 1.0, 20.0])
+        self.assertEqual(rows[2]["prices"], {"GME": 20.0, "AMC": 4.0})
+
+    def test_write_jsonl(self):
+        rows = valuate_batch(["a", "b"], self.load_config, self.get_prices)
+        output = io.StringIO()
+        write_rows(rows, "jsonl", output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])["symbol"], "AMC")
+
+    def test_write_csv(self):
+        rows = valuate_batch(["a"], self.load_config, self.get_prices)
+        output = io.StringIO()
+        write_rows(rows, "csv", output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("a,GME,10.0,"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+
+from benchmarks.portfolio import synthetic_config
+from benchmarks.run import find_regressions
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_synthetic_config(self):
+        config = synthetic_config(300)
+        self.assertEqual(len(config["rsus"]) + len(config["options"]), 300)
+        self.assertEqual(config, synthetic_config(300))
+        self.assertNotEqual(config, synthetic_config(300, seed=1))
+
+    def test_find_regressions(self):
+        history = [
+            {"results": {"main[10]": 1.0, "main[1000]": 9.0}},
+            {"results": {"main[10]": 1.2}},
+            {"results": {"main[10]": 1.1, "main[1000]": 10.0}},
+        ]
+        results = {"main[10]": 1.3, "main[1000]": 12.0, "vesting_schedule[10]": 5.0}
+        regressions = find_regressions(results, history, 0.15, 2)
+        # main[10]'s baseline is the median of its last 2 runs, 1.15
+        self.assertEqual(regressions, [("main[1000]", 12.0, 9.5)])
+        self.assertEqual(find_regressions(results, history, 0.5, 5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date
+from unittest import mock
+
+from stockworth import cohort
+from stockworth.cohort import CohortTable, format_cohort_table, summarize_cohort
+from stockworth.interval import Interval
+from stockworth.output import cohort_row
+from stockworth.schedule_bin import VESTED
+
+
+def make_config(rsu_qty, option_qty, tax_rate=0.0, thresholds=()):
+    return {
+        "symbol": "GME",
+        "price": 10.0,
+        "prices": {},
+        "rsus": [
+            {"qty": rsu_qty, "vest_date": date(2024, 6, 1)},
+            {"qty": rsu_qty, "vest_date": date(2025, 6, 1)},
+            {"qty": rsu_qty, "vest_date": date(2026, 6, 1)},
+        ],
+        "options": [
+            {"qty": option_qty, "price": 5.0, "vest_date": date(2025, 3, 1)},
+        ],
+        "thresholds": list(thresholds),
+        "tax_rate": tax_rate,
+        "use_rsus": True,
+        "use_nsos": True,
+    }
+
+
+class TestCohort(unittest.TestCase):
+    def setUp(self):
+        self.table = CohortTable.from_configs(
+            [
+                ("a.json", make_config(10.0, 20.0, thresholds=[150.0, 40.0])),
+                ("b.json", make_config(5.0, 0.0, tax_rate=0.5, thresholds=[40.0])),
+            ]
+        )
+
+    def test_table(self):
+        self.assertEqual(len(self.table), 2)
+        self.assertEqual(list(self.table.starts), [0, 4, 8])
+        self.assertEqual(
+            list(self.table.ordinals[:4]),
+            [
+                date(2024, 6, 1).toordinal(),
+                date(2025, 3, 1).toordinal(),
+                date(2025, 6, 1).toordinal(),
+                date(2026, 6, 1).toordinal(),
+            ],
+        )
+        self.assertEqual(list(self.table.tax_rates), [0.0, 0.5])
+        self.assertEqual(list(self.table.threshold_starts), [0, 2, 3])
+        self.assertEqual(self.table.amounts(), [150.0, 40.0])
+
+    def test_summarize(self):
+        cohort_bins = summarize_cohort(
+            self.table, Interval.YEARLY, as_of=date(2024, 12, 31)
+        )
+        self.assertEqual(
+            [b.schedule_bin.key for b in cohort_bins], [VESTED, 2025, 2026]
+        )
+        # a: 100 vested, 100 + 100 (options) in 2025, 100 in 2026
+        # b: 25 vested, 25 in 2025, 25 in 2026 after tax, and options worth nothing
+        self.assertEqual([b.value for b in cohort_bins], [125.0, 225.0, 125.0])
+        self.assertEqual([b.employees for b in cohort_bins], [2, 2, 2])
+        # only a has a threshold of 150, which it drops below in 2025, and it drops
+        # below 40 in 2026, while b drops below 40 in 2025
+        self.assertEqual([b.crossings for b in cohort_bins], [[0, 0], [1, 1], [0, 1]])
+
+    def test_shared_memory_matches(self):
+        configs = [
+            (
+                f"{i}.json",
+                make_config(
+                    float(i),
+                    float(i % 7),
+                    tax_rate=0.1 * (i % 3),
+                    thresholds=[500.0, 100.0, 0.0][: i % 4],
+                ),
+            )
+            for i in range(50)
+        ]
+        table = CohortTable.from_configs(configs)
+        expected = summarize_cohort(
+            table, Interval.QUARTERLY, as_of=date(2025, 1, 1), jobs=1
+        )
+        with mock.patch.object(cohort, "MIN_PARALLEL_ROWS", 0):
+            shared = summarize_cohort(
+                table, Interval.QUARTERLY, as_of=date(2025, 1, 1), jobs=2
+            )
+        self.assertEqual(
+            [(b.schedule_bin.key, b.employees, b.crossings) for b in shared],
+            [(b.schedule_bin.key, b.employees, b.crossings) for b in expected],
+        )
+        for bin_shared, bin_expected in zip(shared, expected):
+            self.assertAlmostEqual(bin_shared.value, bin_expected.value)
+
+    def test_output(self):
+        cohort_bins = summarize_cohort(
+            self.table, Interval.YEARLY, as_of=date(2024, 12, 31)
+        )
+        lines = format_cohort_table(cohort_bins, [150.0, 40.0])
+        self.assertEqual(
+            lines[0].split(),
+            ["Period", "Vesting", "Employees", "<", "$150", "<", "$40"],
+        )
+        self.assertEqual(lines[1].split(), ["Vested", "$125", "2", "0", "0"])
+        self.assertEqual(
+            cohort_row(cohort_bins[1], [150.0, 40.0]),
+            {
+                "period": "2025",
+                "value": 225.0,
+                "employees": 2,
+                "crossings": {"150.0": 1, "40.0": 1},
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from stockworth.batch import valuate_batch
+from stockworth.config_cache import CompiledConfigCache
+from stockworth.interval import Interval
+from stockworth.tranches import Tranches, config_symbols
+from stockworth.valuation import valuate
+
+
+class TestCompiledConfigCache(unittest.TestCase):
+    def setUp(self):
+        today = date.today()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+        self.cache = CompiledConfigCache(
+            os.path.join(self.directory.name, "cache"), min_size=0
+        )
+        self.config = {
+            "symbol": "GME",
+            "rsus": [
+                {"qty": 10.0, "vest_date": str(today + timedelta(days=100))},
+                {"qty": 10.0, "vest_date": str(today - timedelta(days=10))},
+                {
+                    "qty": 50.0,
+                    "vest_date": str(today + timedelta(days=50)),
+                    "symbol": "AMC",
+                    "vest_price": 2.0,
+                },
+            ],
+            "options": [
+                {"qty": 20.0, "price": 3.0, "vest_date": str(today)},
+            ],
+            "grants": [
+                {
+                    "type": "rsu",
+                    "qty": 48,
+                    "grant_date": "2022-01-15",
+                    "duration_months": 48,
+                    "cliff_months": 12,
+                    "cadence_months": 3,
+                },
+            ],
+            "thresholds": [150.0, 50.0],
+        }
+        self.write(self.config)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, config):
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file)
+
+    def settings(self, config, **overrides):
+        settings = dict(
+            price=10.0,
+            prices={"AMC": 4.0},
+            tax_rate=0.0,
+            use_rsus=True,
+            use_nsos=True,
+            bin_size=Interval.YEARLY,
+        )
+        settings.update(overrides)
+        config.update(settings)
+        return config
+
+    def assertSameTranches(self, compiled, expected):
+        for column in ("ordinals", "quantities", "strikes", "kinds", "vest_prices"):
+            # NaN (for an unknown vest price) isn't equal to itself
+            self.assertEqual(
+                [x if x == x else None for x in getattr(compiled, column)],
+                [x if x == x else None for x in getattr(expected, column)],
+            )
+
+    def test_compiled(self):
+        first = self.cache.load(self.path)
+        self.assertNotIn("compiled_tranches", first)
+        compiled = self.cache.load(self.path)
+        self.assertNotIn("rsus", compiled)
+        self.assertEqual(compiled["thresholds"], [150.0, 50.0])
+        self.assertEqual(config_symbols(compiled), ["GME", "AMC"])
+
+        for use_rsus, use_nsos in ((True, True), (True, False), (False, True)):
+            expected = self.settings(
+                dict(self.config), use_rsus=use_rsus, use_nsos=use_nsos
+            )
+            config = self.settings(dict(compiled), use_rsus=use_rsus, use_nsos=use_nsos)
+            for symbol in ("GME", "AMC"):
+                self.assertSameTranches(
+                    Tranches.from_config(config, symbol),
+                    Tranches.from_config(expected, symbol),
+                )
+
+    def test_valuate(self):
+        self.cache.load(self.path)
+        compiled = self.settings(self.cache.load(self.path))
+        self.assertIn("compiled_tranches", compiled)
+        self.assertEqual(valuate(compiled), valuate(self.settings(self.config)))
+
+        compiled["tax"] = expected_tax = {"rsu_rate": 0.3, "capital_gains_rate": 0.1}
+        self.config["tax"] = expected_tax
+        self.assertEqual(valuate(compiled), valuate(self.settings(self.config)))
+
+    def test_batch_workers(self):
+        # compiled tranches have to survive being sent to worker processes
+        self.cache.load(self.path)
+        rows = list(
+            valuate_batch(
+                [self.path, self.path],
+                lambda path: self.settings(self.cache.load(path)),
+                get_prices=None,
+                jobs=2,
+            )
+        )
+        expected = valuate(self.settings(self.config))
+        self.assertEqual(
+            [row.get("error") for row in rows], [None, None], [row for row in rows]
+        )
+        self.assertEqual(
+            [row["total_value"] for row in rows], [expected.total_value] * 2
+        )
+
+    def test_changed(self):
+        self.cache.load(self.path)
+        self.config["rsus"].pop()
+        self.write(self.config)
+        config = self.cache.load(self.path)
+        self.assertNotIn("compiled_tranches", config)
+        self.assertEqual(len(config["rsus"]), 2)
+        self.assertEqual(config_symbols(self.cache.load(self.path)), ["GME"])
+
+    def test_touched(self):
+        self.cache.load(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIn("compiled_tranches", self.cache.load(self.path))
+
+    def test_small(self):
+        cache = CompiledConfigCache(self.cache.cache_dir)
+        cache.load(self.path)
+        self.assertEqual(cache.load(self.path), self.config)
+
+    def test_corrupt(self):
+        self.cache.load(self.path)
+        (name,) = os.listdir(self.cache.cache_dir)
+        with open(os.path.join(self.cache.cache_dir, name), "r+b") as cache_file:
+            cache_file.truncate(100)
+        self.assertEqual(self.cache.load(self.path), self.config)
+        self.assertIn("compiled_tranches", self.cache.load(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
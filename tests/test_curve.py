@@ -0,0 +1,98 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date, timedelta
+
+from stockworth.curve import VestingCurve
+from stockworth.equity_group import EquityGroup
+from stockworth.interval import Interval
+from stockworth.tranches import Tranches
+from stockworth.valuation import valuate
+
+
+class TestVestingCurve(unittest.TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.config = {
+            "symbol": "GME",
+            "price": 10.0,
+            "rsus": [
+                {"qty": 10.0, "vest_date": self.today - timedelta(days=10)},
+                {"qty": 10.0, "vest_date": self.today + timedelta(days=2)},
+                {"qty": 5.0, "vest_date": self.today + timedelta(days=2)},
+            ],
+            "options": [
+                {
+                    "qty": 20.0,
+                    "price": 5.0,
+                    "vest_date": self.today + timedelta(days=4),
+                },
+            ],
+            "thresholds": [150.0],
+            "tax_rate": 0.0,
+            "use_rsus": True,
+            "use_nsos": True,
+            "bin_size": Interval.YEARLY,
+        }
+        self.group = EquityGroup.from_tranches(
+            Tranches.from_config(self.config), 10.0, 0.0
+        )
+
+    def test_curve(self):
+        curve = self.group.vesting_curve()
+        self.assertEqual(curve.total, 350.0)
+        self.assertEqual(curve.final_date, self.today + timedelta(days=4))
+        dates = [self.today + timedelta(days=days) for days in (5, -20, 0, 2, 3)]
+        self.assertEqual(curve.vested_at(dates), [350.0, 0.0, 100.0, 250.0, 250.0])
+        self.assertEqual(curve.unvested_at(dates), [0.0, 350.0, 250.0, 100.0, 100.0])
+        self.assertEqual(
+            curve.vested_at(dates), [self.group.value_at(d) for d in dates]
+        )
+
+        points = list(curve.daily())
+        self.assertEqual([p.date for p in points][0], self.today)
+        self.assertEqual(
+            [p.unvested_value for p in points], [250.0, 250.0, 100.0, 100.0, 0.0]
+        )
+        points = list(
+            curve.daily(self.today + timedelta(days=3), self.today + timedelta(days=6))
+        )
+        self.assertEqual([p.vested_value for p in points], [250.0, 350.0, 350.0, 350.0])
+
+    def test_fixed_values(self):
+        group = EquityGroup.from_columns(self.group.ordinals, self.group.values)
+        curve = group.vesting_curve()
+        self.assertEqual(list(curve.cumulative), [100.0, 250.0, 350.0])
+
+    def test_empty(self):
+        curve = VestingCurve([], [])
+        self.assertEqual(curve.vested_at([self.today]), [0.0])
+        self.assertIsNone(curve.final_date)
+        self.assertEqual([p.date for p in curve.daily()], [self.today])
+
+    def test_valuate_as_of(self):
+        valuation = valuate(dict(self.config, as_of=self.today + timedelta(days=3)))
+        self.assertEqual(valuation.as_of, self.today + timedelta(days=3))
+        self.assertEqual(valuation.vested_value, 250.0)
+        self.assertEqual(valuation.thresholds[0].date, self.today + timedelta(days=2))
+        self.assertEqual(valuate(self.config).vested_value, 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
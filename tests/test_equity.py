@@ -41,6 +41,18 @@ class TestEquity(unittest.TestCase):
         exp_result = instance.value
         self.assertEqual(result, exp_result)
 
+    def test_no_instance_dict(self):
+        instance = Equity(date.today(), 100.0)
+        self.assertFalse(hasattr(instance, "__dict__"))
+
+    def test_reprice_option(self):
+        instance = Equity.from_option(15.0, 5.0, date.today(), 14.0, 0.0)
+        instance.reprice(10.0)
+        self.assertEqual(instance.value, 0.0)
+        instance.reprice(16.0)
+        instance.retax(0.5)
+        self.assertEqual(instance.value, 5.0)
+
     # Happy path test
     def test_from_rsu(self):
         vest_date = date(2020, 7, 8)
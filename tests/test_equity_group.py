@@ -21,6 +21,7 @@ from datetime import date, timedelta
 
 from stockworth.equity import Equity
 from stockworth.equity_group import EquityGroup
+from stockworth.tranches import Tranches
 
 
 class TestEquityGroup(unittest.TestCase):
@@ -86,6 +87,134 @@ class TestEquityGroup(unittest.TestCase):
         )
         self.assertEqual(result, exp_result)
 
+    def test_add(self):
+        instance = EquityGroup(self.last_month)
+        self.assertEqual(instance.total_value(), self.last_month_value)
+        instance.add(self.next_year[0])
+        result = instance.value_at(date.today() + timedelta(weeks=100))
+        exp_result = self.last_month_value + self.next_year_value
+        self.assertEqual(result, exp_result)
+
+    def test_from_tranches_add(self):
+        today = date.today()
+        config = {
+            "symbol": "GME",
+            "rsus": [{"qty": 10.0, "vest_date": today - timedelta(days=10)}],
+            "use_rsus": True,
+            "use_nsos": True,
+        }
+        tranches = Tranches.from_config(config)
+        instance = EquityGroup.from_tranches(tranches, 10.0, 0.0)
+        instance.add(Equity.from_rsu(10.0, 5.0, today + timedelta(days=10), 0.0))
+        self.assertEqual(len(instance), 2)
+        self.assertEqual(len(instance.tranches), 2)
+        self.assertEqual(instance.total_value(), 150.0)
+        self.assertEqual(instance.vested_value(), 100.0)
+        # the tranches it was built from are left alone
+        self.assertEqual(len(tranches), 1)
+
+    # A total much bigger than the last tranche mustn't hide that tranche
+    def test_price_index_thresholds_are_exact(self):
+        config = {
+            "symbol": "GME",
+            "rsus": [
+                {"qty": 2e9, "vest_date": date(2030, 1, 1)},
+                {"qty": 1.0, "vest_date": date(2031, 1, 1)},
+            ],
+            "use_rsus": True,
+            "use_nsos": True,
+        }
+        tranches = Tranches.from_config(config)
+        instance = EquityGroup.from_tranches(tranches, 1.0, 0.0)
+        exp_result = EquityGroup.from_columns(tranches.ordinals, [2e9, 1.0])
+        amounts = [0.0, 0.5, 1.0, 1.5]
+        self.assertEqual(
+            instance.compute_thresholds(amounts), exp_result.compute_thresholds(amounts)
+        )
+        self.assertEqual(instance.compute_threshold(0.5).date, date(2031, 1, 1))
+
+    def test_from_columns(self):
+        equity_list = self.last_month + self.next_month + self.next_year
+        instance = EquityGroup.from_columns(
+            [e.date.toordinal() for e in equity_list], [e.value for e in equity_list]
+        )
+        self.assertEqual(instance.total_value(), self.instance.total_value())
+        self.assertEqual(instance.vested_value(), self.instance.vested_value())
+        self.assertEqual(instance.vesting_dates, self.instance.vesting_dates)
+
+    def test_equity_list(self):
+        equity_list = self.instance.equity_list
+        self.assertEqual(len(equity_list), 6)
+        self.assertEqual(equity_list[0].date, self.last_month[0].date)
+        self.assertEqual(equity_list[0].value, self.last_month[0].value)
+
+    def test_reprice(self):
+        today = date.today()
+        grants = [
+            (10.0, 0.0, today - timedelta(days=10)),
+            (20.0, 5.0, today + timedelta(days=10)),
+            (30.0, 15.0, today + timedelta(days=20)),
+        ]
+
+        def build(price, tax_rate):
+            return EquityGroup(
+                (
+                    Equity.from_rsu(price, q, d, tax_rate)
+                    if strike == 0.0
+                    else Equity.from_option(price, q, d, strike, tax_rate)
+                )
+                for q, strike, d in grants
+            )
+
+        instance = build(10.0, 0.0)
+        for price, tax_rate in ((20.0, 0.0), (4.0, 0.0), (16.0, 0.25), (15.0, 0.25)):
+            instance.reprice(price)
+            instance.retax(tax_rate)
+            exp_result = build(price, tax_rate)
+            self.assertAlmostEqual(instance.total_value(), exp_result.total_value())
+            self.assertAlmostEqual(instance.vested_value(), exp_result.vested_value())
+            self.assertEqual(
+                instance.compute_thresholds([0.0, 100.0]),
+                exp_result.compute_thresholds([0.0, 100.0]),
+            )
+            self.assertEqual(list(instance.values), list(exp_result.values))
+
+    # Equity made straight from a value doesn't know how to be repriced
+    def test_reprice_fixed_value(self):
+        with self.assertRaises(ValueError):
+            self.instance.reprice(10.0)
+
+    def test_prices_for(self):
+        today = date.today()
+        instance = EquityGroup(
+            [
+                Equity.from_rsu(10.0, 10.0, today - timedelta(days=10), 0.0),
+                Equity.from_option(10.0, 20.0, today + timedelta(days=10), 5.0, 0.0),
+                Equity.from_option(10.0, 30.0, today + timedelta(days=20), 15.0, 0.0),
+            ]
+        )
+        # below the 15 strike, only the first option is in the money
+        self.assertEqual(
+            [t.price for t in instance.prices_for_unvested([0.0, 100.0, 500.0])],
+            [0.0, 10.0, 21.0],
+        )
+        self.assertEqual(
+            [t.price for t in instance.prices_for_vested([50.0, 500.0])],
+            [5.0, 17.5],
+        )
+        self.assertEqual(
+            [t.price for t in instance.prices_for_vested([100.0], today)], [10.0]
+        )
+        self.assertIsNone(
+            instance.prices_for_unvested([1.0], today + timedelta(days=30))[0].price
+        )
+        instance.retax(0.5)
+        self.assertEqual(instance.prices_for_unvested([100.0])[0].price, 15.0)
+
+    def test_prices_for_fixed_value(self):
+        with self.assertRaises(ValueError):
+            self.instance.prices_for_unvested([10.0])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,133 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date
+
+from stockworth.equity import NSO, RSU
+from stockworth.grant_rules import add_months, expand_grant, iter_equity
+from stockworth.tranches import Tranches
+
+
+class TestGrantRules(unittest.TestCase):
+    def test_cliff_vests_accrued_shares_at_once(self):
+        grant = {
+            "grant_date": "2021-03-01",
+            "qty": 4800,
+            "duration_months": 48,
+            "cliff_months": 12,
+        }
+        tranches = list(expand_grant(grant))
+        self.assertEqual(tranches[0], (date(2022, 3, 1), 1200))
+        self.assertEqual(tranches[1], (date(2022, 4, 1), 100))
+        self.assertEqual(tranches[-1], (date(2025, 3, 1), 100))
+        self.assertEqual(len(tranches), 37)
+
+    def test_whole_shares_add_up(self):
+        grant = {
+            "grant_date": "2021-01-15",
+            "qty": 1000,
+            "duration_months": 36,
+            "cadence_months": 3,
+        }
+        quantities = [qty for _, qty in expand_grant(grant)]
+        self.assertEqual(sum(quantities), 1000)
+        self.assertTrue(all(float(qty).is_integer() for qty in quantities))
+        self.assertEqual(len(quantities), 12)
+
+    def test_back_loading(self):
+        grant = {
+            "grant_date": "2021-01-01",
+            "qty": 1000,
+            "duration_months": 48,
+            "cadence_months": 12,
+            "back_loading": [5, 15, 40, 40],
+        }
+        self.assertEqual([qty for _, qty in expand_grant(grant)], [50, 150, 400, 400])
+
+    def test_back_loading_needs_a_weight_per_year(self):
+        for weights in ([25, 25, 25], [25, 25, 25, 25, 100]):
+            grant = {
+                "grant_date": "2021-01-01",
+                "qty": 1000,
+                "duration_months": 48,
+                "back_loading": weights,
+            }
+            with self.assertRaises(ValueError):
+                list(expand_grant(grant))
+
+    def test_add_months_clamps_to_end_of_month(self):
+        self.assertEqual(add_months(date(2021, 1, 31), 1), date(2021, 2, 28))
+        self.assertEqual(add_months(date(2021, 11, 30), 3), date(2022, 2, 28))
+        self.assertEqual(add_months(date(2023, 12, 31), 2), date(2024, 2, 29))
+
+    def test_iter_equity(self):
+        grants = [
+            {
+                "type": "nso",
+                "grant_date": "2021-01-01",
+                "qty": 100,
+                "price": 10.0,
+                "duration_months": 12,
+                "cadence_months": 6,
+            }
+        ]
+        values = [equity.value for equity in iter_equity(grants, 12.0, 0.0)]
+        self.assertEqual(values, [100.0, 100.0])
+
+    def test_unknown_type(self):
+        grant = {"type": "psu", "grant_date": "2021-01-01", "qty": 1}
+        with self.assertRaises(ValueError):
+            list(iter_equity([grant], 1.0, 0.0))
+
+    def test_tranches_merge_grants_in_date_order(self):
+        config = {
+            "use_rsus": True,
+            "use_nsos": True,
+            "rsus": [{"vest_date": "2021-08-15", "qty": 7}],
+            "options": [{"vest_date": "2021-05-15", "qty": 3, "price": 2.0}],
+            "grants": [
+                {
+                    "grant_date": "2021-01-01",
+                    "qty": 12,
+                    "duration_months": 12,
+                    "cadence_months": 3,
+                }
+            ],
+        }
+        tranches = Tranches.from_config(config)
+        self.assertEqual(
+            tranches.dates(),
+            [
+                date(2021, 4, 1),
+                date(2021, 5, 15),
+                date(2021, 7, 1),
+                date(2021, 8, 15),
+                date(2021, 10, 1),
+                date(2022, 1, 1),
+            ],
+        )
+        self.assertEqual(list(tranches.kinds), [RSU, NSO, RSU, RSU, RSU, RSU])
+        self.assertEqual(list(tranches.quantities), [3, 3, 3, 7, 3, 3])
+
+        config["use_rsus"] = False
+        self.assertEqual(len(Tranches.from_config(config)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
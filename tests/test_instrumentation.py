@@ -0,0 +1,78 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import io
+import os
+import tempfile
+import unittest
+
+from stockworth import instrumentation
+from stockworth.instrumentation import collect, count, phase, profile, trace_memory
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled(self):
+        with phase("outside"):
+            count("things")
+        self.assertIsNone(instrumentation._current)
+
+    def test_collect(self):
+        with collect() as metrics:
+            with phase("outer"):
+                count("things")
+                with phase("inner"):
+                    count("things", 2)
+            with phase("inner"):
+                pass
+        self.assertIsNone(instrumentation._current)
+        self.assertEqual(
+            [(p.name, p.depth) for p in metrics.phases],
+            [("outer", 0), ("inner", 1), ("inner", 0)],
+        )
+        self.assertGreaterEqual(metrics.phases[0].wall, metrics.phases[1].wall)
+        self.assertEqual(metrics.counters["things"], 3)
+        summary = metrics.as_dict()
+        self.assertEqual(summary["counters"], {"things": 3})
+        self.assertEqual(summary["phases"]["inner"]["calls"], 2)
+
+        stream = io.StringIO()
+        metrics.report(stream)
+        lines = stream.getvalue().splitlines()
+        self.assertTrue(lines[2].startswith("  inner"))
+        self.assertIn("things", stream.getvalue())
+
+    def test_nested_collect(self):
+        with collect() as outer:
+            with collect() as inner:
+                count("things")
+            count("other things")
+        self.assertEqual(dict(inner.counters), {"things": 1})
+        self.assertEqual(dict(outer.counters), {"other things": 1})
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stats = os.path.join(directory, "stats")
+            snapshot = os.path.join(directory, "snapshot")
+            with profile(stats), trace_memory(snapshot):
+                sorted(range(1000), key=str)
+            self.assertGreater(os.path.getsize(stats), 0)
+            self.assertGreater(os.path.getsize(snapshot), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import io
+import json
+import unittest
+from datetime import date
+
+from stockworth.interval import Interval
+from stockworth.output import SCENARIO_FIELDS, scenario_row, write_rows
+from stockworth.price_sweep import sweep_prices
+from stockworth.tranches import Tranches
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class TestOutput(unittest.TestCase):
+    def setUp(self):
+        config = {
+            "use_rsus": True,
+            "use_nsos": True,
+            "rsus": [{"qty": 10.0, "vest_date": date(2099, 1, 1)}],
+            "options": [{"qty": 10.0, "price": 15.0, "vest_date": date(2000, 1, 1)}],
+        }
+        scenarios = sweep_prices(
+            Tranches.from_config(config), [10.0, 20.0], 0.0, [50.0], Interval.YEARLY
+        )
+        self.rows = [scenario_row(scenario, [50.0]) for scenario in scenarios]
+
+    def write(self, output_format, rows=None):
+        output = io.StringIO()
+        write_rows(
+            iter(self.rows if rows is None else rows),
+            output_format,
+            output,
+            fields=SCENARIO_FIELDS,
+        )
+        return output.getvalue()
+
+    def test_scenario_row(self):
+        self.assertEqual(
+            self.rows[1],
+            {
+                "price": 20.0,
+                "total_value": 250.0,
+                "vested_value": 50.0,
+                "unvested_value": 200.0,
+                "schedule": {"Vested": 50.0, "2099": 200.0},
+                "thresholds": [{"amount": 50.0, "date": "2099-01-01"}],
+            },
+        )
+
+    # An empty group (e.g. --rsu-only with only options) has no threshold dates
+    def test_empty_thresholds(self):
+        scenario = sweep_prices(
+            Tranches.from_config(
+                {"use_rsus": True, "use_nsos": False, "options": [], "rsus": []}
+            ),
+            [10.0],
+            0.0,
+            [50.0],
+            Interval.YEARLY,
+        )[0]
+        self.assertEqual(
+            scenario_row(scenario, [50.0])["thresholds"],
+            [{"amount": 50.0, "date": None}],
+        )
+
+    def test_json(self):
+        self.assertEqual(json.loads(self.write("json")), self.rows)
+        self.assertEqual(json.loads(self.write("json", rows=[])), [])
+
+    def test_ndjson(self):
+        lines = self.write("ndjson").splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.rows)
+        self.assertEqual(self.write("jsonl"), self.write("ndjson"))
+
+    def test_csv(self):
+        lines = self.write("csv").splitlines()
+        self.assertEqual(lines[0], ",".join(SCENARIO_FIELDS))
+        self.assertEqual(
+            lines[2], "20.0,250.0,50.0,200.0,Vested=50.0;2099=200.0,50.0=2099-01-01"
+        )
+
+    @unittest.skipIf(msgpack is None, "msgpack isn't installed")
+    def test_msgpack(self):
+        output = io.BytesIO()
+        write_rows(self.rows, "msgpack", output)
+        unpacker = msgpack.Unpacker(io.BytesIO(output.getvalue()))
+        self.assertEqual(list(unpacker), self.rows)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.write("xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
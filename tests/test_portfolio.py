@@ -0,0 +1,112 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date, timedelta
+
+from stockworth.batch import valuate_batch
+from stockworth.equity_group import EquityGroup
+from stockworth.interval import Interval
+from stockworth.portfolio import Portfolio
+from stockworth.tranches import Tranches, config_symbols
+from stockworth.valuation import unpriced_symbols, valuate
+
+
+class TestPortfolio(unittest.TestCase):
+    def setUp(self):
+        today = date.today()
+        self.config = {
+            "symbol": "GME",
+            "price": 10.0,
+            "prices": {"AMC": 4.0},
+            "rsus": [
+                {"qty": 10.0, "vest_date": today - timedelta(days=10)},
+                {"qty": 10.0, "vest_date": today + timedelta(days=100)},
+                {"qty": 50.0, "vest_date": today + timedelta(days=50), "symbol": "AMC"},
+            ],
+            "options": [
+                {
+                    "qty": 20.0,
+                    "price": 3.0,
+                    "vest_date": today + timedelta(days=200),
+                    "symbol": "BBBY",
+                },
+            ],
+            "thresholds": [150.0, 50.0],
+            "tax_rate": 0.0,
+            "use_rsus": True,
+            "use_nsos": True,
+            "bin_size": Interval.YEARLY,
+        }
+
+    def test_config_symbols(self):
+        self.assertEqual(config_symbols(self.config), ["GME", "AMC", "BBBY"])
+        self.assertEqual(unpriced_symbols(self.config), ["BBBY"])
+        self.assertEqual(len(Tranches.from_config(self.config)), 2)
+        self.assertEqual(len(Tranches.from_config(self.config, "AMC")), 1)
+
+    def test_combined_value_and_thresholds(self):
+        prices = {"GME": 10.0, "AMC": 4.0, "BBBY": 5.0}
+        portfolio = Portfolio.from_config(self.config, prices)
+        self.assertEqual(len(portfolio), 4)
+        self.assertEqual(
+            portfolio.symbol_values(), {"GME": 200.0, "AMC": 200.0, "BBBY": 40.0}
+        )
+        self.assertEqual(portfolio.total_value(), 440.0)
+        self.assertEqual(portfolio.vested_value(), 100.0)
+
+        # Unvested is 340, then 140 once AMC vests, then 40, then nothing
+        thresholds = portfolio.compute_thresholds([150.0, 50.0])
+        today = date.today()
+        self.assertEqual(thresholds[0].date, today + timedelta(days=50))
+        self.assertEqual(thresholds[1].date, today + timedelta(days=100))
+
+        portfolio.reprice(20.0)
+        portfolio.reprice(2.0, "BBBY")
+        self.assertEqual(portfolio.total_value(), 600.0)
+
+    def test_valuate(self):
+        self.config["prices"]["BBBY"] = 5.0
+        valuation = valuate(self.config)
+        self.assertEqual(valuation.total_value, 440.0)
+        self.assertEqual(valuation.prices, {"GME": 10.0, "AMC": 4.0, "BBBY": 5.0})
+        self.assertEqual(valuation.symbol_values["AMC"], 200.0)
+        self.assertEqual(sum(value for _, value in valuation.schedule), 440.0)
+
+    def test_single_symbol_is_a_group(self):
+        config = dict(self.config, options=[], rsus=self.config["rsus"][:2])
+        valuation = valuate(config)
+        self.assertEqual(valuation.prices, {"GME": 10.0})
+        self.assertEqual(valuation.symbol_values, {"GME": 200.0})
+
+    def test_batch_looks_up_every_symbol_once(self):
+        lookups = []
+
+        def get_prices(configs_by_symbol):
+            lookups.append(sorted(configs_by_symbol))
+            return {symbol: 5.0 for symbol in configs_by_symbol}
+
+        configs = {"a": dict(self.config, price=None, prices={}), "b": self.config}
+        rows = list(valuate_batch(["a", "b"], lambda path: configs[path], get_prices))
+        self.assertEqual(lookups, [["AMC", "BBBY", "GME"]])
+        self.assertEqual(rows[0]["total_value"], 100.0 + 250.0 + 40.0)
+        self.assertEqual(rows[1]["total_value"], 200.0 + 200.0 + 40.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
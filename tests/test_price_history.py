@@ -0,0 +1,117 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import os
+import tempfile
+import time
+import unittest
+from array import array
+from datetime import date
+
+from stockworth.equity_group import EquityGroup
+from stockworth.price_history import CloseCache, read_daily_closes, value_series
+from stockworth.tranches import Tranches
+from stockworth.util import parse_date_range
+
+
+class TestPriceHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = {
+            "use_rsus": True,
+            "use_nsos": True,
+            "rsus": [
+                {"qty": 10.0, "vest_date": "2021-01-04"},
+                {"qty": 5.0, "vest_date": "2021-01-08"},
+            ],
+            "options": [
+                {"qty": 20.0, "price": 11.0, "vest_date": "2021-01-06"},
+                {"qty": 20.0, "price": 15.0, "vest_date": "2021-01-11"},
+            ],
+        }
+        days = [date(2021, 1, 4), date(2021, 1, 5), date(2021, 1, 7)]
+        days += [date(2021, 1, 8), date(2021, 1, 11)]
+        self.ordinals = array("q", (day.toordinal() for day in days))
+        self.closes = array("d", [10.0, 12.0, 16.0, 14.0, 9.0])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_daily_closes(self):
+        path = os.path.join(self.directory.name, "closes.csv")
+        with open(path, "w") as closes_file:
+            closes_file.write("date,close\n2021-01-05,12.0\n2021-01-04,10.0\n")
+        ordinals, closes = read_daily_closes(path)
+        self.assertEqual(list(ordinals), list(self.ordinals[:2]))
+        self.assertEqual(list(closes), [10.0, 12.0])
+
+    def test_value_series_matches_equity_group(self):
+        tranches = Tranches.from_config(self.config)
+        points = value_series(
+            tranches,
+            self.ordinals,
+            self.closes,
+            0.25,
+            start=date(2021, 1, 1),
+            end=date(2021, 1, 12),
+        )
+        # Nothing before the first close can be valued
+        self.assertEqual(points[0].date, date(2021, 1, 4))
+        self.assertEqual(points[-1].date, date(2021, 1, 12))
+        self.assertEqual(len(points), 9)
+        # The weekend is valued at Friday's close
+        self.assertEqual(points[5].date, date(2021, 1, 9))
+        self.assertEqual(points[5].price, 14.0)
+        for point in points:
+            group = EquityGroup.from_tranches(tranches, point.price, 0.25)
+            vested = group.value_at(point.date)
+            self.assertAlmostEqual(point.vested_value, vested)
+            self.assertAlmostEqual(point.unvested_value, group.total_value() - vested)
+
+    def test_close_cache(self):
+        cache = CloseCache(self.directory.name)
+        calls = []
+
+        def fetch(symbol):
+            calls.append(symbol)
+            return self.ordinals, self.closes
+
+        cache.get_closes("GME", fetch)
+        ordinals, closes = cache.get_closes("GME", fetch)
+        self.assertEqual(calls, ["GME"])
+        self.assertEqual(list(ordinals), list(self.ordinals))
+        self.assertEqual(list(closes), list(self.closes))
+
+        # Written before the last market close, so stale
+        path = os.path.join(self.directory.name, "GME.closes")
+        old = time.time() - 7 * 24 * 60 * 60
+        os.utime(path, (old, old))
+        cache.get_closes("GME", fetch)
+        self.assertEqual(calls, ["GME", "GME"])
+
+    def test_parse_date_range(self):
+        self.assertEqual(
+            parse_date_range("2020-01-01:2020-12-31"),
+            (date(2020, 1, 1), date(2020, 12, 31)),
+        )
+        self.assertEqual(parse_date_range("2020-01-01:"), (date(2020, 1, 1), None))
+        self.assertEqual(parse_date_range(":"), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import argparse
+import unittest
+from datetime import date, timedelta
+
+from stockworth.equity import Equity
+from stockworth.equity_group import EquityGroup
+from stockworth.interval import Interval
+from stockworth.price_sweep import (
+    format_sweep_table,
+    parse_price_range,
+    sweep_prices,
+)
+from stockworth.tranches import Tranches
+
+
+class TestPriceSweep(unittest.TestCase):
+    def setUp(self):
+        today = date.today()
+        self.config = {
+            "rsus": [
+                {"qty": 10.0, "vest_date": today - timedelta(days=40)},
+                {"qty": 20.0, "vest_date": today + timedelta(days=400)},
+            ],
+            "options": [
+                {"qty": 100.0, "price": 5.0, "vest_date": today + timedelta(days=30)},
+                {"qty": 50.0, "price": 15.0, "vest_date": today + timedelta(days=800)},
+            ],
+            "use_rsus": True,
+            "use_nsos": True,
+        }
+        self.tax_rate = 0.1
+        self.amounts = [1000.0, 100.0, 0.0]
+
+    def equity_group_at(self, price):
+        rsus = [
+            Equity.from_rsu(price, rsu["qty"], rsu["vest_date"], self.tax_rate)
+            for rsu in self.config["rsus"]
+        ]
+        options = [
+            Equity.from_option(
+                price, o["qty"], o["vest_date"], o["price"], self.tax_rate
+            )
+            for o in self.config["options"]
+        ]
+        return EquityGroup(rsus + options)
+
+    def test_parse_price_range(self):
+        self.assertEqual(parse_price_range("10:20:5"), [10.0, 15.0, 20.0])
+        self.assertEqual(len(parse_price_range("0.1:0.3:0.1")), 3)
+
+    def test_parse_price_range_invalid(self):
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_price_range("10:20")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_price_range("10:20:0")
+
+    # Every scenario should match building the EquityGroup from scratch at that price
+    def test_matches_equity_group(self):
+        prices = [1.0, 5.0, 10.0, 20.0]
+        tranches = Tranches.from_config(self.config)
+        scenarios = sweep_prices(
+            tranches, prices, self.tax_rate, self.amounts, Interval.YEARLY
+        )
+        for price, scenario in zip(prices, scenarios):
+            group = self.equity_group_at(price)
+            self.assertEqual(scenario.price, price)
+            self.assertAlmostEqual(scenario.total_value, group.total_value())
+            self.assertAlmostEqual(scenario.vested_value, group.vested_value())
+            self.assertEqual(
+                scenario.thresholds, group.compute_thresholds(self.amounts)
+            )
+            self.assertAlmostEqual(
+                sum(value for _, value in scenario.schedule), group.total_value()
+            )
+
+    def test_table_header(self):
+        scenarios = sweep_prices(
+            Tranches.from_config(self.config), [10.0], 0.0, [100.0], Interval.YEARLY
+        )
+        # the Vested schedule bin is told apart from the Vested total
+        header = format_sweep_table(scenarios, [100.0])[0].split()
+        self.assertEqual(
+            header[:6], ["Price", "Total", "Vested", "Unvested", "Vested", "bin"]
+        )
+
+    def test_rsu_only(self):
+        self.config["use_nsos"] = False
+        tranches = Tranches.from_config(self.config)
+        scenario = sweep_prices(tranches, [10.0], 0.0, [], Interval.MONTHLY)[0]
+        self.assertAlmostEqual(scenario.total_value, 300.0)
+        self.assertAlmostEqual(scenario.vested_value, 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
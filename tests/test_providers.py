@@ -0,0 +1,98 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from stockworth.providers import (
+    AlphaVantageProvider,
+    CsvPrices,
+    JsonPrices,
+    SqlitePrices,
+    StaticPrices,
+    provider_from_config,
+)
+from stockworth.quote_cache import QuoteCache
+
+
+class TestProviders(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def assertPrices(self, provider):
+        prices = provider.fetch_prices(["GME", "AMC", "NOPE"])
+        self.assertEqual((prices["GME"], prices["AMC"]), (20.0, 5.0))
+        self.assertIsInstance(prices["NOPE"], ValueError)
+        self.assertEqual(
+            asyncio.run(provider.fetch_prices_async(["AMC"])), {"AMC": 5.0}
+        )
+        self.assertFalse(provider.cacheable)
+
+    def test_static(self):
+        self.assertPrices(StaticPrices({"GME": 20, "AMC": 5.0}))
+
+    def test_json(self):
+        with open(self.path("prices.json"), "w") as prices_file:
+            json.dump({"GME": 20, "AMC": 5.0}, prices_file)
+        self.assertPrices(JsonPrices(self.path("prices.json")))
+
+    def test_csv(self):
+        with open(self.path("prices.csv"), "w") as prices_file:
+            prices_file.write("symbol,price\nGME,20\nAMC, 5.0\n\n")
+        self.assertPrices(CsvPrices(self.path("prices.csv")))
+
+    def test_sqlite(self):
+        cache = QuoteCache(self.path("quotes.sqlite3"), now=lambda: 0.0)
+        cache.store("GME", 20.0)
+        cache.store("AMC", 5.0)
+        cache.close()
+        self.assertPrices(SqlitePrices(self.path("quotes.sqlite3")))
+
+    def test_from_config(self):
+        provider = provider_from_config({"apikey": "demo"})
+        self.assertIsInstance(provider, AlphaVantageProvider)
+        self.assertFalse(provider.bulk)
+        provider = provider_from_config(
+            {"apikey": "demo", "price_provider": "alpha_vantage_bulk"}
+        )
+        self.assertTrue(provider.bulk)
+        self.assertTrue(provider.cacheable)
+
+        provider = provider_from_config(
+            {"price_provider": {"type": "static", "prices": {"GME": 20.0}}}
+        )
+        self.assertEqual(provider.fetch_prices(["GME"]), {"GME": 20.0})
+        provider = provider_from_config(
+            {"price_provider": {"type": "csv", "path": "prices.csv"}}
+        )
+        self.assertIsInstance(provider, CsvPrices)
+        with self.assertRaises(ValueError):
+            provider_from_config({"price_provider": "carrier pigeon"})
+
+
+if __name__ == "__main__":
+    unittest.main()
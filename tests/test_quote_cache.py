@@ -0,0 +1,129 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from stockworth.quote_cache import (
+    MARKET_TIMEZONE,
+    QuoteCache,
+    last_market_close,
+    market_is_open,
+)
+
+
+def at(*args):
+    """Timestamp for a wall-clock time in the market's timezone"""
+    return datetime(*args, tzinfo=MARKET_TIMEZONE).timestamp()
+
+
+class StubProvider:
+    def __init__(self, price):
+        self.price = price
+        self.calls = 0
+
+    def __call__(self, symbol):
+        self.calls += 1
+        return self.price
+
+
+class TestQuoteCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.clock = at(2021, 3, 3, 11, 0)  # a Wednesday morning
+        self.cache = QuoteCache(
+            os.path.join(self.directory.name, "quotes.sqlite3"),
+            ttl=600,
+            now=lambda: self.clock,
+        )
+        self.provider = StubProvider(12.5)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_within_ttl(self):
+        self.assertEqual(self.cache.get_price("GME", self.provider), 12.5)
+        self.provider.price = 13.0
+        self.clock += 599
+        self.assertEqual(self.cache.get_price("GME", self.provider), 12.5)
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_expired(self):
+        self.cache.get_price("GME", self.provider)
+        self.provider.price = 13.0
+        self.clock += 600
+        self.assertEqual(self.cache.get_price("GME", self.provider), 13.0)
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_keyed_by_symbol(self):
+        self.cache.get_price("GME", self.provider)
+        self.cache.get_price("AMC", self.provider)
+        self.assertEqual(self.provider.calls, 2)
+
+    # Fetched after Friday's close, still good on Sunday
+    def test_market_closed(self):
+        self.clock = at(2021, 3, 5, 17, 0)
+        self.cache.get_price("GME", self.provider)
+        self.clock = at(2021, 3, 7, 12, 0)
+        self.cache.get_price("GME", self.provider)
+        self.assertEqual(self.provider.calls, 1)
+
+    # Fetched before Friday's close, stale over the weekend
+    def test_market_closed_stale(self):
+        self.clock = at(2021, 3, 5, 15, 0)
+        self.cache.get_price("GME", self.provider)
+        self.clock = at(2021, 3, 6, 12, 0)
+        self.cache.get_price("GME", self.provider)
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_get_prices_async(self):
+        fetched = []
+
+        async def fetch_many(symbols):
+            fetched.append(symbols)
+            return {
+                symbol: 12.5 if symbol == "GME" else KeyError(symbol)
+                for symbol in symbols
+            }
+
+        self.cache.store("AMC", 4.0)
+        prices = asyncio.run(
+            self.cache.get_prices_async(["GME", "AMC", "BBBY"], fetch_many)
+        )
+        self.assertEqual(fetched, [["GME", "BBBY"]])
+        self.assertEqual(prices["GME"], 12.5)
+        self.assertIsInstance(prices["BBBY"], KeyError)
+        self.assertEqual(self.cache.lookup("GME"), 12.5)
+        self.assertIsNone(self.cache.lookup("BBBY"))
+
+    def test_market_hours(self):
+        self.assertTrue(market_is_open(at(2021, 3, 3, 9, 30)))
+        self.assertFalse(market_is_open(at(2021, 3, 3, 16, 0)))
+        self.assertFalse(market_is_open(at(2021, 3, 6, 12, 0)))
+        self.assertEqual(
+            last_market_close(at(2021, 3, 8, 10, 0)), at(2021, 3, 5, 16, 0)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
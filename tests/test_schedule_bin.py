@@ -0,0 +1,83 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date
+
+from stockworth.equity import Equity
+from stockworth.equity_group import EquityGroup
+from stockworth.interval import Interval
+from stockworth.schedule_bin import VESTED, ScheduleBin, bin_ends
+
+
+class TestScheduleBin(unittest.TestCase):
+    def test_keys_increase_with_time(self):
+        days = [date(2023, 12, 31), date(2024, 1, 1), date(2024, 3, 31)]
+        days += [date(2024, 4, 1), date(2025, 7, 14)]
+        for interval in Interval:
+            keys = [interval.key(day.toordinal()) for day in days]
+            self.assertEqual(keys, sorted(keys), interval)
+            for day, key in zip(days, keys):
+                self.assertLessEqual(interval.start(key), day)
+                self.assertGreater(interval.start(key + 1), day)
+
+    def test_labels(self):
+        day = date(2024, 5, 15).toordinal()  # a Wednesday
+        labels = {
+            interval: str(ScheduleBin(interval.key(day), interval))
+            for interval in Interval
+        }
+        self.assertEqual(labels[Interval.YEARLY], "2024")
+        self.assertEqual(labels[Interval.MONTHLY], "May 2024")
+        self.assertEqual(labels[Interval.QUARTERLY], "Q2 2024")
+        self.assertEqual(labels[Interval.WEEKLY], "Week of 13 May 2024")
+        self.assertEqual(str(ScheduleBin(VESTED, Interval.YEARLY)), "Vested")
+
+    def test_bin_ends(self):
+        today = date(2024, 2, 10)
+        days = [date(2023, 6, 1), date(2024, 2, 10), date(2024, 2, 11)]
+        days += [date(2024, 3, 1), date(2024, 3, 1), date(2024, 7, 1)]
+        ordinals = [day.toordinal() for day in days]
+        result = [
+            (str(schedule_bin), end)
+            for schedule_bin, end in bin_ends(ordinals, Interval.QUARTERLY, today)
+        ]
+        exp_result = [("Vested", 2), ("Q1 2024", 5), ("Q3 2024", 6)]
+        self.assertEqual(result, exp_result)
+
+    def test_binned_values_match_per_equity_sums(self):
+        today = date.today()
+        equity_list = [
+            Equity(date.fromordinal(today.toordinal() + offset), float(offset % 7))
+            for offset in range(-40, 800, 3)
+        ]
+        group = EquityGroup(equity_list)
+        for interval in Interval:
+            exp_result = {}
+            for equity in equity_list:
+                ordinal = equity.date.toordinal()
+                key = VESTED if equity.date <= today else interval.key(ordinal)
+                exp_result[key] = exp_result.get(key, 0.0) + equity.value
+            result = group.binned_values(interval)
+            self.assertEqual([b.key for b, _ in result], sorted(exp_result))
+            for schedule_bin, value in result:
+                self.assertAlmostEqual(value, exp_result[schedule_bin.key])
+
+
+if __name__ == "__main__":
+    unittest.main()
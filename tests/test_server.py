@@ -0,0 +1,130 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import json
+import unittest
+from datetime import date, timedelta
+
+from aiohttp.test_utils import AioHTTPTestCase
+
+from stockworth.server import LatencyHistogram, LRUCache, ValuationService
+
+
+class TestValuationService(AioHTTPTestCase):
+    async def get_application(self):
+        self.lookups = []
+
+        async def get_prices(symbols, config):
+            self.lookups.append(list(symbols))
+            if "price_provider" in config:
+                raise ValueError("Unknown price provider")
+            prices = {"GME": 10.0, "AMC": ValueError("Delisted")}
+            return {symbol: prices[symbol] for symbol in symbols}
+
+        self.service = ValuationService(get_prices, cache_size=2)
+        return self.service.make_app()
+
+    def config_body(self, **overrides):
+        vest_date = date.today() + timedelta(days=30)
+        config = {
+            "symbol": "GME",
+            "rsus": [{"qty": 10.0, "vest_date": vest_date.isoformat()}],
+            "thresholds": [50.0],
+        }
+        config.update(overrides)
+        return json.dumps(config)
+
+    async def test_valuate(self):
+        response = await self.client.post("/valuate", data=self.config_body())
+        self.assertEqual(response.status, 200)
+        result = await response.json()
+        self.assertEqual(result["total_value"], 100.0)
+        self.assertEqual(result["unvested_value"], 100.0)
+        self.assertEqual(self.lookups, [["GME"]])
+
+        response = await self.client.post(
+            "/valuate?price=20&tax=0.5", data=self.config_body()
+        )
+        result = await response.json()
+        self.assertEqual(result["total_value"], 100.0)
+        self.assertEqual(result["tax_rate"], 0.5)
+        self.assertEqual(len(self.lookups), 1)
+
+    async def test_repeat_requests_reuse_models(self):
+        for _ in range(3):
+            response = await self.client.post(
+                "/valuate?price=5", data=self.config_body()
+            )
+            self.assertEqual((await response.json())["total_value"], 50.0)
+        self.assertEqual(self.service.configs.stats()["misses"], 1)
+        self.assertEqual(
+            self.service.models.stats(), {"size": 1, "hits": 2, "misses": 1}
+        )
+
+    async def test_errors(self):
+        response = await self.client.post("/valuate", data="{")
+        self.assertEqual(response.status, 400)
+        response = await self.client.post(
+            "/valuate?interval=daily", data=self.config_body()
+        )
+        self.assertEqual(response.status, 400)
+        response = await self.client.post(
+            "/valuate", data=self.config_body(symbol="AMC")
+        )
+        self.assertEqual(response.status, 502)
+        self.assertIn("Delisted", (await response.json())["error"])
+        response = await self.client.post(
+            "/valuate", data=self.config_body(price_provider="nope")
+        )
+        self.assertEqual(response.status, 400)
+
+    async def test_metrics(self):
+        await self.client.post("/valuate?price=5", data=self.config_body())
+        await self.client.get("/health")
+        response = await self.client.get("/metrics")
+        metrics = await response.json()
+        self.assertEqual(metrics["latency"]["/valuate"]["count"], 1)
+        self.assertEqual(metrics["latency"]["/health"]["buckets_ms"]["+Inf"], 1)
+        self.assertEqual(metrics["models"]["size"], 1)
+
+
+class TestHelpers(unittest.TestCase):
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats(), {"size": 2, "hits": 2, "misses": 1})
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.0005, 0.003, 0.003, 10.0):
+            histogram.observe(seconds)
+        buckets = histogram.stats()["buckets_ms"]
+        self.assertEqual(buckets["1"], 1)
+        self.assertEqual(buckets["2"], 1)
+        self.assertEqual(buckets["5"], 3)
+        self.assertEqual(buckets["5000"], 3)
+        self.assertEqual(buckets["+Inf"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
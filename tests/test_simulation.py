@@ -0,0 +1,133 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import math
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from stockworth.interval import Interval
+from stockworth.price_sweep import sweep_prices
+from stockworth.simulation import (
+    GeometricBrownianMotion,
+    HistoricalBootstrap,
+    read_closes,
+    simulate,
+)
+from stockworth.tranches import Tranches
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        today = date.today()
+        config = {
+            "rsus": [
+                {"qty": 10.0, "vest_date": today - timedelta(days=40)},
+                {"qty": 20.0, "vest_date": today + timedelta(days=400)},
+            ],
+            "options": [
+                {"qty": 100.0, "price": 5.0, "vest_date": today + timedelta(days=30)},
+                {"qty": 50.0, "price": 15.0, "vest_date": today + timedelta(days=800)},
+            ],
+            "use_rsus": True,
+            "use_nsos": True,
+        }
+        self.tranches = Tranches.from_config(config)
+        self.amounts = [1000.0, 100.0]
+
+    # With no randomness, every path should match valuing at a fixed price
+    def test_flat_model_matches_sweep(self):
+        model = GeometricBrownianMotion(drift=0.0, volatility=0.0)
+        result = simulate(
+            self.tranches, 20.0, 0.1, self.amounts, model, paths=10, jobs=1
+        )
+        exp_result = sweep_prices(
+            self.tranches, [20.0], 0.1, self.amounts, Interval.YEARLY
+        )[0]
+        for value in result.total_value.values():
+            self.assertAlmostEqual(value, exp_result.total_value)
+        for threshold_dates, threshold in zip(result.thresholds, exp_result.thresholds):
+            for threshold_date in threshold_dates.values():
+                self.assertEqual(threshold_date, threshold.date)
+
+    # Results only depend on the seed, not on how the work is split up
+    def test_reproducible(self):
+        model = GeometricBrownianMotion(drift=0.05, volatility=0.4)
+        first = simulate(
+            self.tranches,
+            20.0,
+            0.0,
+            self.amounts,
+            model,
+            500,
+            seed=7,
+            chunk_size=100,
+            jobs=2,
+        )
+        second = simulate(
+            self.tranches,
+            20.0,
+            0.0,
+            self.amounts,
+            model,
+            500,
+            seed=7,
+            chunk_size=100,
+            jobs=1,
+        )
+        self.assertEqual(first, second)
+
+    # Log prices should be normal with the model's drift and volatility
+    def test_gbm_distribution(self):
+        model = GeometricBrownianMotion(drift=0.1, volatility=0.3)
+        today = date.today()
+        tranches = Tranches.from_config(
+            {
+                "rsus": [
+                    {"qty": 1.0, "vest_date": today + timedelta(days=round(365.25 * 4))}
+                ],
+                "use_rsus": True,
+                "use_nsos": True,
+            }
+        )
+        result = simulate(tranches, 1.0, 0.0, [], model, paths=20_000, jobs=1)
+        # 4 years, so the log price has mean 4 * (0.1 - 0.3**2 / 2) = 0.22 and
+        # standard deviation 0.3 * 2 = 0.6, and the 95th percentile is 1.645
+        # standard deviations above the mean
+        self.assertAlmostEqual(math.log(result.total_value[50]), 0.22, delta=0.02)
+        self.assertAlmostEqual(
+            math.log(result.total_value[95]), 0.22 + 1.645 * 0.6, delta=0.03
+        )
+
+    def test_bootstrap_flat_history(self):
+        model = HistoricalBootstrap([10.0] * 30)
+        result = simulate(self.tranches, 20.0, 0.0, [], model, paths=10, jobs=1)
+        exp_result = sweep_prices(self.tranches, [20.0], 0.0, [], Interval.YEARLY)[0]
+        self.assertAlmostEqual(result.total_value[50], exp_result.total_value)
+
+    def test_read_closes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "closes.csv")
+            with open(path, "w") as closes_file:
+                closes_file.write("date,close\n2021-01-05,2.0\n2021-01-04,1.0\n")
+            self.assertEqual(read_closes(path), [1.0, 2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
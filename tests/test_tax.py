@@ -0,0 +1,141 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import argparse
+import unittest
+from datetime import date
+
+from stockworth.interval import Interval
+from stockworth.tax import (
+    TaxSchedule,
+    after_tax_values,
+    parse_tax_sweep,
+    read_tax_schedules,
+    sweep_tax_schedules,
+    tax_columns,
+)
+from stockworth.tranches import Tranches
+from stockworth.valuation import valuate
+
+
+class TestTax(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            "symbol": "GME",
+            "use_rsus": True,
+            "use_nsos": True,
+            "rsus": [
+                {"qty": 10.0, "vest_date": "2020-06-01", "vest_price": 5.0},
+                {"qty": 10.0, "vest_date": "2099-03-01"},
+            ],
+            "options": [{"qty": 10.0, "price": 4.0, "vest_date": "2099-06-01"}],
+            "thresholds": [50.0],
+            "tax_rate": 0.0,
+            "bin_size": Interval.YEARLY,
+        }
+        self.tranches = Tranches.from_config(self.config)
+
+    def test_tax_columns(self):
+        columns = tax_columns(self.tranches, 10.0)
+        self.assertEqual(list(columns.pre_tax), [100.0, 100.0, 60.0])
+        # the first RSU vested at 5, so 50 was income and 50 is gain
+        self.assertEqual(list(columns.incomes), [50.0, 100.0, 60.0])
+        self.assertEqual(list(columns.gains), [50.0, 0.0, 0.0])
+        self.assertEqual(list(columns.years), [2020, 2099, 2099])
+
+    def test_underwater_option_gain(self):
+        config = dict(
+            self.config,
+            rsus=[],
+            options=[
+                {
+                    "qty": 100.0,
+                    "price": 10.0,
+                    "vest_date": "2020-06-01",
+                    "vest_price": 5.0,
+                }
+            ],
+        )
+        columns = tax_columns(Tranches.from_config(config), 12.0)
+        # vested underwater, so there was no income and the gain is over the strike
+        self.assertEqual(list(columns.pre_tax), [200.0])
+        self.assertEqual(list(columns.incomes), [0.0])
+        self.assertEqual(list(columns.gains), [200.0])
+        schedule = TaxSchedule(rsu_rate=0.4, capital_gains_rate=0.2)
+        self.assertEqual(schedule.values(columns), [160.0])
+
+    def test_rates_by_type(self):
+        schedule = TaxSchedule(rsu_rate=0.4, nso_rate=0.5, capital_gains_rate=0.2)
+        values = schedule.values(tax_columns(self.tranches, 10.0))
+        self.assertEqual(values, [100.0 - 20.0 - 10.0, 60.0, 30.0])
+
+    def test_flat_matches_tax_rate(self):
+        values = TaxSchedule(0.25).values(tax_columns(self.tranches, 10.0))
+        # the first RSU's gain doesn't change a flat rate
+        self.assertEqual(values, self.tranches.values(10.0, 0.25))
+
+    def test_brackets(self):
+        schedule = TaxSchedule(
+            brackets=[(0, 0.0), (100, 0.5)], capital_gains_rate=0.0, other_income=50
+        )
+        self.assertEqual(schedule.income_tax(80.0), 0.0)
+        self.assertEqual(schedule.income_tax(300.0), 100.0)
+        values = schedule.values(tax_columns(self.tranches, 10.0))
+        # 2020: 50 + 50 income stays under 100. 2099: 100 of RSU income takes the
+        # year to 150, 25 taxed; the options' 60 is all in the top bracket.
+        self.assertEqual(values, [100.0, 75.0, 30.0])
+
+    def test_after_tax_values_share_brackets(self):
+        self.config["rsus"][1]["symbol"] = "AMC"
+        tranches_by_symbol = {
+            symbol: Tranches.from_config(self.config, symbol)
+            for symbol in ("GME", "AMC")
+        }
+        schedule = TaxSchedule(brackets=[(0, 0.0), (100, 0.5)], capital_gains_rate=0.0)
+        values = after_tax_values(
+            schedule, tranches_by_symbol, {"GME": 10.0, "AMC": 10.0}
+        )
+        # AMC vests first in 2099, using up the untaxed 100
+        self.assertEqual(list(values["AMC"]), [100.0])
+        self.assertEqual(list(values["GME"]), [100.0, 30.0])
+
+    def test_valuate_with_tax(self):
+        self.config.update(price=10.0, tax={"rsu_rate": 0.5, "capital_gains_rate": 0.0})
+        valuation = valuate(self.config)
+        self.assertEqual(valuation.total_value, 75.0 + 50.0 + 30.0)
+        self.assertEqual(valuation.vested_value, 75.0)
+
+    def test_sweep(self):
+        schedules = read_tax_schedules("0:0.5:0.25")
+        scenarios = list(sweep_tax_schedules(self.tranches, 10.0, schedules, [50.0]))
+        self.assertEqual(
+            [s.name for s in scenarios], ["0 flat", "0.25 flat", "0.5 flat"]
+        )
+        self.assertEqual([s.total_value for s in scenarios], [260.0, 195.0, 130.0])
+        self.assertEqual(scenarios[0].vested_value, 100.0)
+        self.assertEqual(scenarios[0].thresholds[0].date, date(2099, 6, 1))
+
+    def test_parse_tax_sweep(self):
+        self.assertEqual(parse_tax_sweep("0:0.4:0.2"), "0:0.4:0.2")
+        for text in ("0.4:0:0.2", "no-such-file.json"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_tax_sweep(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
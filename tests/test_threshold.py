@@ -56,6 +56,23 @@ class TestThreshold(unittest.TestCase):
         result = self.instance.compute_threshold(amount)
         self.assertEqual(result, exp_result)
 
+    def test_multiple_thresholds(self):
+        # Results come back in the order the amounts were given, not sorted
+        amounts = [0.0, 15.0, 1000.0]
+        exp_result = [
+            Threshold(0.0, self.next_year[0].date),
+            Threshold(15.0, self.next_month[0].date),
+            Threshold(1000.0, self.last_month[2].date),
+        ]
+        result = self.instance.compute_thresholds(amounts)
+        self.assertEqual(result, exp_result)
+
+    def test_thresholds_match_single(self):
+        amounts = [21.0, 20.0, 11.0, 10.0, 1.0, 0.5]
+        exp_result = [self.instance.compute_threshold(a) for a in amounts]
+        result = self.instance.compute_thresholds(amounts)
+        self.assertEqual(result, exp_result)
+
 
 if __name__ == "__main__":
     unittest.main()
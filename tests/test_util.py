@@ -0,0 +1,64 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import unittest
+from datetime import date
+from unittest import mock
+
+from stockworth import util
+from stockworth.util import format_currency, format_date_delta, set_currency_locale
+
+
+class TestFormatting(unittest.TestCase):
+    def tearDown(self):
+        set_currency_locale(None)
+
+    def test_currency(self):
+        self.assertEqual(format_currency(1234567.5), "$1,234,568")
+        self.assertEqual(format_currency(0.4), "$0")
+
+    def test_locale_currency(self):
+        set_currency_locale("C")
+        self.assertEqual(format_currency(1234.6), "1235")
+        self.assertEqual(format_currency(-1234.6), "-1235")
+
+        conventions = dict(
+            util.locale.localeconv(),
+            currency_symbol="€",
+            p_cs_precedes=0,
+            p_sep_by_space=1,
+        )
+        set_currency_locale("C")
+        with mock.patch.object(util.locale, "localeconv", return_value=conventions):
+            self.assertEqual(format_currency(1234.6), "1235 €")
+            # a cached amount isn't formatted again
+            self.assertEqual(format_currency(1234.9), "1235 €")
+        self.assertEqual(util._format_locale_currency.cache_info().hits, 1)
+
+    def test_date_delta(self):
+        self.assertEqual(
+            format_date_delta(date(2023, 3, 5), date(2021, 1, 1)),
+            "2 years, 2 months, and 4 days",
+        )
+        hits = util._format_date_delta.cache_info().hits
+        format_date_delta(date(2023, 3, 5), date(2021, 1, 1))
+        self.assertEqual(util._format_date_delta.cache_info().hits, hits + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
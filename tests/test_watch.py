@@ -0,0 +1,121 @@
+# <editor-fold desc="AGPLv3 preamble">
+# stockworth, a simple equity pretty printer
+# Copyright (C) 2021  Paul Sexton
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# </editor-fold>
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from stockworth.interval import Interval
+from stockworth.watch import Watcher, format_update
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+        self.write_config(qty=10.0)
+        self.price = 10.0
+        self.today = date.today()
+        self.loads = 0
+        self.watcher = Watcher(
+            self.path,
+            load_config=self.load_config,
+            get_price=lambda symbol, config: self.price,
+            render=lambda config, valuation: f"{valuation.total_value}\n{config['symbol']}",
+            today=lambda: self.today,
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self, qty, mtime=None):
+        vest_date = date.today() + timedelta(days=30)
+        config = {
+            "symbol": "GME",
+            "rsus": [{"qty": qty, "vest_date": vest_date.isoformat()}],
+            "options": [],
+            "thresholds": [],
+        }
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def load_config(self, path):
+        self.loads += 1
+        with open(path) as config_file:
+            config = json.load(config_file)
+        config.update(
+            price=None,
+            tax_rate=0.0,
+            use_rsus=True,
+            use_nsos=True,
+            bin_size=Interval.YEARLY,
+        )
+        return config
+
+    def test_unchanged(self):
+        self.assertEqual(self.watcher.poll(), ["100.0", "GME"])
+        self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.loads, 1)
+
+    def test_price_change(self):
+        self.watcher.poll()
+        all_equity = self.watcher.all_equity
+        self.price = 12.0
+        self.assertEqual(self.watcher.poll(), ["120.0", "GME"])
+        self.assertIs(self.watcher.all_equity, all_equity)
+        self.assertEqual(self.loads, 1)
+
+    def test_config_change(self):
+        self.watcher.poll()
+        self.write_config(qty=20.0, mtime=os.stat(self.path).st_mtime + 10)
+        self.assertEqual(self.watcher.poll(), ["200.0", "GME"])
+        self.assertEqual(self.loads, 2)
+
+    def test_other_symbol_price_change(self):
+        with open(self.path) as config_file:
+            config = json.load(config_file)
+        config["rsus"].append(dict(config["rsus"][0], symbol="AMC"))
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file)
+        prices = {"GME": 10.0, "AMC": 1.0}
+        self.watcher.get_price = lambda symbol, config: prices[symbol]
+        self.assertEqual(self.watcher.poll(), ["110.0", "GME"])
+        all_equity = self.watcher.all_equity
+        prices["AMC"] = 2.0
+        self.assertEqual(self.watcher.poll(), ["120.0", "GME"])
+        self.assertIs(self.watcher.all_equity, all_equity)
+
+    # A new day means recomputing, but the output may well come out the same
+    def test_date_change(self):
+        self.watcher.poll()
+        self.today += timedelta(days=1)
+        self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.watcher._date, self.today)
+
+    def test_format_update(self):
+        self.assertEqual(format_update(None, ["a", "b"]), ["a", "b"])
+        result = format_update(["a", "b"], ["a", "c"])
+        self.assertEqual(result[1:], ["-b", "+c"])
+
+
+if __name__ == "__main__":
+    unittest.main()